@@ -1,44 +1,256 @@
-def score_listing(listing: dict) -> float:
+# Listing scores from declarative rules
+#
+# The rules live in scoring_rules.json (or SCORING_RULES_PATH), one named rule set per
+# scorer. Each set is compiled once into per-listing and per-DataFrame evaluators that
+# apply the same arithmetic in the same order, so score_listing and score_frame agree
+# exactly. The file is re-read whenever it changes on disk, so weights can be tuned
+# without restarting the scheduler, and rescore_table() applies them to stored listings.
+from app.integrations.database_manager import LISTING_CHUNK_SIZE, get_conn, iter_listing_chunks, update_listings
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import json
+import numpy as np
+import os
+import pandas as pd
+import re
+import threading
+import time
+
+RULES_PATH = CONFIG["SCORING_RULES_PATH"] or os.path.join(os.path.dirname(__file__), "scoring_rules.json")
+DEFAULT_RULESET = "development"
+# How often get_rules() looks at the file; scoring one listing at a time shouldn't stat it every call
+RELOAD_CHECK_SECONDS = 1.0
+
+def _value(listing, field, default):
+    return listing.get(field) or default
+
+def _column(df, name, default):
+    if name not in df:
+        return pd.Series(default, index=df.index, dtype=float)
+    values = pd.to_numeric(df[name], errors="coerce").astype(float)
+    # Same as `listing.get(name) or default`: missing and zero both fall back
+    return values.fillna(0.0).replace(0.0, default)
+
+def _round(values, digits):
+    """round(x, digits) for every value; np.round only differs from it right at a half"""
+    rounded = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+def _keyword_counts(texts, keywords, pattern):
+    """
+    How many of the keywords each text contains. Each distinct text is scanned once:
+    one regex pass finds those with any keyword, and only those are checked keyword by keyword.
+    """
+    codes, distinct = pd.factorize(texts.fillna("").astype(str))
+    distinct = [t.lower() for t in distinct.tolist()]
+    search = pattern.search
+    hits = [i for i, t in enumerate(distinct) if search(t)]
+    per_text = np.zeros(len(distinct), dtype=int)
+    per_text[hits] = [sum(k in distinct[i] for k in keywords) for i in hits]
+    return per_text[codes] if distinct else np.zeros(len(texts), dtype=int)
+
+class Rule:
+    """One scoring step: apply() for a listing dict, apply_frame() for a DataFrame"""
+
+    def __init__(self, spec, defaults):
+        self.name = spec.get("name", spec["type"])
+        self.field = spec["field"]
+        self.defaults = defaults
+
+    @property
+    def fields(self):
+        return [self.field]
+
+    def default(self, field):
+        return float(self.defaults.get(field, 0))
+
+class ScaledRule(Rule):
+    """Adds field / per * weight, capped at max"""
+
+    def __init__(self, spec, defaults):
+        super().__init__(spec, defaults)
+        self.per = float(spec.get("per", 1))
+        self.weight = float(spec.get("weight", 1))
+        self.max = float(spec["max"]) if "max" in spec else None
+
+    def apply(self, listing, score):
+        term = _value(listing, self.field, self.default(self.field)) / self.per * self.weight
+        return score + (term if self.max is None else min(term, self.max))
+
+    def apply_frame(self, df, score):
+        term = _column(df, self.field, self.default(self.field)).to_numpy() / self.per * self.weight
+        return score + (term if self.max is None else np.minimum(term, self.max))
+
+class BandsRule(Rule):
+    """Adds the points of the first band the value is below; with divide_by, the value is field / (divide_by + offset)"""
+
+    def __init__(self, spec, defaults):
+        super().__init__(spec, defaults)
+        self.divide_by = spec.get("divide_by")
+        self.offset = float(spec.get("offset", 0))
+        self.bands = [(float(b["below"]), float(b["points"])) for b in spec["bands"]]
+
+    @property
+    def fields(self):
+        return [self.field] + ([self.divide_by] if self.divide_by else [])
+
+    def apply(self, listing, score):
+        value = _value(listing, self.field, self.default(self.field))
+        if self.divide_by:
+            value = value / (_value(listing, self.divide_by, self.default(self.divide_by)) + self.offset)
+        for below, points in self.bands:
+            if value < below:
+                return score + points
+        return score
+
+    def apply_frame(self, df, score):
+        value = _column(df, self.field, self.default(self.field)).to_numpy()
+        if self.divide_by:
+            value = value / (_column(df, self.divide_by, self.default(self.divide_by)).to_numpy() + self.offset)
+        return score + np.select([value < below for below, _ in self.bands],
+                                 [points for _, points in self.bands], 0.0)
+
+class KeywordsRule(Rule):
+    """Adds points once for each keyword found in the (lowercased) text field"""
+
+    def __init__(self, spec, defaults):
+        super().__init__(spec, defaults)
+        self.points = float(spec["points"])
+        self.keywords = [k.lower() for k in spec["keywords"]]
+        self.pattern = re.compile("|".join(re.escape(k) for k in self.keywords))
+
+    def apply(self, listing, score):
+        text = (listing.get(self.field) or "").lower()
+        for k in self.keywords:
+            if k in text:
+                score += self.points
+        return score
+
+    def apply_frame(self, df, score):
+        if self.field not in df or not self.keywords:
+            return score
+        matches = _keyword_counts(df[self.field], self.keywords, self.pattern)
+        for n in range(int(matches.max(initial=0))):
+            score = score + np.where(matches > n, self.points, 0.0)
+        return score
+
+class MultiplierRule(Rule):
+    """Multiplies the score so far by the factor for the field's value (e.g. the LLM label)"""
+
+    def __init__(self, spec, defaults):
+        super().__init__(spec, defaults)
+        self.factors = {value: float(factor) for value, factor in spec["factors"].items()}
+
+    def apply(self, listing, score):
+        factor = self.factors.get(listing.get(self.field))
+        return score * factor if factor else score
+
+    def apply_frame(self, df, score):
+        if self.field not in df or not self.factors:
+            return score
+        values = df[self.field].to_numpy()
+        return score * np.select([values == v for v in self.factors], list(self.factors.values()), 1.0)
+
+RULE_TYPES = {"scaled": ScaledRule, "bands": BandsRule, "keywords": KeywordsRule, "multiplier": MultiplierRule}
+
+class RuleSet:
+    """A compiled rule set; rules are applied in file order, then the score is rounded"""
+
+    def __init__(self, name, spec):
+        self.name = name
+        defaults = spec.get("defaults", {})
+        self.rules = []
+        for rule in spec["rules"]:
+            if rule.get("type") not in RULE_TYPES:
+                raise ValueError(f"{name}: unknown scoring rule type {rule.get('type')!r}")
+            self.rules.append(RULE_TYPES[rule["type"]](rule, defaults))
+        self.digits = int(spec.get("round", 3))
+
+    @property
+    def fields(self):
+        return list(dict.fromkeys(f for rule in self.rules for f in rule.fields))
+
+    def score(self, listing):
+        score = 0.0
+        for rule in self.rules:
+            score = rule.apply(listing, score)
+        return round(score, self.digits)
+
+    def score_frame(self, df):
+        score = np.zeros(len(df))
+        for rule in self.rules:
+            score = rule.apply_frame(df, score)
+        return pd.Series(_round(np.asarray(score, dtype=float), self.digits), index=df.index, name="score")
+
+def compile_rules(spec):
+    """{ruleset name: RuleSet} from the parsed rules file; raises ValueError/KeyError if it's malformed"""
+    return {name: RuleSet(name, ruleset) for name, ruleset in spec.items()}
+
+_rules_lock = threading.Lock()
+_loaded = {"path": None, "stamp": None, "rulesets": None, "checked": 0.0}
+
+def get_rules(ruleset=DEFAULT_RULESET, path=None):
+    """
+    The compiled rule set, recompiled if the file changed since it was last read.
+    A broken edit is logged and the previous rules stay in force.
     """
-    Simple heuristic scoring:
+    path = path or RULES_PATH
+    with _rules_lock:
+        now = time.monotonic()
+        if path == _loaded["path"] and now - _loaded["checked"] < RELOAD_CHECK_SECONDS:
+            return _loaded["rulesets"][ruleset]
+        stat = os.stat(path)
+        stamp = (path, stat.st_mtime_ns, stat.st_size)
+        if stamp != _loaded["stamp"]:
+            try:
+                with open(path) as f:
+                    rulesets = compile_rules(json.load(f))
+            except (ValueError, KeyError, TypeError) as e:
+                if _loaded["rulesets"] is None:
+                    raise
+                logger.error("Scoring rules in %s are invalid, keeping the previous rules: %s", path, e)
+            else:
+                if _loaded["stamp"] is not None:
+                    logger.info("Reloaded scoring rules from %s", path)
+                _loaded["rulesets"] = rulesets
+            _loaded["stamp"] = stamp
+        _loaded.update(path=path, checked=now)
+        return _loaded["rulesets"][ruleset]
+
+def score_listing(listing: dict, ruleset=DEFAULT_RULESET) -> float:
+    """
+    Score one listing dict. The development rules (see scoring_rules.json):
       - larger lot_size adds points
       - older year_built (pre-1950) adds points (potential teardown)
       - lower price/lot_sqft increases score
       - keywords in description add points
+      - the LLM label scales the total
+    """
+    return get_rules(ruleset).score(listing)
+
+def score_frame(df: pd.DataFrame, ruleset=DEFAULT_RULESET) -> pd.Series:
+    """score_listing for every row of a DataFrame of listings, using column operations"""
+    return get_rules(ruleset).score_frame(df)
+
+def rescore_table(ruleset=DEFAULT_RULESET, chunk_size=LISTING_CHUNK_SIZE):
+    """
+    Recompute the score of every stored listing with the current rules - no scraping
+    or classifying. Streams the table chunk_size rows at a time, scores each chunk in
+    one DataFrame pass and writes back only the scores that changed. Returns how many.
     """
-    score = 0.0
-    lot = listing.get("lot_size") or 0
-    year = listing.get("year_built") or 9999
-    price = listing.get("price") or 1
-
-    # Lot size weight
-    score += min(lot / 1000.0, 10.0)
-
-    # Age weight: older house higher score
-    if year and year < 1950:
-        score += 5.0
-    elif year and year < 1980:
-        score += 2.0
-
-    # Price per sqft (lower price per lot gives potential)
-    pps = price / (lot+1)
-    if pps < 50:
-        score += 5.0
-    elif pps < 200:
-        score += 2.0
-
-    # Keyword boost
-    text = (listing.get("description") or "").lower()
-    keywords = ["tear down", "tear-down", "builder", "contractor special", "development opportunity", "as is"]
-    for k in keywords:
-        if k in text:
-            score += 3.0
-
-    # classification override
-    label = listing.get("classified_label")
-    if label == "development":
-        score *= 1.5
-    elif label == "maybe":
-        score *= 1.1
-
-    return round(score, 3)
+    rules = get_rules(ruleset)
+    columns = {row[1] for row in get_conn().execute("PRAGMA table_info(listings)")}
+    fields = [f for f in rules.fields if f in columns and f not in ("id", "score")]
+    total = changed = 0
+    for chunk in iter_listing_chunks(["score"] + fields, chunk_size):
+        df = pd.DataFrame(chunk)
+        scores = rules.score_frame(df)
+        differs = df["score"].to_numpy() != scores.to_numpy()
+        changed += update_listings(["score"], zip(scores[differs].tolist(), df["id"][differs].tolist()))
+        total += len(df)
+    logger.info("Rescored %d listings with the %s rules: %d changed", total, ruleset, changed)
+    return changed
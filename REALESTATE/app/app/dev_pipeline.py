@@ -1,11 +1,12 @@
 from app.utils.logger import logger
-from app.scraper.zillow_scraper import scrape_zillow
-from app.scraper.redfin_scraper import scrape_redfin
-from app.scraper.realtor_scraper import scrape_realtor
-from app.utils.mock_data import scrape_with_fallback
-from app.integrations.database_manager import init_db, upsert_listing
-from app.nlp.openai_classifier import classify_listing
-from app.core.scoring_engine import score_listing
+from app.scraper.crawl_frontier import run_crawl
+from app.scraper.incremental import INCREMENTAL, split_by_change
+from app.scraper.readiness import reset_wait_log, wait_report
+from app.integrations.database_manager import init_db, upsert_listings
+from app.nlp.openai_classifier import reset_classify_stats, classify_report
+from app.nlp.preclassifier import classify
+from app.nlp.classification_cache import reset_cache_stats, cache_report
+from app.core.scoring_engine import score_frame
 from app.integrations.google_sheets_uploader import upload_listings_to_sheet
 import pandas as pd
 import json
@@ -14,32 +15,32 @@ from datetime import datetime
 def run_pipeline():
     logger.info("Pipeline started")
     init_db()
-    all_listings = []
     # 1) Scrape sources with fallback to mock data
     from app.utils.config_loader import CONFIG
     use_mock = CONFIG["USE_MOCK_DATA"]
     
-    z_results = scrape_with_fallback(lambda: scrape_zillow(max_pages=1), "Zillow", use_mock=use_mock)
-    r_results = scrape_with_fallback(scrape_redfin, "Redfin", use_mock=use_mock)  
-    rl_results = scrape_with_fallback(scrape_realtor, "Realtor", use_mock=use_mock)
-    all_results = z_results + r_results + rl_results
-    logger.info("Scraped total %d listings", len(all_results))
+    reset_wait_log()
+    # Every (source, city, page) is a task in the persistent crawl queue; a run that
+    # was killed part way is resumed here instead of starting over
+    all_results, scrape_report = run_crawl(use_mock=use_mock)
+    logger.info("Scraped total %d listings: %s", len(all_results), scrape_report)
+    logger.info("Page wait times: %s", wait_report())
 
-    # 2) Classify via LLM + simple NLP
-    for l in all_results:
-        raw_json = l.get("raw_json", {})
-        if isinstance(raw_json, dict):
-            raw_text = json.dumps(raw_json)
-        else:
-            raw_text = str(raw_json) if raw_json else ""
-        text_for_class = l.get("address", "") + " " + raw_text
-        fields = {
-            "price": l.get("price"),
-            "beds": l.get("beds"),
-            "baths": l.get("baths"),
-            "living_area": l.get("living_area")
-        }
-        label = classify_listing(text_for_class, fields)
+    # Listings whose price and status haven't changed keep their stored label and score
+    to_process, unchanged = all_results, []
+    if INCREMENTAL:
+        to_process, unchanged, changes = split_by_change(all_results)
+        logger.info("Listings: %d new, %d changed, %d unchanged (not reclassified)",
+                    changes["new"], changes["changed"], changes["unchanged"])
+
+    # 2) Classify: keyword rules and the local model first, then the LLM (many listings
+    # per request and several requests at once) for whatever they aren't sure about
+    reset_cache_stats()
+    reset_classify_stats()
+    labels = classify(to_process)
+    logger.info("Classification cache: %s", cache_report())
+    logger.info("Classification throughput: %s", classify_report())
+    for l, label in zip(to_process, labels):
         l["classified_label"] = label
 
         # 3) Enrichment (placeholder)
@@ -47,14 +48,18 @@ def run_pipeline():
         if "lot_size" not in l:
             l["lot_size"] = l.get("lot_size") or None
 
-        # 4) Scoring
-        l["score"] = score_listing(l)
-
-        # 5) Save to DB
-        l["raw_json"] = json.dumps(l.get("raw_json") or {})
-        upsert_listing(l)
+    # 4) Scoring, the whole batch at once
+    scores = score_frame(pd.DataFrame(to_process)).tolist() if to_process else []
+    for l, score in zip(to_process, scores):
+        l["score"] = score
 
-        all_listings.append(l)
+    # 5) Save to DB in a few large transactions. Unchanged listings are written too, with
+    # their stored label and score, so updated_at, dom and the other scraped fields stay current
+    all_listings = to_process + unchanged
+    for l in all_listings:
+        if not isinstance(l.get("raw_json"), str):
+            l["raw_json"] = json.dumps(l.get("raw_json") or {})
+    upsert_listings(all_listings)
 
     # 6) Export CSV and Google Sheets
     if all_listings:
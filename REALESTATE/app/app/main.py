@@ -1,6 +1,25 @@
-from app.dev_pipeline import run_pipeline
 from app.utils.logger import logger
+import argparse
 
 if __name__ == "__main__":
-    logger.info("Manual start")
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Scrape, classify and score development leads")
+    parser.add_argument("--rescore", action="store_true",
+                        help="only recompute the scores of stored listings with the current scoring rules")
+    parser.add_argument("--reclassify", action="store_true",
+                        help="only classify and rescore stored listings, without scraping")
+    parser.add_argument("--labels", nargs="+",
+                        help="with --reclassify, only listings that currently have one of these labels")
+    args = parser.parse_args()
+
+    if args.reclassify:
+        from app.reprocess import reclassify_stored
+        logger.info("Manual reclassify of stored listings")
+        reclassify_stored(labels=args.labels)
+    elif args.rescore:
+        from app.reprocess import rescore_stored
+        logger.info("Manual rescore of stored listings")
+        rescore_stored()
+    else:
+        from app.dev_pipeline import run_pipeline
+        logger.info("Manual start")
+        run_pipeline()
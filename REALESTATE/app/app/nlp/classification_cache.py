@@ -0,0 +1,80 @@
+# Content-addressed cache of LLM classifications, stored next to the listings table
+#
+# The key is a hash of everything that decides the answer - prompt templates, model,
+# labels, listing text and fields - so editing any of them is a cache miss rather
+# than a stale hit. Entries expire after a TTL, and the least recently used ones
+# are evicted once the table grows past its size limit.
+from app.integrations.database_manager import get_conn
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import hashlib
+import json
+import time
+
+CACHE_ENABLED = CONFIG["CLASSIFY_CACHE"]
+CACHE_TTL = CONFIG["CLASSIFY_CACHE_TTL_DAYS"] * 86400
+CACHE_MAX_ENTRIES = CONFIG["CLASSIFY_CACHE_MAX_ENTRIES"]
+
+# Hits and misses since the last reset_cache_stats(), for the run summary
+CACHE_STATS = {"hits": 0, "misses": 0}
+
+def cache_key(templates, model, labels, listing_text, fields):
+    payload = json.dumps([list(templates), model, list(labels), listing_text, fields], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_cached(keys, ttl=CACHE_TTL):
+    """key -> label for every fresh entry among keys; counts hits and misses"""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    conn = get_conn()
+    cutoff = time.time() - ttl
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        found.update(conn.execute(
+            f"SELECT key, label FROM classification_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+            chunk + [cutoff]
+        ).fetchall())
+    if found:
+        with conn:
+            conn.executemany("UPDATE classification_cache SET last_used = ? WHERE key = ?",
+                             [(time.time(), key) for key in found])
+    CACHE_STATS["hits"] += len(found)
+    CACHE_STATS["misses"] += len(keys) - len(found)
+    return found
+
+def put_cached(entries):
+    """Store key -> label pairs (errors are never cached)"""
+    now = time.time()
+    rows = [(key, label, now, now) for key, label in entries.items() if label and label != "error"]
+    if not rows:
+        return
+    conn = get_conn()
+    with conn:
+        conn.executemany("""
+            INSERT INTO classification_cache (key, label, created_at, last_used) VALUES (?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET label = excluded.label, created_at = excluded.created_at,
+                                           last_used = excluded.last_used
+        """, rows)
+
+def evict(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+    """Drop expired entries, then the least recently used ones beyond max_entries; returns how many"""
+    conn = get_conn()
+    with conn:
+        expired = conn.execute("DELETE FROM classification_cache WHERE created_at < ?",
+                               (time.time() - ttl,)).rowcount
+        overflow = conn.execute("""
+            DELETE FROM classification_cache WHERE key IN (
+                SELECT key FROM classification_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (max_entries,)).rowcount
+    if expired or overflow:
+        logger.info("Classification cache: evicted %d expired and %d least recently used entries", expired, overflow)
+    return expired + overflow
+
+def reset_cache_stats():
+    CACHE_STATS.update(hits=0, misses=0)
+
+def cache_report():
+    total = CACHE_STATS["hits"] + CACHE_STATS["misses"]
+    return dict(CACHE_STATS, hit_rate=round(CACHE_STATS["hits"] / total, 3) if total else 0.0)
@@ -1,8 +1,29 @@
 import openai
+from app.nlp.classification_cache import CACHE_ENABLED, cache_key, get_cached, put_cached, evict
+from app.nlp.rate_limiter import RateLimiter
 from app.utils.config_loader import CONFIG
 from app.utils.logger import logger
+import asyncio
+import json
+import random
+import re
+import time
 openai.api_key = CONFIG["OPENAI_API_KEY"]
 
+MODEL = CONFIG["OPENAI_MODEL"]
+BATCH_SIZE = CONFIG["CLASSIFY_BATCH_SIZE"]
+CONCURRENCY = CONFIG["CLASSIFY_CONCURRENCY"]
+MAX_RETRIES = CONFIG["CLASSIFY_MAX_RETRIES"]
+BACKOFF_BASE = CONFIG["CLASSIFY_BACKOFF_BASE"]
+BACKOFF_MAX = 60.0
+LABELS = ["development", "not_development", "maybe"]
+
+# Shared by every request in the process so the whole run stays inside the account's quota
+RATE_LIMITER = RateLimiter(CONFIG["OPENAI_REQUESTS_PER_MINUTE"], CONFIG["OPENAI_TOKENS_PER_MINUTE"])
+
+# Request counters since the last reset_classify_stats(), see classify_report()
+CLASSIFY_STATS = {}
+
 CLASSIFICATION_PROMPT = """
 You are a classifier. Given the property listing text and details, answer with one label: {labels}.
 Return only the label.
@@ -14,18 +35,229 @@ Fields:
 {fields}
 """
 
-def classify_listing(listing_text: str, fields: dict, labels=["development", "not_development", "maybe"]):
+BATCH_CLASSIFICATION_PROMPT = """
+You are a classifier. For each numbered property listing below, choose one label: {labels}.
+Return only a JSON object mapping every listing number to its label, like {{"1": "{example}", "2": "{example}"}}.
+
+{listings}
+"""
+
+BATCH_ITEM = """Listing {number}:
+Text: {listing_text}
+Fields: {fields}
+"""
+
+def listing_text_and_fields(listing: dict):
+    """The text and field summary a listing is classified on"""
+    raw_json = listing.get("raw_json", {})
+    if isinstance(raw_json, dict):
+        raw_text = json.dumps(raw_json)
+    else:
+        raw_text = str(raw_json) if raw_json else ""
+    listing_text = (listing.get("address") or "") + " " + raw_text
+    fields = {
+        "price": listing.get("price"),
+        "beds": listing.get("beds"),
+        "baths": listing.get("baths"),
+        "living_area": listing.get("living_area")
+    }
+    return listing_text, fields
+
+def listing_cache_key(listing_text, fields, labels=LABELS):
+    """Same key whether the listing ends up in a batch or a single request"""
+    return cache_key([CLASSIFICATION_PROMPT, BATCH_CLASSIFICATION_PROMPT, BATCH_ITEM], MODEL, labels, listing_text, fields)
+
+def reset_classify_stats():
+    CLASSIFY_STATS.clear()
+    CLASSIFY_STATS.update(listings=0, requests=0, retries=0, rate_limited=0, server_errors=0,
+                          failed_requests=0, prompt_tokens=0, completion_tokens=0,
+                          throttle_seconds=0.0, seconds=0.0)
+
+reset_classify_stats()
+
+def classify_report():
+    """Request counters plus throughput for the classification work since the last reset"""
+    seconds = CLASSIFY_STATS["seconds"]
+    return dict(
+        CLASSIFY_STATS,
+        seconds=round(seconds, 2),
+        throttle_seconds=round(CLASSIFY_STATS["throttle_seconds"], 2),
+        listings_per_second=round(CLASSIFY_STATS["listings"] / seconds, 2) if seconds else 0.0,
+        requests_per_minute=round(CLASSIFY_STATS["requests"] * 60 / seconds, 1) if seconds else 0.0,
+    )
+
+def _retry_kind(e):
+    """Stats key for a transient API error worth retrying, None for anything else"""
+    if isinstance(e, openai.error.RateLimitError):
+        return "rate_limited"
+    if isinstance(e, (openai.error.ServiceUnavailableError, openai.error.APIConnectionError,
+                      openai.error.Timeout, openai.error.TryAgain)):
+        return "server_errors"
+    if isinstance(e, openai.error.APIError) and (e.http_status or 0) >= 500:
+        return "server_errors"
+    return None
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter; a server-sent Retry-After is a lower bound"""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+def _retry_after(e):
+    try:
+        return float((getattr(e, "headers", None) or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+async def complete_async(prompt, max_tokens):
+    """
+    One completion through the shared rate limiter. 429s and 5xx responses are
+    retried with backoff up to MAX_RETRIES times; other errors raise at once.
+    """
+    estimated_tokens = len(prompt) // 4 + max_tokens
+    for attempt in range(MAX_RETRIES + 1):
+        CLASSIFY_STATS["throttle_seconds"] += await RATE_LIMITER.acquire(estimated_tokens)
+        CLASSIFY_STATS["requests"] += 1
+        try:
+            resp = await openai.Completion.acreate(
+                model=MODEL,
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=0
+            )
+        except Exception as e:
+            kind = _retry_kind(e)
+            if kind:
+                CLASSIFY_STATS[kind] += 1
+            if kind is None or attempt == MAX_RETRIES:
+                CLASSIFY_STATS["failed_requests"] += 1
+                raise
+            delay = backoff_delay(attempt, _retry_after(e))
+            CLASSIFY_STATS["retries"] += 1
+            logger.warning("OpenAI %s (attempt %d), retrying in %.1fs: %s", kind, attempt + 1, delay, e)
+            await asyncio.sleep(delay)
+            continue
+        usage = resp.get("usage") or {}
+        CLASSIFY_STATS["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        CLASSIFY_STATS["completion_tokens"] += usage.get("completion_tokens", 0)
+        return resp.choices[0].text
+
+async def classify_one_async(listing_text, fields, labels=LABELS):
     prompt = CLASSIFICATION_PROMPT.format(labels=", ".join(labels), listing_text=listing_text, fields=fields)
+    text = await complete_async(prompt, max_tokens=8)
+    label = text.strip().splitlines()[0] if text.strip() else ""
+    logger.info("OpenAI label: %s", label)
+    return label
+
+def classify_listing(listing_text: str, fields: dict, labels=LABELS, use_cache=CACHE_ENABLED):
+    if use_cache:
+        key = listing_cache_key(listing_text, fields, labels)
+        cached = get_cached([key])
+        if key in cached:
+            return cached[key]
     try:
-        resp = openai.Completion.create(
-            model="text-davinci-003",
-            prompt=prompt,
-            max_tokens=8,
-            temperature=0
-        )
-        label = resp.choices[0].text.strip().splitlines()[0]
-        logger.info("OpenAI label: %s", label)
-        return label
+        label = asyncio.run(classify_one_async(listing_text, fields, labels))
     except Exception as e:
+        # Transient failures were already retried; this is a persistent or non-retryable error
         logger.exception("OpenAI classify error: %s", e)
         return "error"
+    if use_cache:
+        put_cached({key: label})
+    return label
+
+def build_batch_prompt(items, labels=LABELS):
+    """items - list of (listing_text, fields); listings are numbered from 1"""
+    body = "\n".join(
+        BATCH_ITEM.format(number=n, listing_text=text, fields=fields)
+        for n, (text, fields) in enumerate(items, start=1)
+    )
+    return BATCH_CLASSIFICATION_PROMPT.format(labels=", ".join(labels), example=labels[0], listings=body)
+
+def parse_batch_labels(text, count, labels=LABELS):
+    """
+    Labels from a batch reply, in listing order. Entries that are missing or not
+    one of the allowed labels come back as None.
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    try:
+        answer = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        answer = {}
+    if not isinstance(answer, dict):
+        answer = {}
+    results = []
+    for n in range(1, count + 1):
+        label = answer.get(str(n))
+        label = label.strip() if isinstance(label, str) else None
+        results.append(label if label in labels else None)
+    return results
+
+async def classify_batch_async(items, labels=LABELS):
+    """One completion request for a batch of (listing_text, fields); returns a label (or None) per item"""
+    prompt = build_batch_prompt(items, labels)
+    # Room for '"12": "not_development", ' per listing
+    text = await complete_async(prompt, max_tokens=16 * len(items) + 16)
+    return parse_batch_labels(text, len(items), labels)
+
+async def classify_listings_async(listings, labels=LABELS, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                                  use_cache=CACHE_ENABLED):
+    """
+    Classify listing dicts in batches of batch_size, with at most `concurrency`
+    requests in flight. Returns labels in the same order as the listings.
+    Cached labels are used as-is, so only new or changed listings reach the API.
+    Listings a batch reply doesn't cover are retried on their own; a batch
+    request that fails outright leaves its listings labelled "error".
+    """
+    started = time.monotonic()
+    items = [listing_text_and_fields(listing) for listing in listings]
+    labels_out = [None] * len(items)
+
+    keys = [listing_cache_key(text, fields, labels) for text, fields in items] if use_cache else []
+    if use_cache:
+        cached = get_cached(keys)
+        labels_out = [cached.get(key) for key in keys]
+    todo = [i for i, label in enumerate(labels_out) if label is None]
+
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run_batch(indexes):
+        batch = [items[i] for i in indexes]
+        async with semaphore:
+            try:
+                batch_labels = await classify_batch_async(batch, labels)
+            except Exception as e:
+                logger.exception("OpenAI batch classify error: %s", e)
+                batch_labels = ["error"] * len(batch)
+        for i, label in zip(indexes, batch_labels):
+            labels_out[i] = label
+
+    batches = [todo[start:start + batch_size] for start in range(0, len(todo), batch_size)]
+    await asyncio.gather(*(run_batch(indexes) for indexes in batches))
+
+    missing = [i for i in todo if labels_out[i] is None]
+    if missing:
+        logger.warning("Batch replies left %d listings unlabelled, classifying them one at a time", len(missing))
+        for i in missing:
+            try:
+                labels_out[i] = await classify_one_async(*items[i], labels)
+            except Exception as e:
+                logger.exception("OpenAI classify error: %s", e)
+                labels_out[i] = "error"
+
+    if use_cache:
+        put_cached({keys[i]: labels_out[i] for i in todo})
+        evict()
+
+    CLASSIFY_STATS["listings"] += len(items)
+    CLASSIFY_STATS["seconds"] += time.monotonic() - started
+    logger.info("Classified %d listings (%d from cache) in %d batches: %s",
+                len(items), len(items) - len(todo), len(batches), classify_report())
+    return labels_out
+
+def classify_listings(listings, labels=LABELS, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                      use_cache=CACHE_ENABLED):
+    """Blocking wrapper around classify_listings_async"""
+    if not listings:
+        return []
+    return asyncio.run(classify_listings_async(listings, labels, batch_size, concurrency, use_cache))
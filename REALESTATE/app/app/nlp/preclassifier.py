@@ -0,0 +1,248 @@
+# Tiered classification: keyword rules, then a small local model, then the LLM
+#
+# Most listings are plainly not development leads (condos, new construction on
+# small lots). Those are decided locally; only listings neither tier is confident
+# about are sent to the LLM. The model is a logistic regression trained on the
+# labels the LLM already gave us, stored as JSON so it needs nothing beyond numpy.
+from app.nlp.openai_classifier import LABELS, classify_listings
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import datetime
+import json
+import math
+import numpy as np
+import os
+import random
+
+PRECLASSIFY = CONFIG["PRECLASSIFY"]
+THRESHOLD = CONFIG["PRECLASSIFY_THRESHOLD"]
+MODEL_PATH = CONFIG["PRECLASSIFY_MODEL_PATH"]
+
+DEVELOPMENT_KEYWORDS = [
+    "tear down", "tear-down", "teardown", "builder", "buildable", "subdivide", "subdivision",
+    "contractor special", "development opportunity", "developer", "vacant land", "land only",
+    "zoned for", "approved plans", "acre",
+]
+NOT_DEVELOPMENT_KEYWORDS = ["condo", "condominium", "co-op", "apartment", "unit #", "new construction"]
+NOT_DEVELOPMENT_HOME_TYPES = {"CONDO", "CONDOS", "APARTMENT", "TOWNHOUSE", "TOWNHOMES", "MANUFACTURED"}
+
+# How sure a keyword rule is; only used when the rules don't contradict each other
+RULE_CONFIDENCE = 0.95
+
+# The "age" feature of models saved before they recorded the year they were trained in
+LEGACY_REFERENCE_YEAR = 2025
+
+FEATURE_NAMES = [
+    "log_price", "no_price", "log_lot", "no_lot", "age", "no_year", "log_living", "no_living",
+    "lot_to_living", "development_words", "not_development_words",
+]
+
+def listing_text(listing):
+    raw = listing.get("raw_json")
+    raw_text = json.dumps(raw) if isinstance(raw, dict) else str(raw or "")
+    return " ".join([listing.get("description") or "", listing.get("address") or "", raw_text]).lower()
+
+def _home_type(listing):
+    raw = listing.get("raw_json")
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = None
+    home_type = listing.get("home_type") or (raw.get("home_type") if isinstance(raw, dict) else None)
+    return str(home_type).upper() if home_type else None
+
+def rule_label(listing):
+    """(label, confidence) when a keyword rule fires unambiguously, else None"""
+    text = listing_text(listing)
+    development = any(k in text for k in DEVELOPMENT_KEYWORDS)
+    not_development = _home_type(listing) in NOT_DEVELOPMENT_HOME_TYPES or any(k in text for k in NOT_DEVELOPMENT_KEYWORDS)
+    if development and not not_development:
+        return "development", RULE_CONFIDENCE
+    if not_development and not development:
+        return "not_development", RULE_CONFIDENCE
+    return None
+
+def simple_label(listing):
+    """
+    Price-tier label for the offline scripts that run without the LLM (run_complete_pipeline,
+    generate_csv): luxury-family, luxury-condo, mid-range or starter-home.
+    """
+    price = listing.get("price")
+    beds = listing.get("beds")
+    if price and price > 800000:
+        return "luxury-family" if beds and beds >= 4 else "luxury-condo"
+    if price and price > 500000:
+        return "mid-range"
+    return "starter-home"
+
+def features(listing, reference_year=None):
+    """
+    The model inputs for one listing. age counts back from reference_year - the year
+    the model was trained in, so a saved model keeps seeing the ages it learned on.
+    """
+    reference_year = reference_year or datetime.date.today().year
+    price = listing.get("price") or 0
+    lot = listing.get("lot_size") or 0
+    year = listing.get("year_built")
+    living = listing.get("living_area") or 0
+    text = listing_text(listing)
+    return [
+        math.log1p(price), float(not price),
+        math.log1p(lot), float(not lot),
+        (reference_year - year) / 50.0 if year else 0.0, float(not year),
+        math.log1p(living), float(not living),
+        math.log1p(lot / living) if lot and living else 0.0,
+        float(sum(k in text for k in DEVELOPMENT_KEYWORDS)),
+        float(sum(k in text for k in NOT_DEVELOPMENT_KEYWORDS)),
+    ]
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+def train_model(listings, epochs=2000, learning_rate=0.1, l2=0.01):
+    """
+    Fit P(development) on listings the LLM labelled "development" or "not_development".
+    Returns the model as a JSON-serialisable dict.
+    """
+    rows = [l for l in listings if l.get("classified_label") in ("development", "not_development")]
+    y = np.array([l["classified_label"] == "development" for l in rows], dtype=float)
+    if len(set(y)) < 2:
+        raise ValueError("need both development and not_development examples to train")
+    reference_year = datetime.date.today().year
+    X = np.array([features(l, reference_year) for l in rows])
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1.0
+    X = (X - mean) / std
+
+    weights = np.zeros(X.shape[1])
+    bias = 0.0
+    for _ in range(epochs):
+        error = _sigmoid(X @ weights + bias) - y
+        weights -= learning_rate * (X.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * error.mean()
+
+    return {"features": FEATURE_NAMES, "mean": mean.tolist(), "std": std.tolist(),
+            "weights": weights.tolist(), "bias": float(bias), "examples": len(rows),
+            "reference_year": reference_year}
+
+def save_model(model, path=MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(model, f, indent=2)
+
+def load_model(path=MODEL_PATH):
+    """The saved model, or None if none has been trained yet (or it was trained on other features)"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        model = json.load(f)
+    return model if model.get("features") == FEATURE_NAMES else None
+
+def development_probability(model, listings):
+    reference_year = model.get("reference_year", LEGACY_REFERENCE_YEAR)
+    X = np.array([features(l, reference_year) for l in listings])
+    X = (X - np.array(model["mean"])) / np.array(model["std"])
+    return _sigmoid(X @ np.array(model["weights"]) + model["bias"])
+
+def local_labels(listings, model=None, threshold=THRESHOLD):
+    """
+    (label or None, tier) per listing from the local tiers. tier is "rules",
+    "model" or None when the listing should go to the LLM.
+    """
+    results = [None] * len(listings)
+    undecided = []
+    for i, listing in enumerate(listings):
+        rule = rule_label(listing)
+        if rule and rule[1] >= threshold:
+            results[i] = (rule[0], "rules")
+        else:
+            undecided.append(i)
+
+    if model and undecided:
+        probabilities = development_probability(model, [listings[i] for i in undecided])
+        for i, p in zip(undecided, probabilities):
+            if p >= threshold:
+                results[i] = ("development", "model")
+            elif 1 - p >= threshold:
+                results[i] = ("not_development", "model")
+
+    return [r or (None, None) for r in results]
+
+def classify_listings_tiered(listings, model=None, threshold=THRESHOLD, **llm_kwargs):
+    """
+    Labels for listing dicts, in order. Local tiers decide what they are confident
+    about; everything else goes through classify_listings. Returns (labels, tier_counts).
+    """
+    model = model if model is not None else load_model()
+    local = local_labels(listings, model, threshold)
+    labels = [label for label, _ in local]
+    to_llm = [i for i, (label, _) in enumerate(local) if label is None]
+    if to_llm:
+        for i, label in zip(to_llm, classify_listings([listings[i] for i in to_llm], **llm_kwargs)):
+            labels[i] = label
+
+    tiers = {"rules": 0, "model": 0, "llm": len(to_llm)}
+    for _, tier in local:
+        if tier:
+            tiers[tier] += 1
+    logger.info("Tiered classification of %d listings: %s", len(listings), tiers)
+    return labels, tiers
+
+def classify(listings):
+    """Labels for listing dicts: through the local tiers when PRECLASSIFY is on, else all via the LLM"""
+    if PRECLASSIFY:
+        return classify_listings_tiered(listings)[0]
+    return classify_listings(listings)
+
+def evaluate(listings, model=None, thresholds=(0.8, 0.9, 0.95, 0.99)):
+    """
+    Compare the local tiers with the LLM labels already on the listings. For each
+    threshold: share of listings decided locally, accuracy of those decisions,
+    overall accuracy if the rest go to the LLM, and the factor of LLM calls saved.
+    """
+    rows = [l for l in listings if l.get("classified_label") in LABELS]
+    report = []
+    for threshold in thresholds:
+        local = local_labels(rows, model, threshold)
+        decided = [(label, row["classified_label"]) for (label, _), row in zip(local, rows) if label]
+        correct = sum(label == truth for label, truth in decided)
+        llm_calls = len(rows) - len(decided)
+        report.append({
+            "threshold": threshold,
+            "listings": len(rows),
+            "local_share": round(len(decided) / len(rows), 3) if rows else 0.0,
+            "local_accuracy": round(correct / len(decided), 3) if decided else None,
+            "overall_accuracy": round((correct + llm_calls) / len(rows), 3) if rows else None,
+            "llm_call_reduction": round(len(rows) / llm_calls, 1) if llm_calls else float("inf"),
+        })
+    return report
+
+def train_and_evaluate(listings, holdout=0.2, seed=7):
+    """Train on part of the labelled listings and evaluate on the rest; returns (model, report)"""
+    rows = [l for l in listings if l.get("classified_label") in LABELS]
+    random.Random(seed).shuffle(rows)
+    split = int(len(rows) * (1 - holdout))
+    model = train_model(rows[:split])
+    return model, evaluate(rows[split:], model)
+
+def format_report(report):
+    lines = [f"{'threshold':>9} {'local':>7} {'local acc':>9} {'overall acc':>11} {'fewer LLM calls':>15}"]
+    for r in report:
+        lines.append(f"{r['threshold']:>9} {r['local_share']:>7.1%} {r['local_accuracy'] or 0:>9.1%} "
+                     f"{r['overall_accuracy'] or 0:>11.1%} {r['llm_call_reduction']:>14}x")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # Train on the LLM labels already in the listings table and print the evaluation
+    from app.integrations.database_manager import init_db, get_conn
+    import sqlite3
+    init_db()
+    cur = get_conn().cursor()
+    cur.row_factory = sqlite3.Row
+    labelled = [dict(row) for row in cur.execute(
+        "SELECT * FROM listings WHERE classified_label IN ('development', 'not_development', 'maybe')")]
+    model, report = train_and_evaluate(labelled)
+    save_model(model)
+    logger.info("Saved pre-classifier trained on %d listings to %s", model["examples"], MODEL_PATH)
+    print(format_report(report))
@@ -0,0 +1,41 @@
+# Client-side rate limiting for the OpenAI API - requests/min and tokens/min token buckets
+import asyncio
+import threading
+import time
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 units a second up to capacity. reserve() never blocks:
+    it takes the units straight away (going into debt if need be) and returns how
+    long the caller must wait before using them, so waiters queue up fairly.
+    Thread-safe and not tied to any event loop.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+class RateLimiter:
+    """Both quotas must allow a request before it is sent"""
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens):
+        """Wait until one request of about `tokens` tokens fits both quotas; returns seconds waited"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
@@ -0,0 +1,57 @@
+# Rescore-only and reclassify-only runs over the stored listings table
+#
+# Neither scrapes anything: rows are streamed out of the listings table a chunk at a
+# time (keyset pagination on id), processed, and written back with one bulk UPDATE
+# per chunk, so memory stays bounded by the chunk size however large the table is.
+from app.utils.logger import logger
+from app.integrations.database_manager import LISTING_CHUNK_SIZE, init_db, iter_listing_chunks, update_listings
+from app.nlp.openai_classifier import reset_classify_stats, classify_report
+from app.nlp.classification_cache import reset_cache_stats, cache_report
+from app.nlp.preclassifier import classify
+from app.core.scoring_engine import rescore_table, score_frame
+import pandas as pd
+import time
+
+# What the classifiers and the scoring rules read from a stored listing
+RECLASSIFY_COLUMNS = [
+    "url", "address", "price", "beds", "baths", "living_area", "lot_size", "year_built",
+    "home_type", "description", "raw_json", "classified_label", "score",
+]
+
+def rescore_stored(chunk_size=LISTING_CHUNK_SIZE):
+    """New scores for every stored listing from the current scoring rules; returns how many changed"""
+    init_db()
+    return rescore_table(chunk_size=chunk_size)
+
+def reclassify_stored(labels=None, chunk_size=LISTING_CHUNK_SIZE):
+    """
+    Classify stored listings again and rescore them. labels limits it to listings
+    that currently have one of those labels (e.g. ["error"] to retry failures).
+    Listings whose text hasn't changed are answered from the classification cache.
+    Returns {"listings", "relabelled", "rescored"}.
+    """
+    init_db()
+    started = time.monotonic()
+    reset_cache_stats()
+    reset_classify_stats()
+    counts = {"listings": 0, "relabelled": 0, "rescored": 0}
+    for chunk in iter_listing_chunks(RECLASSIFY_COLUMNS, chunk_size, labels=labels):
+        old = [(l["classified_label"], l["score"]) for l in chunk]
+        for l, label in zip(chunk, classify(chunk)):
+            l["classified_label"] = label
+        scores = score_frame(pd.DataFrame(chunk)).tolist()
+
+        rows = []
+        for l, score, (old_label, old_score) in zip(chunk, scores, old):
+            if l["classified_label"] != old_label or score != old_score:
+                counts["relabelled"] += l["classified_label"] != old_label
+                counts["rescored"] += score != old_score
+                rows.append((l["classified_label"], score, l["id"]))
+        update_listings(["classified_label", "score"], rows)
+        counts["listings"] += len(chunk)
+        logger.info("Reclassified %d stored listings so far: %s", counts["listings"], counts)
+
+    logger.info("Reclassify finished in %.1fs: %s", time.monotonic() - started, counts)
+    logger.info("Classification cache: %s", cache_report())
+    logger.info("Classification throughput: %s", classify_report())
+    return counts
@@ -1,5 +1,6 @@
 from apscheduler.schedulers.blocking import BlockingScheduler
 from app.dev_pipeline import run_pipeline
+from app.scraper.browser_pool import shutdown_browser_pool
 import logging
 import pytz
 
@@ -9,13 +10,15 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 
 def start_scheduler():
     sched = BlockingScheduler(timezone=pytz.timezone("America/New_York"))
-    # Daily at 2am
+    # Daily at 2am; the scrapers' shared browser stays up in this process between runs
     sched.add_job(run_pipeline, "cron", hour=2, minute=0, id="daily_scan")
     try:
         logger.info("Scheduler starting")
         sched.start()
     except (KeyboardInterrupt, SystemExit):
         logger.info("Scheduler stopped")
+    finally:
+        shutdown_browser_pool()
 
 if __name__ == "__main__":
     start_scheduler()
@@ -0,0 +1,208 @@
+# Persistent crawl frontier - (source, city, page) tasks kept in the listings database
+#
+# A run is a set of tasks. Workers claim pending tasks one at a time, and each
+# finished task stores its listings next to it, so a killed process loses at most
+# the pages that were in flight: the next run resumes the unfinished one, unless
+# it is too old to be worth finishing. Once a run is over its tasks and stored
+# listings are deleted; only the crawl_runs row is kept.
+from app.integrations.database_manager import get_conn
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import json
+import time
+
+CRAWL_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS crawl_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    city TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    listings INTEGER,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (run_id, source, city, page)
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_tasks_claim ON crawl_tasks (run_id, status, page);
+CREATE TABLE IF NOT EXISTS crawl_results (
+    task_id INTEGER NOT NULL,
+    listing_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_results_task ON crawl_results (task_id);
+"""
+
+# pending -> running -> done | pending (retry) | failed (out of attempts)
+# pending -> skipped when incremental mode stops paginating a city early
+OPEN_STATUSES = ("pending", "running")
+# An unfinished run older than this is abandoned rather than resumed: its pages are stale
+RESUME_MAX_AGE_HOURS = CONFIG["CRAWL_RESUME_MAX_AGE_HOURS"]
+
+def init_crawl_queue():
+    get_conn().executescript(CRAWL_SCHEMA_SQL)
+
+def _prune_finished_runs(conn):
+    """Delete the tasks and stored listings of every run that is over"""
+    finished = "SELECT id FROM crawl_runs WHERE finished_at IS NOT NULL"
+    conn.execute(f"DELETE FROM crawl_results WHERE task_id IN (SELECT id FROM crawl_tasks WHERE run_id IN ({finished}))")
+    return conn.execute(f"DELETE FROM crawl_tasks WHERE run_id IN ({finished})").rowcount
+
+def open_run(tasks, max_age_hours=RESUME_MAX_AGE_HOURS):
+    """
+    Resume the newest unfinished run started less than max_age_hours ago, or start a
+    new one. Older unfinished runs are abandoned: closed, with their tasks deleted.
+    tasks - iterable of (source, city, page); ones the run already has are ignored.
+    Returns (run_id, resumed).
+    """
+    conn = get_conn()
+    with conn:
+        abandoned = conn.execute(
+            "UPDATE crawl_runs SET finished_at = CURRENT_TIMESTAMP "
+            "WHERE finished_at IS NULL AND started_at < datetime('now', ?)",
+            (f"-{max_age_hours * 3600:.0f} seconds",)
+        ).rowcount
+        if abandoned:
+            logger.warning("Abandoned %d crawl run(s) older than %gh instead of resuming them", abandoned, max_age_hours)
+        _prune_finished_runs(conn)
+        row = conn.execute("SELECT id FROM crawl_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        resumed = row is not None
+        if resumed:
+            run_id = row[0]
+            # Anything still marked running was in flight when the previous process died
+            orphaned = conn.execute(
+                "UPDATE crawl_tasks SET status = 'pending', available_at = 0 WHERE run_id = ? AND status = 'running'",
+                (run_id,)
+            ).rowcount
+            logger.info("Resuming crawl run %d (%d interrupted tasks requeued)", run_id, orphaned)
+        else:
+            run_id = conn.execute("INSERT INTO crawl_runs DEFAULT VALUES").lastrowid
+            logger.info("Started crawl run %d", run_id)
+        conn.executemany(
+            "INSERT OR IGNORE INTO crawl_tasks (run_id, source, city, page) VALUES (?, ?, ?, ?)",
+            [(run_id, source, city, page) for source, city, page in tasks]
+        )
+    return run_id, resumed
+
+def claim_task(run_id):
+    """
+    Atomically take the next runnable task (lowest page first, so every city's first
+    page is fetched before anyone's second). Returns a dict or None.
+    """
+    conn = get_conn()
+    with conn:
+        # Take the write lock before reading so two workers can't claim the same task
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("""
+            SELECT id, source, city, page, attempts FROM crawl_tasks
+            WHERE run_id = ? AND status = 'pending' AND available_at <= ?
+            ORDER BY page, id LIMIT 1
+        """, (run_id, time.time())).fetchone()
+        if row:
+            conn.execute("""
+                UPDATE crawl_tasks SET status = 'running', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (row[0],))
+    if not row:
+        return None
+    return {"id": row[0], "source": row[1], "city": row[2], "page": row[3], "attempt": row[4] + 1}
+
+def complete_task(task_id, listings):
+    """Store a task's listings and mark it done in one transaction"""
+    conn = get_conn()
+    with conn:
+        conn.execute("DELETE FROM crawl_results WHERE task_id = ?", (task_id,))
+        conn.executemany(
+            "INSERT INTO crawl_results (task_id, listing_json) VALUES (?, ?)",
+            [(task_id, json.dumps(listing, default=str)) for listing in listings]
+        )
+        conn.execute("""
+            UPDATE crawl_tasks SET status = 'done', listings = ?, last_error = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (len(listings), task_id))
+
+def skip_later_pages(run_id, source, city, page):
+    """Drop the not-yet-started pages after this one for a source and city; returns how many"""
+    conn = get_conn()
+    with conn:
+        skipped = conn.execute("""
+            UPDATE crawl_tasks SET status = 'skipped', updated_at = CURRENT_TIMESTAMP
+            WHERE run_id = ? AND source = ? AND city = ? AND page > ? AND status = 'pending'
+        """, (run_id, source, city, page)).rowcount
+    return skipped
+
+def fail_task(task_id, error, max_attempts, retry_delay):
+    """Requeue a failed task with exponential backoff, or give up once it is out of attempts"""
+    conn = get_conn()
+    with conn:
+        conn.execute("""
+            UPDATE crawl_tasks SET
+                status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                available_at = ? * (1 << (attempts - 1)) + ?,
+                last_error = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (max_attempts, retry_delay, time.time(), str(error)[:500], task_id))
+
+def run_progress(run_id):
+    """Task counts by status plus listings collected so far"""
+    conn = get_conn()
+    progress = {"pending": 0, "running": 0, "done": 0, "failed": 0, "skipped": 0}
+    for status, count in conn.execute(
+        "SELECT status, COUNT(*) FROM crawl_tasks WHERE run_id = ? GROUP BY status", (run_id,)
+    ):
+        progress[status] = count
+    progress["total"] = sum(progress.values())
+    progress["listings"] = conn.execute(
+        "SELECT COALESCE(SUM(listings), 0) FROM crawl_tasks WHERE run_id = ?", (run_id,)
+    ).fetchone()[0]
+    return progress
+
+def source_summary(run_id):
+    """source -> {"done", "failed", "open", "count"} for one run"""
+    rows = get_conn().execute("""
+        SELECT source,
+               SUM(status = 'done'), SUM(status = 'failed'), SUM(status IN ('pending', 'running')),
+               COALESCE(SUM(listings), 0)
+        FROM crawl_tasks WHERE run_id = ? GROUP BY source
+    """, (run_id,)).fetchall()
+    return {source: {"done": done, "failed": failed, "open": still_open, "count": count}
+            for source, done, failed, still_open, count in rows}
+
+def has_open_tasks(run_id):
+    row = get_conn().execute(
+        "SELECT 1 FROM crawl_tasks WHERE run_id = ? AND status IN (?, ?) LIMIT 1", (run_id,) + OPEN_STATUSES
+    ).fetchone()
+    return row is not None
+
+def run_listings(run_id):
+    """Every listing stored by the run's finished tasks, grouped by source"""
+    rows = get_conn().execute("""
+        SELECT t.source, r.listing_json FROM crawl_results r
+        JOIN crawl_tasks t ON t.id = r.task_id
+        WHERE t.run_id = ? ORDER BY t.id, r.rowid
+    """, (run_id,)).fetchall()
+    by_source = {}
+    for source, listing_json in rows:
+        by_source.setdefault(source, []).append(json.loads(listing_json))
+    return by_source
+
+def finish_run(run_id):
+    """
+    Close the run once nothing is left to do, deleting its tasks and stored listings -
+    read them with run_listings first. Returns True if it was closed.
+    """
+    if has_open_tasks(run_id):
+        return False
+    conn = get_conn()
+    with conn:
+        conn.execute("UPDATE crawl_runs SET finished_at = CURRENT_TIMESTAMP WHERE id = ?", (run_id,))
+        _prune_finished_runs(conn)
+    logger.info("Crawl run %d finished", run_id)
+    return True
@@ -1,7 +1,12 @@
 import sqlite3
+from contextlib import contextmanager
 from sqlite3 import Connection
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List
+from urllib.request import pathname2url
+import json
+import numpy as np
 import os
+import threading
 from app.utils.config_loader import CONFIG
 from app.utils.logger import logger
 
@@ -29,37 +34,597 @@ CREATE TABLE IF NOT EXISTS listings (
 );
 """
 
-def get_conn() -> Connection:
-    conn = sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
+# Numeric columns whose pairwise sums are kept in listing_moments (the correlation matrix).
+# Migration 7 is generated from these constants, so changing them means a new migration.
+ROLLUP_COLUMNS = ["price", "beds", "baths", "living_area", "score"]
+ROLLUP_PAIRS = [(a, b) for i, a in enumerate(ROLLUP_COLUMNS) for b in ROLLUP_COLUMNS[i:]]
+MOMENT_STATS = ["n", "sx", "sy", "sxx", "syy", "sxy"]
+# Width of the fine price bins in listing_price_bins; the dashboard regroups them for its histogram
+PRICE_BIN_WIDTH = 10000
+
+def moment_column(stat, a, b):
+    """listing_moments column holding one sum for the pair (a, b), e.g. sxy_price_beds"""
+    return f"{stat}_{a}_{b}"
+
+MOMENT_COLUMNS = [moment_column(stat, a, b) for a, b in ROLLUP_PAIRS for stat in MOMENT_STATS]
+
+def _rollup_key(row):
+    """The (source, label) group of a row; '' stands in for NULL so it can be part of a primary key"""
+    return f"IFNULL({row}.source, ''), IFNULL({row}.classified_label, '')"
+
+def _rollup_day(row):
+    return f"IFNULL(substr({row}.created_at, 1, 10), '')"
+
+def _rollup_group_match(row):
+    # Spelled exactly like the idx_listings_rollup_group expressions so SQLite uses the index
+    return (f"IFNULL(source, '') = IFNULL({row}.source, '') "
+            f"AND IFNULL(classified_label, '') = IFNULL({row}.classified_label, '') "
+            f"AND IFNULL(substr(created_at, 1, 10), '') = {_rollup_day(row)}")
+
+def _moment_terms(row, shift=None):
+    """
+    A row's contribution to each MOMENT_COLUMNS sum; zero for pairs where either value is
+    missing. With shift (the alias of the moment_shift row) values are taken relative to it.
+    """
+    terms = []
+    for a, b in ROLLUP_PAIRS:
+        both = f"({row}.{a} IS NOT NULL AND {row}.{b} IS NOT NULL)"
+        if shift:
+            x, y = f"IFNULL(({row}.{a} - {shift}.{a}) * 1.0, 0)", f"IFNULL(({row}.{b} - {shift}.{b}) * 1.0, 0)"
+        else:
+            x, y = f"IFNULL({row}.{a} * 1.0, 0)", f"IFNULL({row}.{b} * 1.0, 0)"
+        terms += [both, f"{both} * {x}", f"{both} * {y}", f"{both} * {x} * {x}", f"{both} * {y} * {y}",
+                  f"{both} * {x} * {y}"]
+    return terms
+
+def _fill_shift_sql(row):
+    """Trigger statement giving moment_shift the row's values for columns that have no shift yet"""
+    missing = " OR ".join(f"({c} IS NULL AND {row}.{c} IS NOT NULL)" for c in ROLLUP_COLUMNS)
+    return f"""
+        UPDATE moment_shift SET {", ".join(f"{c} = IFNULL({c}, {row}.{c})" for c in ROLLUP_COLUMNS)}
+        WHERE {missing};"""
+
+def _moments_sql(row, s, shift):
+    """The listing_moments statement of _rollup_sql; s is "" to add the row or "-" to remove it"""
+    if not shift:
+        return f"""
+        INSERT INTO listing_moments (source, label, listings, {", ".join(MOMENT_COLUMNS)})
+        VALUES ({_rollup_key(row)}, {s}1, {", ".join(f"{s}{t}" for t in _moment_terms(row))})
+        ON CONFLICT (source, label) DO UPDATE SET listings = listings + excluded.listings,
+            {", ".join(f"{c} = {c} + excluded.{c}" for c in MOMENT_COLUMNS)};"""
+    # A row being removed was counted, so its columns already have a shift
+    fill = _fill_shift_sql(row) if not s else ""
+    return f"""{fill}
+        INSERT INTO listing_moments (source, label, listings, {", ".join(MOMENT_COLUMNS)})
+        SELECT {_rollup_key(row)}, {s}1, {", ".join(f"{s}{t}" for t in _moment_terms(row, shift))}
+        FROM moment_shift AS {shift} WHERE true
+        ON CONFLICT (source, label) DO UPDATE SET listings = listings + excluded.listings,
+            {", ".join(f"{c} = {c} + excluded.{c}" for c in MOMENT_COLUMNS)};"""
+
+def _rollup_sql(row, sign, shift=None):
+    """
+    Trigger statements that add (sign 1) or remove (sign -1) one listing's contribution
+    to the rollup tables. Removing recomputes the group's price min/max when the row
+    held one, through idx_listings_rollup_group; groups that become empty are deleted.
+    """
+    s = "" if sign > 0 else "-"
+    group = (f"day = {_rollup_day(row)} AND source = IFNULL({row}.source, '') "
+             f"AND label = IFNULL({row}.classified_label, '')")
+    extreme = "NULL" if sign < 0 else f"{row}.price"
+    sql = f"""
+        INSERT INTO listing_rollups (day, source, label, listings, price_n, price_sum, price_min, price_max, score_n, score_sum)
+        VALUES ({_rollup_day(row)}, {_rollup_key(row)}, {s}1, {s}({row}.price IS NOT NULL), {s}IFNULL({row}.price, 0),
+                {extreme}, {extreme}, {s}({row}.score IS NOT NULL), {s}IFNULL({row}.score, 0))
+        ON CONFLICT (day, source, label) DO UPDATE SET
+            listings = listings + excluded.listings,
+            price_n = price_n + excluded.price_n, price_sum = price_sum + excluded.price_sum,
+            price_min = coalesce(min(price_min, excluded.price_min), price_min, excluded.price_min),
+            price_max = coalesce(max(price_max, excluded.price_max), price_max, excluded.price_max),
+            score_n = score_n + excluded.score_n, score_sum = score_sum + excluded.score_sum;
+        INSERT INTO listing_price_bins (source, label, bin, listings)
+        SELECT {_rollup_key(row)}, CAST({row}.price / {PRICE_BIN_WIDTH} AS INTEGER), {s}1 WHERE {row}.price IS NOT NULL
+        ON CONFLICT (source, label, bin) DO UPDATE SET listings = listings + excluded.listings;{_moments_sql(row, s, shift)}"""
+    if sign < 0:
+        sql += f"""
+        DELETE FROM listing_rollups WHERE {group} AND listings = 0;
+        UPDATE listing_rollups SET
+            price_min = (SELECT MIN(price) FROM listings WHERE {_rollup_group_match(row)}),
+            price_max = (SELECT MAX(price) FROM listings WHERE {_rollup_group_match(row)})
+        WHERE {group} AND {row}.price IS NOT NULL AND ({row}.price <= price_min OR {row}.price >= price_max);
+        DELETE FROM listing_price_bins WHERE source = IFNULL({row}.source, '')
+            AND label = IFNULL({row}.classified_label, '') AND bin = CAST({row}.price / {PRICE_BIN_WIDTH} AS INTEGER)
+            AND listings = 0;
+        DELETE FROM listing_moments WHERE source = IFNULL({row}.source, '')
+            AND label = IFNULL({row}.classified_label, '') AND listings = 0;"""
+    return sql
+
+def _rollup_change_sql(shift=None):
+    """
+    Trigger statements for an update that keeps the row in its (day, source, label)
+    group: the old values' contribution is swapped for the new one in place.
+    """
+    group = ("day = IFNULL(substr(NEW.created_at, 1, 10), '') AND source = IFNULL(NEW.source, '') "
+             "AND label = IFNULL(NEW.classified_label, '')")
+    old_bin, new_bin = (f"CAST({row}.price / {PRICE_BIN_WIDTH} AS INTEGER)" for row in ("OLD", "NEW"))
+    moments = ", ".join(f"{c} = {c} + {new} - {old}" for c, old, new in
+                        zip(MOMENT_COLUMNS, _moment_terms("OLD", shift), _moment_terms("NEW", shift)))
+    fill, shift_from = (_fill_shift_sql("NEW"), f" FROM moment_shift AS {shift}") if shift else ("", "")
+    return f"""
+        UPDATE listing_rollups SET
+            price_n = price_n + (NEW.price IS NOT NULL) - (OLD.price IS NOT NULL),
+            price_sum = price_sum + IFNULL(NEW.price, 0) - IFNULL(OLD.price, 0),
+            price_min = coalesce(min(price_min, NEW.price), price_min, NEW.price),
+            price_max = coalesce(max(price_max, NEW.price), price_max, NEW.price),
+            score_n = score_n + (NEW.score IS NOT NULL) - (OLD.score IS NOT NULL),
+            score_sum = score_sum + IFNULL(NEW.score, 0) - IFNULL(OLD.score, 0)
+        WHERE {group};
+        UPDATE listing_rollups SET
+            price_min = (SELECT MIN(price) FROM listings WHERE {_rollup_group_match("NEW")}),
+            price_max = (SELECT MAX(price) FROM listings WHERE {_rollup_group_match("NEW")})
+        WHERE {group} AND OLD.price IS NOT NEW.price AND (OLD.price <= price_min OR OLD.price >= price_max);
+        INSERT INTO listing_price_bins (source, label, bin, listings)
+        SELECT {_rollup_key("OLD")}, {old_bin}, -1 WHERE OLD.price IS NOT NULL AND {old_bin} IS NOT {new_bin}
+        ON CONFLICT (source, label, bin) DO UPDATE SET listings = listings + excluded.listings;
+        INSERT INTO listing_price_bins (source, label, bin, listings)
+        SELECT {_rollup_key("NEW")}, {new_bin}, 1 WHERE NEW.price IS NOT NULL AND {old_bin} IS NOT {new_bin}
+        ON CONFLICT (source, label, bin) DO UPDATE SET listings = listings + excluded.listings;
+        DELETE FROM listing_price_bins WHERE source = IFNULL(OLD.source, '')
+            AND label = IFNULL(OLD.classified_label, '') AND bin = {old_bin} AND listings = 0;{fill}
+        UPDATE listing_moments SET {moments}{shift_from}
+        WHERE source = IFNULL(NEW.source, '') AND label = IFNULL(NEW.classified_label, '');"""
+
+def _rollup_triggers(guard=None, shift=None):
+    """
+    The rollup triggers; guard is an extra WHEN condition every one of them must meet, and
+    shift the alias under which listing_moments terms read moment_shift (None: no shift)
+    """
+    changed = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in ROLLUP_COLUMNS)
+    regrouped = " OR ".join(f"{key.replace('ROW', 'OLD')} IS NOT {key.replace('ROW', 'NEW')}" for key in
+                            ["ROW.source", "ROW.classified_label", "substr(ROW.created_at, 1, 10)"])
+    guarded = f"{guard} AND " if guard else ""
+    when = f"\n    WHEN {guard}" if guard else ""
+    return f"""
+    CREATE TRIGGER listings_rollup_insert AFTER INSERT ON listings{when}
+    BEGIN{_rollup_sql("NEW", 1, shift)}
+    END;
+    CREATE TRIGGER listings_rollup_delete AFTER DELETE ON listings{when}
+    BEGIN{_rollup_sql("OLD", -1, shift)}
+    END;
+    CREATE TRIGGER listings_rollup_regroup AFTER UPDATE ON listings
+    WHEN {guarded}({regrouped})
+    BEGIN{_rollup_sql("OLD", -1, shift)}{_rollup_sql("NEW", 1, shift)}
+    END;
+    CREATE TRIGGER listings_rollup_update AFTER UPDATE ON listings
+    WHEN {guarded}NOT ({regrouped}) AND ({changed})
+    BEGIN{_rollup_change_sql(shift)}
+    END;
+    """
+
+def _rollups_migration():
+    return f"""
+    CREATE TABLE listing_rollups (
+        day TEXT NOT NULL,
+        source TEXT NOT NULL,
+        label TEXT NOT NULL,
+        listings INTEGER NOT NULL,
+        price_n INTEGER NOT NULL,
+        price_sum NUMERIC NOT NULL,
+        price_min NUMERIC,
+        price_max NUMERIC,
+        score_n INTEGER NOT NULL,
+        score_sum REAL NOT NULL,
+        PRIMARY KEY (day, source, label)
+    ) WITHOUT ROWID;
+    CREATE TABLE listing_price_bins (
+        source TEXT NOT NULL,
+        label TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        listings INTEGER NOT NULL,
+        PRIMARY KEY (source, label, bin)
+    ) WITHOUT ROWID;
+    CREATE TABLE listing_moments (
+        source TEXT NOT NULL,
+        label TEXT NOT NULL,
+        listings INTEGER NOT NULL,
+        {"".join(f"{c} REAL NOT NULL, " for c in MOMENT_COLUMNS)}
+        PRIMARY KEY (source, label)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_listings_rollup_group ON listings (
+        IFNULL(source, ''), IFNULL(classified_label, ''), IFNULL(substr(created_at, 1, 10), ''), price);
+    INSERT INTO listing_rollups
+    SELECT IFNULL(substr(created_at, 1, 10), ''), IFNULL(source, ''), IFNULL(classified_label, ''),
+           COUNT(*), COUNT(price), IFNULL(SUM(price), 0), MIN(price), MAX(price), COUNT(score), TOTAL(score)
+    FROM listings GROUP BY 1, 2, 3;
+    INSERT INTO listing_price_bins
+    SELECT IFNULL(source, ''), IFNULL(classified_label, ''), CAST(price / {PRICE_BIN_WIDTH} AS INTEGER), COUNT(*)
+    FROM listings WHERE price IS NOT NULL GROUP BY 1, 2, 3;
+    INSERT INTO listing_moments
+    SELECT IFNULL(source, ''), IFNULL(classified_label, ''), COUNT(*),
+           {", ".join(f"TOTAL({t})" for t in _moment_terms("listings"))}
+    FROM listings GROUP BY 1, 2;{_rollup_triggers()}"""
+
+# Columns a listing's rollup contribution depends on
+ROLLUP_SNAPSHOT_COLUMNS = ["source", "classified_label", "created_at"] + ROLLUP_COLUMNS
+
+@contextmanager
+def deferred_rollups(conn: Connection, key: str, values: Iterable[Any]):
+    """
+    Maintain the rollups for a bulk write once per batch instead of per row. Use inside
+    the write's transaction, around the write: the rows whose `key` column ("url" or
+    "id") is in values - plus any inserted - are read before and after, the triggers
+    stand down in between, and the difference is folded into the rollup tables.
+    Rows whose rollup columns didn't change cost nothing.
+    """
+    # Take the write lock before the snapshot: another writer changing these rows between
+    # the snapshot and the write would leave its change counted twice or not at all
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'rollup_control'").fetchone():
+        yield  # a database from before the rollups
+        return
+    snapshot = f"SELECT id, {', '.join(ROLLUP_SNAPSHOT_COLUMNS)} FROM listings"
+    keys = json.dumps([v for v in values if v is not None])
+    matching = f"{snapshot} WHERE {key} IN (SELECT value FROM json_each(?))"
+    before = {row[0]: row[1:] for row in conn.execute(matching, (keys,))}
+    last_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM listings").fetchone()[0]
+    conn.execute("UPDATE rollup_control SET deferred = 1")
+    yield
+    conn.execute("UPDATE rollup_control SET deferred = 0")
+    after = {row[0]: row[1:] for row in conn.execute(f"{matching} UNION ALL {snapshot} WHERE id > ?", (keys, last_id))}
+    delta = []
+    for row_id in before.keys() | after.keys():
+        old, new = before.get(row_id), after.get(row_id)
+        if old != new:
+            delta += [(-1, *old)] if old else []
+            delta += [(1, *new)] if new else []
+    if delta:
+        _apply_rollup_delta(conn, delta)
+
+ROLLUP_DELTA_SQL = """
+INSERT INTO listing_rollups (day, source, label, listings, price_n, price_sum, price_min, price_max, score_n, score_sum)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, source, label) DO UPDATE SET
+    listings = listings + excluded.listings,
+    price_n = price_n + excluded.price_n, price_sum = price_sum + excluded.price_sum,
+    price_min = coalesce(min(price_min, excluded.price_min), price_min, excluded.price_min),
+    price_max = coalesce(max(price_max, excluded.price_max), price_max, excluded.price_max),
+    score_n = score_n + excluded.score_n, score_sum = score_sum + excluded.score_sum
+"""
+# Groups that lost a row holding their min or max price get them recomputed
+ROLLUP_RECOMPUTE_SQL = """
+UPDATE listing_rollups SET
+    price_min = (SELECT MIN(price) FROM listings WHERE IFNULL(source, '') = listing_rollups.source
+                 AND IFNULL(classified_label, '') = listing_rollups.label
+                 AND IFNULL(substr(created_at, 1, 10), '') = listing_rollups.day),
+    price_max = (SELECT MAX(price) FROM listings WHERE IFNULL(source, '') = listing_rollups.source
+                 AND IFNULL(classified_label, '') = listing_rollups.label
+                 AND IFNULL(substr(created_at, 1, 10), '') = listing_rollups.day)
+WHERE day = ? AND source = ? AND label = ? AND (? <= price_min OR ? >= price_max)
+"""
+PRICE_BINS_DELTA_SQL = """
+INSERT INTO listing_price_bins (source, label, bin, listings) VALUES (?, ?, ?, ?)
+ON CONFLICT (source, label, bin) DO UPDATE SET listings = listings + excluded.listings
+"""
+MOMENTS_DELTA_SQL = f"""
+INSERT INTO listing_moments (source, label, listings, {", ".join(MOMENT_COLUMNS)})
+VALUES (?, ?, ?, {", ".join("?" * len(MOMENT_COLUMNS))})
+ON CONFLICT (source, label) DO UPDATE SET listings = listings + excluded.listings,
+    {", ".join(f"{c} = {c} + excluded.{c}" for c in MOMENT_COLUMNS)}
+"""
+
+def _apply_rollup_delta(conn: Connection, delta: List[tuple]):
+    """
+    Fold signed snapshot rows - (-1, *old values) and (1, *new values), laid out as
+    ROLLUP_SNAPSHOT_COLUMNS - into the rollup tables, matching what the triggers do row by row.
+    """
+    groups, bins, removed = {}, {}, {}
+    for sign, source, label, created_at, price, beds, baths, living_area, score in delta:
+        source, label = source if source is not None else "", label if label is not None else ""
+        day = created_at[:10] if created_at is not None else ""
+        g = groups.setdefault((day, source, label), [0, 0, 0, None, None, 0, 0.0])
+        g[0] += sign
+        g[5] += sign * (score is not None)
+        g[6] += sign * (score or 0)
+        if price is None:
+            continue
+        g[1] += sign
+        g[2] += sign * price
+        if sign > 0:
+            g[3] = price if g[3] is None else min(g[3], price)
+            g[4] = price if g[4] is None else max(g[4], price)
+        else:
+            low, high = removed.get((day, source, label), (price, price))
+            removed[(day, source, label)] = (min(low, price), max(high, price))
+        price_bin = (source, label, int(price / PRICE_BIN_WIDTH))
+        bins[price_bin] = bins.get(price_bin, 0) + sign
+    conn.executemany(ROLLUP_DELTA_SQL, [(*group, *totals) for group, totals in groups.items()])
+    conn.executemany(ROLLUP_RECOMPUTE_SQL, [(*group, low, high) for group, (low, high) in removed.items()])
+    conn.execute("DELETE FROM listing_rollups WHERE listings = 0")
+    conn.executemany(PRICE_BINS_DELTA_SQL, [(*price_bin, n) for price_bin, n in bins.items() if n])
+    conn.execute("DELETE FROM listing_price_bins WHERE listings = 0")
+    _apply_moment_delta(conn, delta)
+
+def _apply_moment_delta(conn: Connection, delta: List[tuple]):
+    """
+    The listing_moments part of _apply_rollup_delta. Its 90 signed sums per (source, label)
+    are one matrix product in numpy; as SQL aggregates they cost more than the write itself.
+    """
+    groups = {}
+    index = [groups.setdefault((source if source is not None else "", label if label is not None else ""),
+                               len(groups)) for _, source, label, *_ in delta]
+    data = np.array([(sign, *row[3:]) for sign, *row in delta], dtype=float)  # None becomes NaN
+    sign, values = data[:, 0], data[:, 1:]
+    present = ~np.isnan(values)
+    # Columns without a shift yet take the first value this write brings, like _fill_shift_sql
+    shift = np.array(conn.execute(f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM moment_shift").fetchone(), dtype=float)
+    missing = np.isnan(shift) & present.any(axis=0)
+    if missing.any():
+        shift[missing] = values[present[:, missing].argmax(axis=0), np.flatnonzero(missing)]
+        conn.execute(f"UPDATE moment_shift SET {', '.join(f'{c} = IFNULL({c}, ?)' for c in ROLLUP_COLUMNS)}",
+                     [None if np.isnan(s) else float(s) for s in shift])
+    values = np.where(present, values - shift, 0.0)
+    first = [ROLLUP_COLUMNS.index(a) for a, _ in ROLLUP_PAIRS]
+    second = [ROLLUP_COLUMNS.index(b) for _, b in ROLLUP_PAIRS]
+    # Per row and pair: the signed weight (0 unless both values are present) and the six MOMENT_STATS terms
+    weight = sign[:, None] * present[:, first] * present[:, second]
+    x, y = values[:, first], values[:, second]
+    terms = np.stack([weight, weight * x, weight * y, weight * x * x, weight * y * y, weight * x * y], axis=2)
+    members = np.zeros((len(groups), len(delta)))
+    members[index, np.arange(len(delta))] = 1.0
+    totals = members @ terms.reshape(len(delta), -1)
+    counts = members @ sign
+    conn.executemany(MOMENTS_DELTA_SQL, [(source, label, round(count), *total.tolist())
+                                         for (source, label), count, total in zip(groups, counts, totals)])
+    conn.execute("DELETE FROM listing_moments WHERE listings = 0")
+
+# Schema migrations, applied in order by init_db. PRAGMA user_version holds the
+# number already applied, so each one runs exactly once per database. Only ever
+# append to this list - never edit a migration that has shipped.
+MIGRATIONS = [
+    # 1: the original listings table
+    SCHEMA_SQL,
+    # 2: indexes for the dashboard's sort order and filters
+    """
+    CREATE INDEX IF NOT EXISTS idx_listings_created_at ON listings (created_at);
+    CREATE INDEX IF NOT EXISTS idx_listings_source_created_at ON listings (source, created_at);
+    CREATE INDEX IF NOT EXISTS idx_listings_label ON listings (classified_label);
+    CREATE INDEX IF NOT EXISTS idx_listings_score ON listings (score);
+    CREATE INDEX IF NOT EXISTS idx_listings_price ON listings (price);
+    """,
+    # 3: typed columns for fields that only lived inside raw_json, backfilled from it
+    """
+    ALTER TABLE listings ADD COLUMN external_id TEXT;
+    ALTER TABLE listings ADD COLUMN home_type TEXT;
+    ALTER TABLE listings ADD COLUMN list_date TEXT;
+    ALTER TABLE listings ADD COLUMN description TEXT;
+    ALTER TABLE listings ADD COLUMN extraction TEXT;
+    ALTER TABLE listings ADD COLUMN updated_at TEXT;
+    UPDATE listings SET
+        external_id = COALESCE(json_extract(raw_json, '$.zpid'), json_extract(raw_json, '$.property_id')),
+        home_type = json_extract(raw_json, '$.home_type'),
+        list_date = json_extract(raw_json, '$.list_date'),
+        extraction = json_extract(raw_json, '$.extraction')
+    WHERE json_valid(raw_json);
+    UPDATE listings SET updated_at = created_at;
+    CREATE INDEX IF NOT EXISTS idx_listings_home_type ON listings (home_type);
+    """,
+    # 4: append-only price/status history, written by triggers so bulk upserts stay one executemany.
+    # Only real changes are recorded; a missing value on either side is not a change.
+    """
+    CREATE TABLE listing_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        listing_id INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        field TEXT NOT NULL,
+        old_value,
+        new_value,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_listing_events_field_created_at ON listing_events (field, created_at);
+    CREATE INDEX idx_listing_events_listing ON listing_events (listing_id, created_at);
+    CREATE TRIGGER listings_price_event AFTER UPDATE OF price ON listings
+    WHEN OLD.price IS NOT NULL AND NEW.price IS NOT NULL AND OLD.price != NEW.price
+    BEGIN
+        INSERT INTO listing_events (listing_id, url, field, old_value, new_value)
+        VALUES (NEW.id, NEW.url, 'price', OLD.price, NEW.price);
+    END;
+    CREATE TRIGGER listings_status_event AFTER UPDATE OF status ON listings
+    WHEN OLD.status IS NOT NULL AND NEW.status IS NOT NULL AND OLD.status != NEW.status
+    BEGIN
+        INSERT INTO listing_events (listing_id, url, field, old_value, new_value)
+        VALUES (NEW.id, NEW.url, 'status', OLD.status, NEW.status);
+    END;
+    """,
+    # 5: content-addressed cache of LLM classifications (see nlp/classification_cache)
+    """
+    CREATE TABLE classification_cache (
+        key TEXT PRIMARY KEY,
+        label TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX idx_classification_cache_last_used ON classification_cache (last_used);
+    """,
+    # 6: full-text search over address, description, label and the searchable raw_json
+    # details. External-content FTS5 (the text lives only in listings), kept in step by
+    # triggers so every write path - bulk upserts included - maintains it.
+    """
+    ALTER TABLE listings ADD COLUMN search_details TEXT GENERATED ALWAYS AS (
+        trim(coalesce(home_type, '') || ' ' || coalesce(status, '') || ' ' || coalesce(source, '') || ' ' ||
+             coalesce(CASE WHEN json_valid(raw_json) THEN json_extract(raw_json, '$.price_text') END, ''))
+    ) VIRTUAL;
+    CREATE VIRTUAL TABLE listings_fts USING fts5(
+        address, description, classified_label, search_details,
+        content='listings', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 2 tokenchars '_'", prefix='2 3'
+    );
+    INSERT INTO listings_fts (listings_fts) VALUES ('rebuild');
+    CREATE TRIGGER listings_fts_insert AFTER INSERT ON listings BEGIN
+        INSERT INTO listings_fts (rowid, address, description, classified_label, search_details)
+        VALUES (NEW.id, NEW.address, NEW.description, NEW.classified_label, NEW.search_details);
+    END;
+    CREATE TRIGGER listings_fts_delete AFTER DELETE ON listings BEGIN
+        INSERT INTO listings_fts (listings_fts, rowid, address, description, classified_label, search_details)
+        VALUES ('delete', OLD.id, OLD.address, OLD.description, OLD.classified_label, OLD.search_details);
+    END;
+    CREATE TRIGGER listings_fts_update AFTER UPDATE ON listings
+    WHEN OLD.address IS NOT NEW.address OR OLD.description IS NOT NEW.description
+      OR OLD.classified_label IS NOT NEW.classified_label OR OLD.search_details IS NOT NEW.search_details
+    BEGIN
+        INSERT INTO listings_fts (listings_fts, rowid, address, description, classified_label, search_details)
+        VALUES ('delete', OLD.id, OLD.address, OLD.description, OLD.classified_label, OLD.search_details);
+        INSERT INTO listings_fts (rowid, address, description, classified_label, search_details)
+        VALUES (NEW.id, NEW.address, NEW.description, NEW.classified_label, NEW.search_details);
+    END;
+    """,
+    # 7: aggregate rollups for the dashboard - counts and price/score sums per day, source
+    # and label, fine price bins, and pairwise sums for correlations - backfilled, then kept
+    # current by triggers on every insert, update and delete (see _rollup_sql)
+    _rollups_migration(),
+    # 8: bulk writes maintain the rollups per batch (see deferred_rollups); the per-row
+    # triggers stand down while rollup_control.deferred is set inside such a write
+    f"""
+    CREATE TABLE rollup_control (deferred INTEGER NOT NULL);
+    INSERT INTO rollup_control VALUES (0);
+    DROP TRIGGER listings_rollup_insert;
+    DROP TRIGGER listings_rollup_delete;
+    DROP TRIGGER listings_rollup_regroup;
+    DROP TRIGGER listings_rollup_update;
+    {_rollup_triggers("NOT (SELECT deferred FROM rollup_control)")}
+    """,
+    # 9: listing_moments sums are taken around a stored shift per column - its mean when
+    # migrated, else the first value stored - instead of zero, so sxx - sx*sx/n doesn't
+    # cancel away the precision of the correlations. A shift is set once and never moves.
+    f"""
+    CREATE TABLE moment_shift ({", ".join(f"{c} REAL" for c in ROLLUP_COLUMNS)});
+    INSERT INTO moment_shift SELECT {", ".join(f"AVG({c})" for c in ROLLUP_COLUMNS)} FROM listings;
+    DELETE FROM listing_moments;
+    INSERT INTO listing_moments
+    SELECT IFNULL(listings.source, ''), IFNULL(listings.classified_label, ''), COUNT(*),
+           {", ".join(f"TOTAL({t})" for t in _moment_terms("listings", "s"))}
+    FROM listings, moment_shift AS s GROUP BY 1, 2;
+    DROP TRIGGER listings_rollup_insert;
+    DROP TRIGGER listings_rollup_delete;
+    DROP TRIGGER listings_rollup_regroup;
+    DROP TRIGGER listings_rollup_update;
+    {_rollup_triggers("NOT (SELECT deferred FROM rollup_control)", shift="s")}
+    """,
+]
+
+# Applied to every connection. WAL lets the dashboard read while a pipeline run
+# writes; synchronous=NORMAL is safe under WAL and avoids an fsync per commit.
+SQLITE_PRAGMAS = {
+    "synchronous": CONFIG["SQLITE_SYNCHRONOUS"],
+    "cache_size": -CONFIG["SQLITE_CACHE_SIZE_KB"],  # negative means KiB rather than pages
+    "mmap_size": CONFIG["SQLITE_MMAP_SIZE_MB"] * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+BUSY_TIMEOUT = 30  # seconds to wait on a lock before "database is locked"
+
+_local = threading.local()
+
+def connect(path: str = None, read_only: bool = False) -> Connection:
+    """Open a new tuned connection; read-only ones go through a mode=ro URI"""
+    path = path or DB_PATH
+    if read_only:
+        target = f"file:{pathname2url(os.path.abspath(path))}?mode=ro"
+    else:
+        target = path
+    conn = sqlite3.connect(target, uri=read_only, timeout=BUSY_TIMEOUT,
+                           detect_types=sqlite3.PARSE_DECLTYPES|sqlite3.PARSE_COLNAMES)
+    if not read_only:
+        # Stored in the database file, so readers see WAL mode too
+        conn.execute("PRAGMA journal_mode=WAL")
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma}={value}")
     return conn
 
+def _pooled(read_only: bool) -> Connection:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = (DB_PATH, read_only)
+    if key not in conns:
+        conns[key] = connect(DB_PATH, read_only)
+    return conns[key]
+
+def get_conn() -> Connection:
+    """
+    This thread's reusable read-write connection. Don't close it; wrap writes
+    in `with conn:` so they commit (or roll back) as one transaction.
+    """
+    return _pooled(read_only=False)
+
+def get_read_conn() -> Connection:
+    """This thread's reusable read-only connection (for the dashboard and reports)"""
+    return _pooled(read_only=True)
+
+def close_conns():
+    """Close the calling thread's pooled connections"""
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+def schema_version(conn: Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn: Connection) -> int:
+    """Apply pending migrations, each in its own transaction; returns the schema version"""
+    version = schema_version(conn)
+    for number, sql in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            conn.executescript(f"BEGIN;\n{sql}\nPRAGMA user_version = {number};\nCOMMIT;")
+        except Exception:
+            conn.rollback()
+            logger.exception("Schema migration %d failed", number)
+            raise
+        logger.info("Applied schema migration %d", number)
+    return len(MIGRATIONS)
+
 def init_db():
-    conn = get_conn()
-    conn.executescript(SCHEMA_SQL)
-    conn.commit()
-    conn.close()
-    logger.info("Database initialized at %s", DB_PATH)
+    version = migrate(get_conn())
+    logger.info("Database initialized at %s (schema version %d)", DB_PATH, version)
 
-def upsert_listing(listing: Dict[str, Any]):
-    conn = get_conn()
-    cur = conn.cursor()
-    # Basic upsert pattern by URL uniqueness
-    cur.execute("""
-    INSERT INTO listings (source, url, address, price, beds, baths, living_area, lot_size, year_built, dom, status, raw_json, score, classified_label)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ON CONFLICT(url) DO UPDATE SET
-        price=excluded.price,
-        beds=excluded.beds,
-        baths=excluded.baths,
-        living_area=excluded.living_area,
-        lot_size=excluded.lot_size,
-        year_built=excluded.year_built,
-        dom=excluded.dom,
-        status=excluded.status,
-        raw_json=excluded.raw_json,
-        score=excluded.score,
-        classified_label=excluded.classified_label;
-    """, (
+UPSERT_SQL = """
+INSERT INTO listings (source, url, address, price, beds, baths, living_area, lot_size, year_built, dom, status, raw_json, score, classified_label,
+                      external_id, home_type, list_date, description, extraction, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+ON CONFLICT(url) DO UPDATE SET
+    price=excluded.price,
+    beds=excluded.beds,
+    baths=excluded.baths,
+    living_area=excluded.living_area,
+    lot_size=excluded.lot_size,
+    year_built=excluded.year_built,
+    dom=excluded.dom,
+    status=excluded.status,
+    raw_json=excluded.raw_json,
+    score=excluded.score,
+    classified_label=excluded.classified_label,
+    external_id=excluded.external_id,
+    home_type=excluded.home_type,
+    list_date=excluded.list_date,
+    description=excluded.description,
+    extraction=excluded.extraction,
+    updated_at=CURRENT_TIMESTAMP;
+"""
+
+UPSERT_BATCH_SIZE = CONFIG["UPSERT_BATCH_SIZE"]
+LISTING_CHUNK_SIZE = CONFIG["LISTING_CHUNK_SIZE"]
+
+def _raw_fields(listing: Dict[str, Any]) -> Dict[str, Any]:
+    raw = listing.get("raw_json")
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = None
+    return raw if isinstance(raw, dict) else {}
+
+def _upsert_params(listing: Dict[str, Any]):
+    raw = _raw_fields(listing)
+    external_id = raw.get("zpid") or raw.get("property_id")
+    return (
         listing.get("source"),
         listing.get("url"),
         listing.get("address"),
@@ -73,8 +638,127 @@ def upsert_listing(listing: Dict[str, Any]):
         listing.get("status"),
         listing.get("raw_json"),
         listing.get("score"),
-        listing.get("classified_label")
-    ))
-    conn.commit()
-    conn.close()
-    logger.info("Upserted listing: %s", listing.get("url"))
\ No newline at end of file
+        listing.get("classified_label"),
+        str(external_id) if external_id is not None else None,
+        raw.get("home_type"),
+        raw.get("list_date"),
+        listing.get("description"),
+        raw.get("extraction")
+    )
+
+def upsert_listing(listing: Dict[str, Any]):
+    conn = get_conn()
+    # Basic upsert pattern by URL uniqueness
+    with conn:
+        conn.execute(UPSERT_SQL, _upsert_params(listing))
+    logger.info("Upserted listing: %s", listing.get("url"))
+
+def upsert_listings(listings: Iterable[Dict[str, Any]], batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """
+    Upsert many listings over one connection: one executemany and one commit per batch
+    instead of a connect/commit per listing. Returns the number of listings written.
+    """
+    conn = get_conn()
+    total = 0
+    for batch in _batches(listings, batch_size):
+        with conn:  # one transaction per batch, rolled back if any row fails
+            with deferred_rollups(conn, "url", [l.get("url") for l in batch]):
+                conn.executemany(UPSERT_SQL, [_upsert_params(l) for l in batch])
+        total += len(batch)
+    logger.info("Upserted %d listings in batches of %d", total, batch_size)
+    return total
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_listing_chunks(columns: List[str], chunk_size: int = LISTING_CHUNK_SIZE, labels: List[str] = None):
+    """
+    Yield the listings table as lists of dicts holding `columns` (plus id), chunk_size
+    rows at a time in id order. Keyset pagination, so each chunk is one indexed range
+    scan and rows may be updated between chunks. Only rows with one of `labels` if given.
+    """
+    columns = ["id"] + [c for c in columns if c != "id"]
+    select = ", ".join(f'"{c}"' for c in columns)
+    where, params = "", []
+    if labels:
+        where = f" AND classified_label IN ({','.join('?' * len(labels))})"
+        params = list(labels)
+    conn = get_conn()
+    last_id = 0
+    while True:
+        rows = conn.execute(f"SELECT {select} FROM listings WHERE id > ?{where} ORDER BY id LIMIT ?",
+                            [last_id] + params + [chunk_size]).fetchall()
+        if not rows:
+            return
+        yield [dict(zip(columns, row)) for row in rows]
+        last_id = rows[-1][0]
+
+def update_listings(fields: List[str], rows: Iterable[tuple]) -> int:
+    """
+    Bulk UPDATE listings SET field = ... WHERE id = ..., one transaction. Each row
+    is the new values in `fields` order followed by the id. Returns rows written.
+    """
+    rows = list(rows)
+    assignments = ", ".join(f'"{f}" = ?' for f in fields)
+    conn = get_conn()
+    # Writes that can't move a rollup (none of its columns) leave the triggers idle anyway
+    ids = [row[-1] for row in rows] if set(fields) & set(ROLLUP_SNAPSHOT_COLUMNS) else []
+    with conn:
+        with deferred_rollups(conn, "id", ids):
+            conn.executemany(f"UPDATE listings SET {assignments} WHERE id = ?", rows)
+    return len(rows)
+
+def get_known_listings(urls) -> Dict[str, Dict[str, Any]]:
+    """Stored rows for the given URLs, keyed by URL (URLs not in the table are left out)"""
+    urls = list({u for u in urls if u})
+    known = {}
+    cur = get_conn().cursor()
+    cur.row_factory = sqlite3.Row
+    # Stay well under SQLite's bound-parameter limit
+    for start in range(0, len(urls), 500):
+        chunk = urls[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for row in cur.execute(f"SELECT * FROM listings WHERE url IN ({placeholders})", chunk):
+            known[row["url"]] = dict(row)
+    return known
+
+def price_drops(days: int = 7, min_drop_pct: float = 0.0, conn: Connection = None) -> List[Dict[str, Any]]:
+    """
+    Listings whose price was cut in the last N days, biggest cut (in percent) first.
+    One row per cut, so a listing cut twice appears twice.
+    """
+    cur = (conn or get_read_conn()).cursor()
+    cur.row_factory = sqlite3.Row
+    rows = cur.execute("""
+        SELECT e.url, l.source, l.address, l.status, e.old_value AS old_price, e.new_value AS new_price,
+               e.old_value - e.new_value AS drop_amount,
+               ROUND(100.0 * (e.old_value - e.new_value) / e.old_value, 1) AS drop_pct,
+               e.created_at AS changed_at
+        FROM listing_events e
+        JOIN listings l ON l.id = e.listing_id
+        WHERE e.field = 'price' AND e.created_at >= datetime('now', ?)
+          AND e.new_value < e.old_value
+          AND 100.0 * (e.old_value - e.new_value) / e.old_value >= ?
+        ORDER BY drop_pct DESC
+    """, (f"-{int(days)} days", min_drop_pct))
+    return [dict(row) for row in rows]
+
+def listing_history(url: str, conn: Connection = None) -> List[Dict[str, Any]]:
+    """Every recorded price/status change for one listing, oldest first"""
+    cur = (conn or get_read_conn()).cursor()
+    cur.row_factory = sqlite3.Row
+    rows = cur.execute("""
+        SELECT e.field, e.old_value, e.new_value, e.created_at
+        FROM listing_events e
+        JOIN listings l ON l.id = e.listing_id
+        WHERE l.url = ?
+        ORDER BY e.created_at, e.id
+    """, (url,))
+    return [dict(row) for row in rows]
\ No newline at end of file
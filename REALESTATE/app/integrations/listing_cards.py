@@ -0,0 +1,44 @@
+# Property card markup for the dashboard's listings page
+#
+# Kept free of streamlit so the markup can be built (and tested) anywhere. Every value
+# that reaches the HTML is escaped, and a missing value - NaN, None or a column the
+# page doesn't have - shows as a placeholder instead of breaking the card.
+import html
+import pandas as pd
+
+CARD_COLUMNS = ['url', 'address', 'beds', 'baths', 'living_area', 'price',
+                'classified_label', 'score', 'source', 'processed_at']
+
+def format_currency(value):
+    """Format currency values"""
+    if pd.isna(value):
+        return "N/A"
+    return f"${value:,.0f}"
+
+def _text(series, missing="N/A"):
+    """Column as HTML-escaped text, with a placeholder for missing values"""
+    return series.astype(object).where(series.notna(), missing).astype(str).map(html.escape)
+
+def property_cards_html(page_df):
+    """
+    HTML for one page of property cards, built a column at a time: address, beds/baths/size,
+    price, label, score, source and date per card.
+    """
+    if page_df.empty:
+        return ""
+    df = page_df.reset_index(drop=True).reindex(columns=CARD_COLUMNS)
+    price = df['price'].map(format_currency)
+    score = _text(pd.to_numeric(df['score'], errors='coerce').map("{:.1f}".format, na_action="ignore"))
+    url = df['url'].where(df['url'].astype(str).str.startswith(('http://', 'https://')))
+    date = _text(pd.to_datetime(df['processed_at'], errors='coerce').dt.strftime('%m/%d'))
+    # Whole numbers stay whole even when a missing value made the column float
+    beds, area = (pd.to_numeric(df[c], errors='coerce').round().astype('Int64') for c in ('beds', 'living_area'))
+    cards = (
+        '<div class="property-card"><div><strong>📍 <a href="' + _text(url, "#") + '" target="_blank">'
+        + _text(df['address']) + '</a></strong><br>🏠 ' + _text(beds) + ' bed, ' + _text(df['baths'])
+        + ' bath<br>📐 ' + _text(area) + ' sq ft</div>'
+        + '<div>💰 <strong>' + price + '</strong><br>🏷️ ' + _text(df['classified_label'])
+        + '<br>⭐ Score: ' + score + '</div>'
+        + '<div>📊 ' + _text(df['source'].astype(object).str.title()) + '<br>🕐 ' + date + '</div></div>'
+    )
+    return "\n".join(cards)
@@ -0,0 +1,290 @@
+# Dashboard data access: filters, pages and aggregates computed in SQLite
+#
+# The dashboard never loads the listings table into pandas. Sidebar filters become a
+# parameterized WHERE clause, the property list is fetched one page at a time, and
+# metric cards, charts and statistics are SQL aggregates - so the work per rerun
+# depends on what is shown, not on how many listings have ever been stored. With no
+# price range or search filter, the overview and correlation aggregates are read from
+# the rollup tables the listings triggers maintain (a few hundred rows at most).
+from dataclasses import dataclass
+from sqlite3 import Connection
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
+import re
+import sqlite3
+from app.integrations.database_manager import MOMENT_COLUMNS, PRICE_BIN_WIDTH, ROLLUP_COLUMNS, ROLLUP_PAIRS, migrate
+
+# Columns the property list shows; created_at is shown as processed_at
+PAGE_COLUMNS = ["id", "source", "url", "address", "price", "beds", "baths", "living_area",
+                "classified_label", "score", "created_at AS processed_at"]
+SORT_COLUMNS = {"price": "price", "score": "score", "processed_at": "created_at", "beds": "beds", "baths": "baths"}
+NUMERIC_COLUMNS = ["price", "beds", "baths", "living_area", "score"]
+
+@dataclass(frozen=True)
+class ListingFilter:
+    """The sidebar filters; None means "any". Frozen so Streamlit can cache on it."""
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    label: Optional[str] = None
+    source: Optional[str] = None
+    search: Optional[str] = None
+
+    def where(self) -> Tuple[str, List[Any]]:
+        """(" WHERE ...", params), or ("", []) when nothing is filtered"""
+        clauses, params = [], []
+        if self.price_min is not None:
+            clauses.append("price >= ?")
+            params.append(self.price_min)
+        if self.price_max is not None:
+            clauses.append("price <= ?")
+            params.append(self.price_max)
+        if self.label:
+            clauses.append("classified_label = ?")
+            params.append(self.label)
+        if self.source:
+            clauses.append("source = ?")
+            params.append(self.source)
+        match = fts_query(self.search) if self.search else None
+        if match:
+            clauses.append("id IN (SELECT rowid FROM listings_fts WHERE listings_fts MATCH ?)")
+            params.append(match)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    The search box as an FTS5 query: "quoted phrases" match as phrases, other words as
+    prefixes ("map" finds Maple), and every term must match. None if nothing searchable.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase and re.search(r"\w", phrase):
+            terms.append('"' + phrase + '"')
+        elif word and re.search(r"\w", word):
+            terms.append('"' + word.replace('"', "") + '"*')
+    return " ".join(terms) or None
+
+def rollup_where(conn: Connection, f: ListingFilter) -> Optional[Tuple[str, List[Any]]]:
+    """
+    The filter as (" WHERE ...", params) over the rollup tables, or None when it needs
+    the listings themselves: a price range or search, or a database from before the rollups.
+    """
+    if f.price_min is not None or f.price_max is not None or f.search:
+        return None
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'listing_rollups'").fetchone():
+        return None
+    clauses, params = [], []
+    if f.label:
+        clauses.append("label = ?")
+        params.append(f.label)
+    if f.source:
+        clauses.append("source = ?")
+        params.append(f.source)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def filter_options(conn: Connection) -> Dict[str, Any]:
+    """Slider bounds and the choices for the label and source selectors"""
+    price_min, price_max, total = conn.execute("SELECT MIN(price), MAX(price), COUNT(*) FROM listings").fetchone()
+    labels = [r[0] for r in conn.execute(
+        "SELECT DISTINCT classified_label FROM listings WHERE classified_label IS NOT NULL ORDER BY 1")]
+    sources = [r[0] for r in conn.execute("SELECT DISTINCT source FROM listings WHERE source IS NOT NULL ORDER BY 1")]
+    return {"price_min": price_min, "price_max": price_max, "total": total, "labels": labels, "sources": sources}
+
+def count_listings(conn: Connection, f: ListingFilter) -> int:
+    where, params = f.where()
+    return conn.execute(f"SELECT COUNT(*) FROM listings{where}", params).fetchone()[0]
+
+def overview_metrics(conn: Connection, f: ListingFilter) -> Dict[str, Any]:
+    """Count, price average and range, and number of sources for the metric cards"""
+    rollup = rollup_where(conn, f)
+    if rollup:
+        where, params = rollup
+        count, price_sum, price_n, min_price, max_price, sources = conn.execute(f"""
+            SELECT SUM(listings), SUM(price_sum), SUM(price_n), MIN(price_min), MAX(price_max),
+                   COUNT(DISTINCT NULLIF(source, '')) FROM listing_rollups{where}
+        """, params).fetchone()
+        return {"count": count or 0, "avg_price": price_sum / price_n if price_n else None,
+                "min_price": min_price, "max_price": max_price, "sources": sources}
+    where, params = f.where()
+    count, avg_price, min_price, max_price, sources = conn.execute(f"""
+        SELECT COUNT(*), AVG(price), MIN(price), MAX(price), COUNT(DISTINCT source) FROM listings{where}
+    """, params).fetchone()
+    return {"count": count, "avg_price": avg_price, "min_price": min_price, "max_price": max_price,
+            "sources": sources}
+
+def label_counts(conn: Connection, f: ListingFilter) -> pd.DataFrame:
+    rollup = rollup_where(conn, f)
+    if rollup:
+        where, params = rollup
+        return pd.read_sql_query(f"""
+            SELECT NULLIF(label, '') AS classified_label, SUM(listings) AS count FROM listing_rollups{where}
+            GROUP BY label ORDER BY count DESC
+        """, conn, params=params)
+    where, params = f.where()
+    return pd.read_sql_query(f"""
+        SELECT classified_label, COUNT(*) AS count FROM listings{where}
+        GROUP BY classified_label ORDER BY count DESC
+    """, conn, params=params)
+
+def source_stats(conn: Connection, f: ListingFilter) -> pd.DataFrame:
+    """Per source: Count, Avg_Price and Avg_Score (rounded like the old pandas groupby)"""
+    rollup = rollup_where(conn, f)
+    if rollup:
+        where, params = rollup
+        return pd.read_sql_query(f"""
+            SELECT NULLIF(source, '') AS source, SUM(price_n) AS Count,
+                   ROUND(1.0 * SUM(price_sum) / SUM(price_n), 2) AS Avg_Price, ROUND(SUM(score_sum) / SUM(score_n), 2) AS Avg_Score
+            FROM listing_rollups{where} GROUP BY source ORDER BY 1
+        """, conn, params=params)
+    where, params = f.where()
+    return pd.read_sql_query(f"""
+        SELECT source, COUNT(price) AS Count, ROUND(AVG(price), 2) AS Avg_Price, ROUND(AVG(score), 2) AS Avg_Score
+        FROM listings{where} GROUP BY source ORDER BY source
+    """, conn, params=params)
+
+def price_histogram(conn: Connection, f: ListingFilter, bins: int = 20) -> pd.DataFrame:
+    """
+    Equal-width price bins over the filtered range: bin_start, bin_end, count. From the
+    rollups, each PRICE_BIN_WIDTH-wide stored bin is counted in the bin its start falls
+    in, so a count can be off only for listings within that width of an edge.
+    """
+    rollup = rollup_where(conn, f)
+    if rollup:
+        return _price_histogram_from_bins(conn, *rollup, bins)
+    where, params = f.where()
+    low, high = conn.execute(f"SELECT MIN(price), MAX(price) FROM listings{where}", params).fetchone()
+    if low is None:
+        return pd.DataFrame(columns=["bin_start", "bin_end", "count"])
+    width = (high - low) / bins or 1
+    counts = pd.read_sql_query(f"""
+        SELECT MIN(CAST((price - ?) / ? AS INTEGER), ?) AS bin, COUNT(*) AS count
+        FROM listings{where}{" AND" if where else " WHERE"} price IS NOT NULL
+        GROUP BY bin ORDER BY bin
+    """, conn, params=[low, width, bins - 1] + params)
+    counts["bin_start"] = low + counts["bin"] * width
+    counts["bin_end"] = counts["bin_start"] + width
+    return counts[["bin_start", "bin_end", "count"]]
+
+def _price_histogram_from_bins(conn, where, params, bins):
+    low, high = conn.execute(f"SELECT MIN(price_min), MAX(price_max) FROM listing_rollups{where}", params).fetchone()
+    if low is None:
+        return pd.DataFrame(columns=["bin_start", "bin_end", "count"])
+    width = (high - low) / bins or 1
+    stored = pd.read_sql_query(f"SELECT bin, SUM(listings) AS count FROM listing_price_bins{where} GROUP BY bin",
+                               conn, params=params)
+    start = (stored["bin"] * PRICE_BIN_WIDTH).clip(lower=low)
+    stored["bin"] = ((start - low) // width).clip(upper=bins - 1).astype(int)
+    counts = stored.groupby("bin", as_index=False)["count"].sum()
+    counts["bin_start"] = low + counts["bin"] * width
+    counts["bin_end"] = counts["bin_start"] + width
+    return counts[["bin_start", "bin_end", "count"]]
+
+def summary_stats(conn: Connection, f: ListingFilter, columns: List[str] = NUMERIC_COLUMNS) -> pd.DataFrame:
+    """
+    count/mean/std/min/max per column, laid out like DataFrame.describe(). The deviation
+    is summed around the mean in a second pass; E[x^2] - E[x]^2 cancels badly for prices.
+    """
+    where, params = f.where()
+    selects = []
+    for c in columns:
+        selects += [f"COUNT({c})", f"AVG({c})", f"MIN({c})", f"MAX({c})"]
+    row = conn.execute(f"SELECT {', '.join(selects)} FROM listings{where}", params).fetchone()
+    means = [row[i * 4 + 1] or 0.0 for i in range(len(columns))]
+    squares = conn.execute(
+        f"SELECT {', '.join(f'TOTAL(({c} - ?) * ({c} - ?))' for c in columns)} FROM listings{where}",
+        [m for mean in means for m in (mean, mean)] + params
+    ).fetchone()
+    stats = {}
+    for i, c in enumerate(columns):
+        count, mean, low, high = row[i * 4:i * 4 + 4]
+        # Sample standard deviation, as pandas reports it
+        if not count or count < 2:
+            std = None
+        else:
+            std = 0.0 if low == high else max(0.0, squares[i] / (count - 1)) ** 0.5
+        stats[c] = {"count": count, "mean": mean, "std": std, "min": low, "max": high}
+    return pd.DataFrame(stats)
+
+def correlation_matrix(conn: Connection, f: ListingFilter, columns: List[str] = NUMERIC_COLUMNS) -> pd.DataFrame:
+    """
+    Pearson correlation of every pair of columns over the rows where both are set
+    (pandas' pairwise-complete rule). The sums of products are taken around the pair's
+    means in a second SQL scan, like summary_stats - or read from listing_moments, which
+    keeps them around a stored shift near each mean, when the filter allows.
+    """
+    rollup = rollup_where(conn, f)
+    if rollup and set(columns) <= set(ROLLUP_COLUMNS):
+        where, params = rollup
+        row = conn.execute(f"SELECT {', '.join(f'SUM({c})' for c in MOMENT_COLUMNS)} FROM listing_moments{where}",
+                           params).fetchone()
+        matrix = pd.DataFrame(index=columns, columns=columns, dtype=float)
+        for i, (a, b) in enumerate(ROLLUP_PAIRS):
+            if a in columns and b in columns:
+                matrix.loc[a, b] = matrix.loc[b, a] = _pearson(*row[i * 6:i * 6 + 6])
+        return matrix
+    where, params = f.where()
+    pairs = [(a, b) for i, a in enumerate(columns) for b in columns[i:]]
+    selects = []
+    for a, b in pairs:
+        both = f"{a} IS NOT NULL AND {b} IS NOT NULL"
+        selects += [f"SUM({both})", f"AVG(CASE WHEN {both} THEN {a} END)", f"AVG(CASE WHEN {both} THEN {b} END)"]
+    means = conn.execute(f"SELECT {', '.join(selects)} FROM listings{where}", params).fetchone()
+    selects, centred = [], []
+    for i, (a, b) in enumerate(pairs):
+        both = f"{a} IS NOT NULL AND {b} IS NOT NULL"
+        selects += [f"TOTAL(CASE WHEN {both} THEN ({a} - ?) * ({a} - ?) END)",
+                    f"TOTAL(CASE WHEN {both} THEN ({b} - ?) * ({b} - ?) END)",
+                    f"TOTAL(CASE WHEN {both} THEN ({a} - ?) * ({b} - ?) END)"]
+        mean_a, mean_b = means[i * 3 + 1] or 0.0, means[i * 3 + 2] or 0.0
+        centred += [mean_a, mean_a, mean_b, mean_b, mean_a, mean_b]
+    row = conn.execute(f"SELECT {', '.join(selects)} FROM listings{where}", centred + params).fetchone()
+    matrix = pd.DataFrame(index=columns, columns=columns, dtype=float)
+    for i, (a, b) in enumerate(pairs):
+        matrix.loc[a, b] = matrix.loc[b, a] = _pearson(means[i * 3], 0.0, 0.0, *row[i * 3:i * 3 + 3])
+    return matrix
+
+def _pearson(n, sx, sy, sxx, syy, sxy):
+    if not n or n < 2:
+        return float("nan")
+    var_x, var_y = sxx - sx * sx / n, syy - sy * sy / n
+    if var_x <= 0 or var_y <= 0:
+        return float("nan")
+    return (sxy - sx * sy / n) / (var_x * var_y) ** 0.5
+
+def fetch_page(conn: Connection, f: ListingFilter, sort_by: str = "processed_at", descending: bool = True,
+               page: int = 0, page_size: int = 50) -> pd.DataFrame:
+    """One page of the filtered listings, sorted; ties broken by id so pages never overlap"""
+    where, params = f.where()
+    order = "DESC" if descending else "ASC"
+    return pd.read_sql_query(f"""
+        SELECT {", ".join(PAGE_COLUMNS)} FROM listings{where}
+        ORDER BY {SORT_COLUMNS[sort_by]} {order}, id {order} LIMIT ? OFFSET ?
+    """, conn, params=params + [page_size, page * page_size])
+
+def sample_listings(conn: Connection, f: ListingFilter, limit: int = 5000) -> pd.DataFrame:
+    """Up to `limit` random filtered listings, for scatter plots"""
+    where, params = f.where()
+    return pd.read_sql_query(f"""
+        SELECT address, price, beds, baths, living_area, classified_label, score FROM listings{where}
+        ORDER BY RANDOM() LIMIT ?
+    """, conn, params=params + [limit])
+
+def csv_conn(csv_path: str) -> Connection:
+    """
+    An in-memory database holding the pipeline's CSV export in the listings schema,
+    so the CSV data source is queried exactly like the real database. The connection
+    may be used from any thread, but only one at a time: callers sharing it hold a lock.
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    migrate(conn)
+    df = pd.read_csv(csv_path)
+    if "created_at" not in df and "processed_at" in df:
+        df = df.rename(columns={"processed_at": "created_at"})
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(listings)")} - {"id"}
+    # A URL exported twice keeps its last row, as an upsert would
+    if "url" in df:
+        df = df.drop_duplicates("url", keep="last")
+    df = df[[c for c in df.columns if c in columns]].astype(object).where(df.notna(), None)
+    with conn:
+        conn.executemany(f"INSERT INTO listings ({', '.join(df.columns)}) "
+                         f"VALUES ({', '.join('?' * len(df.columns))})", df.itertuples(index=False))
+    return conn
@@ -0,0 +1,229 @@
+# Background pipeline runs - one at a time, with live progress in the listings database
+#
+# The dashboard starts a run as a detached process and returns immediately. The run
+# reports its stage, how many listings it has processed and each source's timing to
+# the pipeline_jobs table, which every dashboard session polls. A partial unique
+# index allows only one queued or running job, so two users pressing "Run" at once
+# can't start overlapping scrapes: the second insert fails and they see the first run.
+from app.integrations.database_manager import close_conns, get_conn
+from app.utils.config_loader import CONFIG
+from app.utils.logger import LOG_DIR, logger
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+JOBS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    stage TEXT,
+    processed INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    sources TEXT NOT NULL DEFAULT '{}',
+    pid INTEGER,
+    log_path TEXT,
+    error TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pipeline_jobs_one_active
+    ON pipeline_jobs ((status IN ('queued', 'running'))) WHERE status IN ('queued', 'running');
+"""
+
+# queued -> running -> done | failed; a job whose process stops heartbeating is failed by reap_stale_jobs
+ACTIVE_STATUSES = ("queued", "running")
+STALE_SECONDS = CONFIG["JOB_STALE_SECONDS"]
+HEARTBEAT_SECONDS = 5.0
+# Progress counters are written at most this often; stage changes are written at once
+PROGRESS_INTERVAL = 0.5
+
+# Processes this interpreter started, so finished ones are reaped and noticed right away
+_processes = {}
+
+def init_jobs():
+    get_conn().executescript(JOBS_SCHEMA_SQL)
+
+def _fail(conn, job_id, error):
+    return conn.execute(
+        f"UPDATE pipeline_jobs SET status = 'failed', error = ?, finished_at = ? "
+        f"WHERE id = ? AND status IN {ACTIVE_STATUSES}",
+        (error, time.time(), job_id)
+    ).rowcount
+
+def reap_stale_jobs(stale_after=STALE_SECONDS):
+    """
+    Fail active jobs whose process is gone: one we started that has exited, or any
+    whose heartbeat is older than stale_after seconds. Returns how many were failed.
+    """
+    conn = get_conn()
+    reaped = 0
+    with conn:
+        for job_id, proc in list(_processes.items()):
+            code = proc.poll()
+            if code is not None:
+                del _processes[job_id]
+                reaped += _fail(conn, job_id, f"pipeline process exited with code {code}")
+        rows = conn.execute(
+            f"SELECT id FROM pipeline_jobs WHERE status IN {ACTIVE_STATUSES} AND heartbeat_at < ?",
+            (time.time() - stale_after,)
+        ).fetchall()
+        for (job_id,) in rows:
+            reaped += _fail(conn, job_id, f"no progress reported for {stale_after:.0f}s")
+    if reaped:
+        logger.warning("Marked %d stale pipeline job(s) as failed", reaped)
+    return reaped
+
+def create_job(kind):
+    """Record a queued job and return its id, or None if another job is queued or running"""
+    conn = get_conn()
+    try:
+        with conn:
+            return conn.execute(
+                "INSERT INTO pipeline_jobs (kind, heartbeat_at) VALUES (?, ?)", (kind, time.time())
+            ).lastrowid
+    except sqlite3.IntegrityError:
+        return None
+
+def start_job(kind, args, cwd="."):
+    """
+    Start `python <args> --job-id <id>` in the background, its output going to a log
+    file. Returns the job id, or None when a run is already active (nothing is started).
+    """
+    init_jobs()
+    reap_stale_jobs()
+    job_id = create_job(kind)
+    if job_id is None:
+        return None
+    log_path = os.path.join(LOG_DIR, f"pipeline_job_{job_id}.log")
+    try:
+        with open(log_path, "ab") as log:
+            proc = subprocess.Popen([sys.executable, *args, "--job-id", str(job_id)], cwd=cwd,
+                                    stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+    except OSError as e:
+        conn = get_conn()
+        with conn:
+            _fail(conn, job_id, f"could not start: {e}")
+        raise
+    _processes[job_id] = proc
+    conn = get_conn()
+    with conn:
+        conn.execute("UPDATE pipeline_jobs SET pid = ?, log_path = ? WHERE id = ?", (proc.pid, log_path, job_id))
+    logger.info("Started %s job %d (pid %d)", kind, job_id, proc.pid)
+    return job_id
+
+def _row_to_job(cur, row):
+    job = dict(zip([c[0] for c in cur.description], row))
+    job["sources"] = json.loads(job["sources"] or "{}")
+    return job
+
+def get_job(job_id, conn=None):
+    conn = conn or get_conn()
+    cur = conn.execute("SELECT * FROM pipeline_jobs WHERE id = ?", (job_id,))
+    row = cur.fetchone()
+    return _row_to_job(cur, row) if row else None
+
+def latest_job(conn=None):
+    """The newest job as a dict (sources decoded), or None; works on a read-only connection"""
+    conn = conn or get_conn()
+    cur = conn.execute("SELECT * FROM pipeline_jobs ORDER BY id DESC LIMIT 1")
+    row = cur.fetchone()
+    return _row_to_job(cur, row) if row else None
+
+def log_tail(path, lines=20, max_bytes=64 * 1024):
+    """The last lines of a job's log file ("" if it doesn't exist yet)"""
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        f.seek(max(os.path.getsize(path) - max_bytes, 0))
+        text = f.read().decode("utf-8", errors="replace")
+    return "\n".join(text.splitlines()[-lines:])
+
+class JobReporter:
+    """
+    Progress reporting from inside a run. Marks the job running on enter and done
+    (or failed, with the exception) on exit, and heartbeats from a background thread
+    so a long stage isn't mistaken for a dead process. With job_id None every call is
+    a no-op, so the pipeline reports unconditionally whether or not a job started it.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.sources = {}
+        self.processed = 0
+        self.failure = None
+        self._stage_started = time.monotonic()
+        self._last_write = 0.0
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def _update(self, **fields):
+        if self.job_id is None:
+            return
+        fields["heartbeat_at"] = time.time()
+        conn = get_conn()
+        with conn:
+            conn.execute(f"UPDATE pipeline_jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                         [*fields.values(), self.job_id])
+        self._last_write = time.monotonic()
+
+    def _beat(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self._update()
+            except Exception as e:
+                logger.warning("Job %s heartbeat failed: %s", self.job_id, e)
+        close_conns()
+
+    def __enter__(self):
+        if self.job_id is not None:
+            init_jobs()
+            self._update(status="running", pid=os.getpid(), started_at=time.time())
+            self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+        return self
+
+    def stage(self, name, total=None):
+        """Start a new stage; processed restarts from zero"""
+        logger.info("Job stage: %s", name)
+        self.processed = 0
+        self._stage_started = time.monotonic()
+        self._update(stage=name, processed=0, total=total)
+
+    def advance(self, n=1):
+        """Count n more listings processed in this stage (written at most every PROGRESS_INTERVAL)"""
+        self.processed += n
+        if time.monotonic() - self._last_write >= PROGRESS_INTERVAL:
+            self._update(processed=self.processed)
+
+    def source_done(self, name, count, status="ok", seconds=None):
+        """Record a source's listing count and time (default: time since the stage started)"""
+        if seconds is None:
+            seconds = round(time.monotonic() - self._stage_started, 2)
+        self.sources[name] = {"status": status, "count": count, "seconds": seconds}
+        self._update(sources=json.dumps(self.sources))
+
+    def set_sources(self, report):
+        """Replace the per-source timings with a scrape report (name -> status/count/seconds)"""
+        self.sources = {name: dict(info) for name, info in report.items()}
+        self._update(sources=json.dumps(self.sources))
+
+    def fail(self, error):
+        """Finish as failed without raising (e.g. a run that produced nothing)"""
+        self.failure = error
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join()
+        if exc is not None:
+            self.failure = f"{exc_type.__name__}: {exc}"
+        self._update(status="failed" if self.failure else "done", error=self.failure,
+                     processed=self.processed, finished_at=time.time())
+        return False
@@ -0,0 +1,151 @@
+# Shared async Playwright browser pool - one long-lived Chromium for every scraper
+from playwright.async_api import async_playwright
+from app.scraper.resource_blocking import BLOCK_RESOURCES, install_resource_blocking, log_page_savings
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+from contextlib import asynccontextmanager
+import asyncio
+import concurrent.futures
+import threading
+
+HEADLESS = CONFIG["PLAYWRIGHT_HEADLESS"]
+MAX_CONTEXTS = CONFIG["BROWSER_POOL_CONTEXTS"]
+PAGES_PER_CONTEXT = CONFIG["BROWSER_POOL_PAGES_PER_CONTEXT"]
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+async def setup_browser_context(browser):
+    """Setup browser context with realistic headers and settings"""
+    context = await browser.new_context(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent=USER_AGENT
+    )
+    # Skip images, fonts, stylesheets and trackers - only the card text is needed
+    if BLOCK_RESOURCES:
+        await install_resource_blocking(context)
+    return context
+
+class BrowserPool:
+    """
+    One Chromium instance with a bounded set of contexts and pages.
+
+    At most max_contexts * pages_per_context pages are open at once; callers
+    beyond that wait for a free slot. Contexts are created lazily and handed
+    out round-robin. If the browser dies it is relaunched on the next acquire.
+    """
+
+    def __init__(self, headless=HEADLESS, max_contexts=MAX_CONTEXTS, pages_per_context=PAGES_PER_CONTEXT):
+        self.headless = headless
+        self.max_contexts = max_contexts
+        self.pages_per_context = pages_per_context
+        self.browser = None
+        self._playwright = None
+        self._contexts = []
+        self._next_context = 0
+        self._slots = asyncio.Semaphore(max_contexts * pages_per_context)
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Launch the browser if it is not already running"""
+        async with self._lock:
+            if self.browser and self.browser.is_connected():
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._contexts = []
+            self.browser = await self._playwright.chromium.launch(headless=self.headless)
+            logger.info("Browser pool started (%d contexts x %d pages)", self.max_contexts, self.pages_per_context)
+
+    async def close(self):
+        async with self._lock:
+            if self.browser:
+                await self.browser.close()
+                self.browser = None
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+            self._contexts = []
+            logger.info("Browser pool closed")
+        # Forget the pool so its event loop's entry doesn't outlive it
+        loop = asyncio.get_running_loop()
+        if _pools.get(loop) is self:
+            del _pools[loop]
+
+    async def _context(self):
+        async with self._lock:
+            if len(self._contexts) < self.max_contexts:
+                context = await setup_browser_context(self.browser)
+                self._contexts.append(context)
+                return context
+            context = self._contexts[self._next_context % len(self._contexts)]
+            self._next_context += 1
+            return context
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page from the pool; it is closed again when the block exits"""
+        async with self._slots:
+            await self.start()
+            context = await self._context()
+            page = await context.new_page()
+            try:
+                yield page
+            finally:
+                log_page_savings(page)
+                await page.close()
+
+# One pool per event loop; the sync scrapers all share the background loop below.
+# An entry goes when its pool is closed, or when its loop is found closed.
+_pools = {}
+_loop = None
+_loop_lock = threading.Lock()
+
+async def get_browser_pool():
+    """Return the pool for the running event loop; the browser itself launches on the first page()"""
+    loop = asyncio.get_running_loop()
+    for finished in [l for l in _pools if l.is_closed()]:
+        del _pools[finished]  # e.g. an asyncio.run() that never closed its pool
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = BrowserPool()
+    return pool
+
+def _background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="browser-pool", daemon=True).start()
+    return _loop
+
+def run_sync(coro, timeout=None):
+    """
+    Run a scraper coroutine on the long-lived browser loop and wait for the result.
+    Safe to call from several threads at once - their pages load concurrently
+    in the same browser. On timeout the coroutine is cancelled.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+async def gather_cities(scrape_async, cities, **kwargs):
+    """Run one async scraper for several cities at the same time and merge the listings"""
+    batches = await asyncio.gather(*(scrape_async(city=city, **kwargs) for city in cities), return_exceptions=True)
+    results = []
+    for city, batch in zip(cities, batches):
+        if isinstance(batch, Exception):
+            logger.error("Scraping %s failed: %s", city, batch)
+            continue
+        results.extend(batch)
+    return results
+
+def shutdown_browser_pool():
+    """Close the shared browser (e.g. when the scheduler stops)"""
+    if _loop is None:
+        return
+    pool = _pools.get(_loop)
+    if pool:
+        run_sync(pool.close())
@@ -0,0 +1,186 @@
+# Sharded multi-city crawl - N workers drain the persistent (source, city, page) queue
+from app.integrations.crawl_queue import (
+    init_crawl_queue, open_run, claim_task, complete_task, fail_task, skip_later_pages,
+    run_progress, source_summary, has_open_tasks, run_listings, finish_run,
+)
+from app.integrations.database_manager import init_db
+from app.scraper.browser_pool import run_sync, get_browser_pool
+from app.scraper.zillow_scraper import scrape_zillow_page
+from app.scraper.redfin_scraper import scrape_redfin_async
+from app.scraper.realtor_scraper import scrape_realtor_async
+from app.scraper.incremental import INCREMENTAL, page_is_unchanged
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+from app.utils.mock_data import fallback_listings
+import threading
+import time
+
+TARGET_CITIES = [c.strip() for c in CONFIG["TARGET_CITIES"].split(";") if c.strip()]
+CRAWL_WORKERS = CONFIG["CRAWL_WORKERS"]
+CRAWL_MAX_PAGES = CONFIG["CRAWL_MAX_PAGES"]
+CRAWL_MAX_ATTEMPTS = CONFIG["CRAWL_MAX_ATTEMPTS"]
+CRAWL_RETRY_DELAY = CONFIG["CRAWL_RETRY_DELAY"]
+TASK_TIMEOUT = CONFIG["SCRAPE_SOURCE_TIMEOUT"]
+TOTAL_BUDGET = CONFIG["SCRAPE_TOTAL_BUDGET"]
+# Minimum seconds between two page requests to the same site, across all workers
+SOURCE_INTERVAL = CONFIG["CRAWL_SOURCE_INTERVAL"] * CONFIG["SCRAPER_POLITENESS_SCALE"]
+
+# How long an idle worker waits before looking for retries that are backing off
+IDLE_POLL_SECONDS = 0.5
+
+class PolitenessGate:
+    """Spaces out the requests to each source by at least `interval` seconds, whichever worker makes them"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, source):
+        """Block until `source` may be requested again; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(source, now))
+            self._next[source] = start + self.interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+POLITENESS = PolitenessGate(SOURCE_INTERVAL)
+
+async def _zillow_page(city, page, polite_seconds):
+    return await scrape_zillow_page(await get_browser_pool(), city, page, polite_seconds)
+
+# source -> blocking callable(city, page) returning that page's listings.
+# Scraping runs on the shared browser loop, so every worker shares one browser. The
+# politeness wait happens on the worker thread before the page is borrowed, so it holds
+# no browser slot and does not count against TASK_TIMEOUT.
+PAGE_SCRAPERS = {
+    "Zillow": lambda city, page: run_sync(
+        _zillow_page(city, page, POLITENESS.wait("Zillow")), timeout=TASK_TIMEOUT),
+    "Redfin": lambda city, page: run_sync(
+        scrape_redfin_async(city=city, page_num=page, polite_seconds=POLITENESS.wait("Redfin")), timeout=TASK_TIMEOUT),
+    "Realtor": lambda city, page: run_sync(
+        scrape_realtor_async(city=city, page_num=page, polite_seconds=POLITENESS.wait("Realtor")), timeout=TASK_TIMEOUT),
+}
+
+def plan_tasks(sources, cities, max_pages):
+    """(source, city, page) for every combination; max_pages is a number or a dict per source"""
+    tasks = []
+    for source in sources:
+        pages = max_pages.get(source, CRAWL_MAX_PAGES) if isinstance(max_pages, dict) else max_pages
+        for city in cities:
+            for page in range(1, pages + 1):
+                tasks.append((source, city, page))
+    return tasks
+
+def log_progress(run_id):
+    progress = run_progress(run_id)
+    logger.info("Crawl run %d: %d/%d tasks done, %d failed, %d skipped, %d running, %d pending, %d listings",
+                run_id, progress["done"], progress["total"], progress["failed"], progress["skipped"],
+                progress["running"], progress["pending"], progress["listings"])
+    return progress
+
+def run_crawl(page_scrapers=None, cities=None, max_pages=CRAWL_MAX_PAGES, workers=CRAWL_WORKERS,
+              max_attempts=CRAWL_MAX_ATTEMPTS, retry_delay=CRAWL_RETRY_DELAY, total_budget=TOTAL_BUDGET,
+              use_mock=True, incremental=INCREMENTAL, on_progress=None):
+    """
+    Crawl every (source, city, page) with a pool of workers backed by the crawl_tasks queue.
+
+    page_scrapers - dict of source name -> callable(city, page) returning listings (default PAGE_SCRAPERS)
+    cities        - list of cities (default TARGET_CITIES)
+    max_pages     - pages per city, or a dict of source name -> pages
+    total_budget  - seconds after which workers stop taking new tasks; what is left stays
+                    queued and the next call resumes it
+    incremental   - stop paginating a source/city once a page holds only stored, unchanged listings
+    on_progress   - optional callback(progress) fired after every finished task
+
+    A task that raises (or times out) is retried with exponential backoff up to max_attempts.
+    An unfinished run from an earlier, interrupted call is resumed instead of starting over,
+    including the listings its finished tasks already stored - unless it started more than
+    CRAWL_RESUME_MAX_AGE_HOURS ago, in which case it is abandoned and a fresh run starts.
+
+    Returns (all_results, report) where report has the run id, task counts and
+    source name -> status/count like scrape_all_sources.
+    """
+    page_scrapers = page_scrapers or PAGE_SCRAPERS
+    cities = cities or TARGET_CITIES
+    init_db()
+    init_crawl_queue()
+    run_id, resumed = open_run(plan_tasks(page_scrapers, cities, max_pages))
+    log_progress(run_id)
+
+    start = time.monotonic()
+    progress_lock = threading.Lock()
+
+    def worker():
+        while time.monotonic() - start < total_budget:
+            task = claim_task(run_id)
+            if task is None:
+                if not has_open_tasks(run_id):
+                    return
+                # Other workers are busy, or retries are still backing off
+                time.sleep(IDLE_POLL_SECONDS)
+                continue
+
+            label = f"{task['source']} {task['city']} page {task['page']} (attempt {task['attempt']})"
+            scrape_page = page_scrapers.get(task["source"])
+            try:
+                if scrape_page is None:
+                    raise KeyError(f"no page scraper for {task['source']}")
+                listings = scrape_page(task["city"], task["page"]) or []
+                complete_task(task["id"], listings)
+                logger.info("Crawled %s: %d listings", label, len(listings))
+                if incremental and page_is_unchanged(listings):
+                    skipped = skip_later_pages(run_id, task["source"], task["city"], task["page"])
+                    if skipped:
+                        logger.info("%s %s page %d is unchanged since the last run, skipping %d later pages",
+                                    task["source"], task["city"], task["page"], skipped)
+            except Exception as e:
+                logger.warning("Crawl task %s failed: %r", label, e)
+                fail_task(task["id"], repr(e), max_attempts, retry_delay)
+
+            with progress_lock:
+                progress = log_progress(run_id)
+            if on_progress:
+                on_progress(progress)
+
+    threads = [threading.Thread(target=worker, name=f"crawl-{n}", daemon=True) for n in range(max(workers, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Read everything the run stored before finishing it, which deletes it
+    by_source = run_listings(run_id)
+    summary = source_summary(run_id)
+    tasks = run_progress(run_id)
+    finished = finish_run(run_id)
+    if not finished:
+        logger.warning("Crawl budget of %.0fs used up; run %d will resume next time", total_budget, run_id)
+
+    all_results = []
+    sources = {}
+    for name in page_scrapers:
+        listings = by_source.get(name, [])
+        counts = summary.get(name, {"done": 0, "failed": 0, "open": 0})
+        status = "ok" if listings else ("error" if counts["failed"] else "empty")
+        if counts["open"]:
+            status = "partial" if listings else "timeout"
+        if not listings:
+            listings = fallback_listings(name, use_mock=use_mock)
+            if listings:
+                status = f"{status}+mock"
+        sources[name] = {"status": status, "count": len(listings), "pages": counts["done"], "failed_pages": counts["failed"]}
+        all_results.extend(listings)
+
+    report = {"run_id": run_id, "resumed": resumed, "finished": finished,
+              "tasks": tasks, "sources": sources,
+              "seconds": round(time.monotonic() - start, 2)}
+    logger.info("Crawl finished in %.1fs with %d listings: %s", report["seconds"], len(all_results), sources)
+    return all_results, report
+
+if __name__ == "__main__":
+    results, report = run_crawl(use_mock=CONFIG["USE_MOCK_DATA"])
+    logger.info("Crawl report: %s", report)
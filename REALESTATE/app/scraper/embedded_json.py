@@ -0,0 +1,207 @@
+# Embedded-JSON fast path - read the structured search results the sites ship inside their HTML
+#
+# Zillow and Realtor.com render search pages with Next.js (__NEXT_DATA__), Redfin
+# preloads its search API responses into __reactServerState. Parsing that JSON gives
+# full structured fields (lot size, year built, status, days on market) from a single
+# HTML document, without waiting for cards to render. Every extractor returns [] when
+# the data isn't there, so callers can fall back to DOM scraping.
+from app.scraper.extraction import absolute_url
+from app.utils.logger import logger
+import json
+import re
+
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+REDFIN_STATE_RE = re.compile(r'__reactServerState\.InitialContext\s*=\s*')
+
+SQFT_PER_ACRE = 43560
+
+def find_next_data(html):
+    """Parsed __NEXT_DATA__ payload, or None"""
+    match = NEXT_DATA_RE.search(html or "")
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+def find_redfin_state(html):
+    """Parsed __reactServerState.InitialContext object, or None"""
+    match = REDFIN_STATE_RE.search(html or "")
+    if not match:
+        return None
+    try:
+        state, _ = json.JSONDecoder().raw_decode(html, match.end())
+        return state
+    except ValueError:
+        return None
+
+def find_records(obj, is_record):
+    """Depth-first search for dicts matching is_record; Redfin's "{}&&"-prefixed API payloads are unwrapped"""
+    found = []
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if is_record(node):
+                found.append(node)
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, str) and node.startswith("{}&&"):
+            try:
+                stack.append(json.loads(node[4:]))
+            except ValueError:
+                continue
+    return found
+
+def value_of(field):
+    """Redfin wraps most numbers as {"value": ...}"""
+    if isinstance(field, dict):
+        return field.get("value")
+    return field
+
+def to_int(value):
+    try:
+        return int(float(value)) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+def to_float(value):
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+def lot_size_sqft(value, unit):
+    value = to_float(value)
+    if value is None:
+        return None
+    if unit and unit.lower().startswith("acre"):
+        value *= SQFT_PER_ACRE
+    return int(value)
+
+def extract_zillow_listings(html, pg=1):
+    """Listings from Zillow's __NEXT_DATA__ search state"""
+    data = find_next_data(html)
+    if not data:
+        return []
+    results = []
+    seen = set()
+    homes = find_records(data, lambda d: "zpid" in d and ("detailUrl" in d or "hdpData" in d))
+    for i, home in enumerate(homes):
+        # The same home appears in both listResults and mapResults
+        if home["zpid"] in seen:
+            continue
+        seen.add(home["zpid"])
+        info = (home.get("hdpData") or {}).get("homeInfo") or {}
+        price = to_int(home.get("unformattedPrice") or info.get("price"))
+        address = home.get("address") or ", ".join(
+            p for p in [info.get("streetAddress"), info.get("city"), info.get("state")] if p)
+        results.append({
+            "source": "zillow",
+            "url": absolute_url(home.get("detailUrl"), "https://www.zillow.com"),
+            "address": address or None,
+            "price": price,
+            "beds": to_int(home.get("beds", info.get("bedrooms"))),
+            "baths": to_float(home.get("baths", info.get("bathrooms"))),
+            "living_area": to_int(home.get("area", info.get("livingArea"))),
+            "lot_size": lot_size_sqft(info.get("lotAreaValue"), info.get("lotAreaUnit")),
+            "year_built": to_int(info.get("yearBuilt")),
+            "dom": to_int(info.get("daysOnZillow")),
+            "status": info.get("homeStatus") or home.get("statusType"),
+            "description": home.get("flexFieldText") or info.get("description"),
+            "raw_json": {
+                "price_text": home.get("price"),
+                "zpid": home.get("zpid"),
+                "home_type": info.get("homeType"),
+                "page_number": pg,
+                "card_index": i,
+                "extraction": "embedded_json"
+            }
+        })
+    return results
+
+def extract_redfin_listings(html):
+    """Listings from the search API responses Redfin preloads into __reactServerState"""
+    state = find_redfin_state(html)
+    if not state:
+        return []
+    results = []
+    homes = find_records(state, lambda d: "propertyId" in d and "price" in d)
+    for i, home in enumerate(homes):
+        street = value_of(home.get("streetLine"))
+        address = ", ".join(str(p) for p in [street, home.get("city"), home.get("state")] if p)
+        if home.get("zip") and address:
+            address = f"{address} {home.get('zip')}"
+        results.append({
+            "source": "redfin",
+            "url": absolute_url(home.get("url"), "https://www.redfin.com"),
+            "address": address or None,
+            "price": to_int(value_of(home.get("price"))),
+            "beds": to_int(home.get("beds")),
+            "baths": to_float(home.get("baths")),
+            "living_area": to_int(value_of(home.get("sqFt"))),
+            "lot_size": to_int(value_of(home.get("lotSize"))),
+            "year_built": to_int(value_of(home.get("yearBuilt"))),
+            "dom": to_int(value_of(home.get("dom"))),
+            "status": home.get("mlsStatus"),
+            "description": home.get("listingRemarks"),
+            "raw_json": {
+                "property_id": home.get("propertyId"),
+                "listing_index": i,
+                "extraction": "embedded_json"
+            }
+        })
+    return results
+
+def extract_realtor_listings(html):
+    """Listings from Realtor.com's __NEXT_DATA__ search results"""
+    data = find_next_data(html)
+    if not data:
+        return []
+    results = []
+    homes = find_records(data, lambda d: "property_id" in d and "list_price" in d)
+    for i, home in enumerate(homes):
+        description = home.get("description") or {}
+        location = (home.get("location") or {}).get("address") or {}
+        address = ", ".join(p for p in [location.get("line"), location.get("city"), location.get("state_code")] if p)
+        if location.get("postal_code") and address:
+            address = f"{address} {location.get('postal_code')}"
+        href = home.get("href") or home.get("permalink")
+        if href and not href.startswith(("http", "/")):
+            href = f"/realestateandhomes-detail/{href}"
+        results.append({
+            "source": "realtor",
+            "url": absolute_url(href, "https://www.realtor.com"),
+            "address": address or None,
+            "price": to_int(home.get("list_price")),
+            "beds": to_int(description.get("beds")),
+            "baths": to_float(description.get("baths")),
+            "living_area": to_int(description.get("sqft")),
+            "lot_size": to_int(description.get("lot_sqft")),
+            "year_built": to_int(description.get("year_built")),
+            "dom": None,
+            "status": home.get("status"),
+            "description": description.get("text"),
+            "raw_json": {
+                "property_id": home.get("property_id"),
+                "home_type": description.get("type"),
+                "list_date": home.get("list_date"),
+                "listing_index": i,
+                "extraction": "embedded_json"
+            }
+        })
+    return results
+
+def try_embedded(extractor, html, source, *args):
+    """Run an extractor, logging the outcome; never raises"""
+    try:
+        results = extractor(html, *args)
+    except Exception as e:
+        logger.warning("%s: embedded JSON extraction failed: %s", source, e)
+        return []
+    if results:
+        logger.info("%s: extracted %d listings from embedded JSON", source, len(results))
+    return results
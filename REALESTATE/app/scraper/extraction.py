@@ -0,0 +1,100 @@
+# Card extraction shared by all scrapers
+#
+# "batch" mode pulls every card's raw fields out of the page in one $$eval call;
+# "per_element" mode walks the element handles with query_selector/inner_text,
+# which costs one browser round trip per lookup. Both return the same raw cards:
+#   {"price": [...], "address": [...], "href": [...], "details": [...]}
+# where each list holds one value per candidate selector (None if it didn't match).
+from app.utils.config_loader import CONFIG
+import re
+
+EXTRACTION_MODE = CONFIG["SCRAPER_EXTRACTION_MODE"]
+
+# Fields read from an element's href attribute instead of its text
+ATTRIBUTE_FIELDS = {"href": "href"}
+
+EXTRACT_CARDS_JS = """
+(cards, [fields, attributes, limit]) => cards.slice(0, limit || cards.length).map(card => {
+    const out = {};
+    for (const [field, selectors] of Object.entries(fields)) {
+        out[field] = selectors.map(selector => {
+            const el = card.querySelector(selector);
+            if (!el) return null;
+            return attributes[field] ? el.getAttribute(attributes[field]) : el.innerText;
+        });
+    }
+    return out;
+})
+"""
+
+async def extract_cards_batch(page, card_selector, fields, limit=None):
+    """Read every card's candidate fields in a single round trip"""
+    return await page.eval_on_selector_all(card_selector, EXTRACT_CARDS_JS, [fields, ATTRIBUTE_FIELDS, limit])
+
+async def extract_cards_per_element(page, card_selector, fields, limit=None):
+    """Read candidate fields one element handle at a time (one round trip per lookup)"""
+    cards = await page.query_selector_all(card_selector)
+    raw_cards = []
+    for card in cards[:limit]:
+        raw = {}
+        for field, selectors in fields.items():
+            values = []
+            for selector in selectors:
+                element = await card.query_selector(selector)
+                if not element:
+                    values.append(None)
+                elif field in ATTRIBUTE_FIELDS:
+                    values.append(await element.get_attribute(ATTRIBUTE_FIELDS[field]))
+                else:
+                    values.append(await element.inner_text())
+            raw[field] = values
+        raw_cards.append(raw)
+    return raw_cards
+
+async def extract_cards(page, card_selector, fields, limit=None, mode=None):
+    """Extract raw cards using the configured mode ("batch" or "per_element")"""
+    if (mode or EXTRACTION_MODE) == "per_element":
+        return await extract_cards_per_element(page, card_selector, fields, limit)
+    return await extract_cards_batch(page, card_selector, fields, limit)
+
+def pick(candidates, accept=None):
+    """
+    First candidate that matched and passes accept; if none passes, the last one
+    that matched (mirrors the old "try selectors in order, break when it looks right" loops)
+    """
+    chosen = None
+    for value in candidates:
+        if value is None:
+            continue
+        chosen = value
+        if accept is None or accept(value):
+            break
+    return chosen
+
+def parse_details(details_text):
+    """Parse beds, baths and square footage out of a card's details text"""
+    beds = baths = living_area = None
+    if not details_text:
+        return beds, baths, living_area
+
+    # Parse beds
+    bed_match = re.search(r'(\d+)\s*(?:bed|bd)', details_text, re.IGNORECASE)
+    if bed_match:
+        beds = int(bed_match.group(1))
+
+    # Parse baths
+    bath_match = re.search(r'([\d\.]+)\s*(?:bath|ba)', details_text, re.IGNORECASE)
+    if bath_match:
+        baths = float(bath_match.group(1))
+
+    # Parse square footage
+    sqft_match = re.search(r'([\d,]+)\s*(?:sqft|sq\.?\s*ft)', details_text, re.IGNORECASE)
+    if sqft_match:
+        living_area = int(sqft_match.group(1).replace(',', ''))
+
+    return beds, baths, living_area
+
+def absolute_url(href, base):
+    if href and href.startswith('/'):
+        return base + href
+    return href
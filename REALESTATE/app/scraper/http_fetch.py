@@ -0,0 +1,171 @@
+# Plain-HTTP scraping mode - pooled keep-alive client with a local conditional-request cache
+#
+# Most search pages already carry their listings in the HTML (see embedded_json),
+# so a single GET is often enough. Scrapers use this first and only start the
+# browser when it fails (SCRAPER_MODE=http_first, the default).
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.scraper.browser_pool import USER_AGENT
+from app.scraper.extraction import ATTRIBUTE_FIELDS
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import hashlib
+import json
+import os
+import requests
+import threading
+import time
+
+SCRAPER_MODE = CONFIG["SCRAPER_MODE"]
+CACHE_DIR = CONFIG["HTTP_CACHE_DIR"]
+CACHE_TTL = CONFIG["HTTP_CACHE_TTL"]
+HTTP_TIMEOUT = 30
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# Bot walls come back as 200s too
+BLOCKED_MARKERS = ["captcha", "px-captcha", "are you a robot", "access to this page has been denied"]
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Shared keep-alive session; connections are pooled per host across all scrapers"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(DEFAULT_HEADERS)
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+    return _session
+
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.html"), os.path.join(CACHE_DIR, f"{key}.json")
+
+def _read_cache(url):
+    body_path, meta_path = _cache_paths(url)
+    if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+        return None, None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(body_path, encoding="utf-8", newline="") as f:
+        return f.read(), meta
+
+def _write_cache(url, body, response):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    body_path, meta_path = _cache_paths(url)
+    with open(body_path, "w", encoding="utf-8", newline="") as f:
+        f.write(body)
+    with open(meta_path, "w") as f:
+        json.dump({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }, f)
+
+def _touch_cache(url, meta):
+    _, meta_path = _cache_paths(url)
+    meta["fetched_at"] = time.time()
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+
+def looks_blocked(html):
+    lowered = html[:20000].lower()
+    return any(marker in lowered for marker in BLOCKED_MARKERS)
+
+def fetch_html(url, ttl=CACHE_TTL):
+    """
+    GET a page through the shared session and local cache.
+    Fresh cache entries are returned without a request; stale ones are revalidated
+    with If-None-Match / If-Modified-Since. Returns None on errors and bot walls.
+    """
+    cached, meta = _read_cache(url)
+    if cached is not None and time.time() - meta["fetched_at"] < ttl:
+        logger.info("HTTP cache hit: %s", url)
+        return cached
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        response = get_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning("HTTP fetch failed for %s: %s", url, e)
+        return None
+
+    if response.status_code == 304 and cached is not None:
+        logger.info("HTTP 304 not modified: %s", url)
+        _touch_cache(url, meta)
+        return cached
+    if response.status_code != 200:
+        logger.warning("HTTP %d for %s", response.status_code, url)
+        return None
+
+    html = response.text
+    if looks_blocked(html):
+        logger.warning("HTTP fetch of %s hit a bot wall", url)
+        return None
+    _write_cache(url, html, response)
+    logger.info("HTTP fetched %s (%d bytes)", url, len(html))
+    return html
+
+def make_soup(html):
+    """BeautifulSoup with lxml when it is installed, the stdlib parser otherwise"""
+    try:
+        return BeautifulSoup(html, "lxml")
+    except Exception:
+        return BeautifulSoup(html, "html.parser")
+
+def parse_cards_html(html, card_selectors, fields, limit=None):
+    """
+    Same raw cards as extraction.extract_cards, read from static HTML.
+    Uses the first card selector that matches anything. Returns [] if none do.
+    """
+    soup = make_soup(html)
+    for selector in card_selectors:
+        cards = soup.select(selector)
+        if cards:
+            break
+    else:
+        return []
+
+    raw_cards = []
+    for card in cards[:limit]:
+        raw = {}
+        for field, selectors in fields.items():
+            values = []
+            for selector in selectors:
+                element = card.select_one(selector)
+                if element is None:
+                    values.append(None)
+                elif field in ATTRIBUTE_FIELDS:
+                    values.append(element.get(ATTRIBUTE_FIELDS[field]))
+                else:
+                    values.append(element.get_text("\n", strip=True))
+            raw[field] = values
+        raw_cards.append(raw)
+    return raw_cards
+
+def use_http():
+    """Try plain HTTP first (SCRAPER_MODE http_first or http)"""
+    return SCRAPER_MODE != "browser"
+
+def browser_fallback():
+    """Start the browser when plain HTTP fails (every mode except http)"""
+    return SCRAPER_MODE != "http"
@@ -0,0 +1,52 @@
+# Incremental scraping - compare scraped cards with what the listings table already holds
+#
+# A listing is "new" if its URL isn't stored yet, "changed" if its price or status
+# differ from the stored row, and "unchanged" otherwise. Unchanged listings keep
+# their stored label and score instead of going through classification and scoring
+# again; they are still upserted so their other scraped fields stay current.
+from app.integrations.database_manager import get_known_listings
+from app.utils.config_loader import CONFIG
+
+INCREMENTAL = CONFIG["INCREMENTAL_SCRAPE"]
+
+CHANGE_KINDS = ("new", "changed", "unchanged")
+
+def _status_key(status):
+    return (status or "").strip().lower()
+
+def listing_change(listing, known):
+    """"new", "changed" or "unchanged" for one scraped listing against the stored rows"""
+    stored = known.get(listing.get("url"))
+    if stored is None:
+        return "new"
+    if stored["price"] != listing.get("price") or _status_key(stored["status"]) != _status_key(listing.get("status")):
+        return "changed"
+    return "unchanged"
+
+def page_is_unchanged(listings):
+    """True when every listing on a scraped page is already stored and unchanged"""
+    if not listings:
+        return False
+    known = get_known_listings(l.get("url") for l in listings)
+    return all(listing_change(l, known) == "unchanged" for l in listings)
+
+def split_by_change(listings):
+    """
+    Split scraped listings into (to_process, unchanged, counts).
+    to_process holds new and changed listings; unchanged ones get their stored
+    classified_label and score copied over, so upserting and exporting them keeps both.
+    """
+    known = get_known_listings(l.get("url") for l in listings)
+    counts = dict.fromkeys(CHANGE_KINDS, 0)
+    to_process, unchanged = [], []
+    for listing in listings:
+        change = listing_change(listing, known)
+        counts[change] += 1
+        if change == "unchanged":
+            stored = known[listing["url"]]
+            listing["classified_label"] = stored["classified_label"]
+            listing["score"] = stored["score"]
+            unchanged.append(listing)
+        else:
+            to_process.append(listing)
+    return to_process, unchanged, counts
@@ -0,0 +1,99 @@
+# Concurrent scrape orchestrator - runs every source at the same time and merges results as they finish.
+# The pipelines crawl through crawl_frontier.run_crawl; this is for one-off scrapes of whole sources.
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+from app.utils.mock_data import fallback_listings
+import inspect
+import time
+
+SOURCE_TIMEOUT = CONFIG["SCRAPE_SOURCE_TIMEOUT"]
+TOTAL_BUDGET = CONFIG["SCRAPE_TOTAL_BUDGET"]
+
+def _source_deadline(name, start, source_timeout, total_budget):
+    """Absolute deadline for one source: its own timeout, capped by the total run budget"""
+    if isinstance(source_timeout, dict):
+        timeout = source_timeout.get(name, SOURCE_TIMEOUT)
+    else:
+        timeout = source_timeout
+    return start + min(timeout, total_budget)
+
+def _takes_timeout(func):
+    try:
+        return "timeout" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+def scrape_all_sources(scrapers, use_mock=True, source_timeout=SOURCE_TIMEOUT,
+                       total_budget=TOTAL_BUDGET, on_result=None):
+    """
+    Run all scrapers concurrently and merge their listings as each one finishes.
+
+    scrapers       - dict of source name -> zero-argument callable returning a list of listings;
+                     one that accepts a `timeout` keyword is passed the seconds until its deadline
+    source_timeout - seconds per source, or a dict of source name -> seconds
+    total_budget   - hard cap in seconds for the whole scrape phase
+    on_result      - optional callback(name, listings) fired as soon as a source finishes
+
+    A source that fails, returns nothing or runs past its deadline falls back to mock data
+    (when use_mock is set), exactly like scrape_with_fallback. Worker threads cannot be
+    killed, so a timed-out scraper is abandoned rather than stopped - unless it takes a
+    timeout, like scrape_zillow/scrape_redfin/scrape_realtor, and cancels its own work.
+
+    Returns (all_results, report) where report maps source name -> status/count/seconds.
+    """
+    all_results = []
+    report = {}
+    start = time.monotonic()
+
+    def finish(name, listings, status):
+        elapsed = time.monotonic() - start
+        if not listings:
+            listings = fallback_listings(name, use_mock=use_mock)
+            if listings:
+                status = f"{status}+mock"
+        report[name] = {"status": status, "count": len(listings), "seconds": round(elapsed, 2)}
+        logger.info("%s finished (%s) with %d listings after %.1fs", name, status, len(listings), elapsed)
+        all_results.extend(listings)
+        if on_result:
+            on_result(name, listings)
+
+    executor = ThreadPoolExecutor(max_workers=max(len(scrapers), 1), thread_name_prefix="scrape")
+    try:
+        pending = {}
+        for name, func in scrapers.items():
+            logger.info(f"Attempting to scrape {name}...")
+            deadline = _source_deadline(name, start, source_timeout, total_budget)
+            if _takes_timeout(func):
+                future = executor.submit(func, timeout=max(deadline - time.monotonic(), 0))
+            else:
+                future = executor.submit(func)
+            pending[future] = (name, deadline)
+
+        while pending:
+            now = time.monotonic()
+            for future, (name, deadline) in list(pending.items()):
+                if now >= deadline and not future.done():
+                    logger.warning("%s exceeded its scrape deadline, abandoning it", name)
+                    future.cancel()
+                    del pending[future]
+                    finish(name, [], "timeout")
+            if not pending:
+                break
+
+            next_deadline = min(deadline for _, deadline in pending.values())
+            done, _ = wait(pending, timeout=max(next_deadline - now, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, _ = pending.pop(future)
+                try:
+                    results = future.result()
+                    finish(name, results or [], "ok" if results else "empty")
+                except Exception as e:
+                    logger.exception(f"Error in {name} scraper: %s", e)
+                    finish(name, [], "error")
+    finally:
+        # Don't block on abandoned scrapers
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    logger.info("Scrape phase finished in %.1fs with %d listings", time.monotonic() - start, len(all_results))
+    return all_results, report
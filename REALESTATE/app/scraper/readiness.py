@@ -0,0 +1,70 @@
+# Event-driven page readiness for the scrapers
+#
+# Render waits (waiting for listing cards to exist) are kept separate from
+# politeness delays (deliberate pauses between requests to the same site) so
+# each can be tuned - and measured - on its own.
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from app.utils.config_loader import CONFIG
+from app.utils.logger import logger
+import asyncio
+import random
+import time
+
+RENDER_TIMEOUT_MS = int(CONFIG["SCRAPER_RENDER_TIMEOUT"] * 1000)
+POLITENESS_SCALE = CONFIG["SCRAPER_POLITENESS_SCALE"]
+
+# Returns the first candidate selector (in priority order) present in the DOM, or null
+FIRST_MATCH_JS = "selectors => selectors.find(s => document.querySelector(s)) || null"
+
+# Per-page wait measurements for the current run, see wait_report()
+WAIT_LOG = []
+
+async def wait_for_any_selector(page, selectors, timeout=RENDER_TIMEOUT_MS):
+    """
+    Wait once for all candidate selectors together and return as soon as any matches.
+    Returns (matched selector or None, seconds waited).
+    """
+    started = time.monotonic()
+    try:
+        handle = await page.wait_for_function(FIRST_MATCH_JS, arg=selectors, timeout=timeout)
+        selector = await handle.json_value()
+    except PlaywrightTimeoutError:
+        selector = None
+    return selector, time.monotonic() - started
+
+async def polite_delay(low, high):
+    """Sleep a random politeness interval (scaled by SCRAPER_POLITENESS_SCALE); returns seconds slept"""
+    delay = random.uniform(low, high) * POLITENESS_SCALE
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return delay
+
+def record_wait(source, url, render_seconds, polite_seconds=0.0, matched=None):
+    """Log and keep one page's wait times for the run report"""
+    WAIT_LOG.append({
+        "source": source,
+        "url": url,
+        "render_seconds": round(render_seconds, 3),
+        "polite_seconds": round(polite_seconds, 3),
+        "matched": matched,
+    })
+    logger.info("%s: %s ready in %.2fs (politeness %.2fs, selector %s)",
+                source, url, render_seconds, polite_seconds, matched)
+
+def reset_wait_log():
+    WAIT_LOG.clear()
+
+def wait_report():
+    """Per-source totals of render and politeness waits recorded this run"""
+    report = {}
+    for entry in WAIT_LOG:
+        stats = report.setdefault(entry["source"], {
+            "pages": 0, "render_seconds": 0.0, "polite_seconds": 0.0, "max_render_seconds": 0.0, "no_match": 0
+        })
+        stats["pages"] += 1
+        stats["render_seconds"] = round(stats["render_seconds"] + entry["render_seconds"], 3)
+        stats["polite_seconds"] = round(stats["polite_seconds"] + entry["polite_seconds"], 3)
+        stats["max_render_seconds"] = max(stats["max_render_seconds"], entry["render_seconds"])
+        if entry["matched"] is None:
+            stats["no_match"] += 1
+    return report
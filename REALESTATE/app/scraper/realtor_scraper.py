@@ -1,14 +1,64 @@
 # Updated Realtor.com scraper with Playwright and current selectors  
-from playwright.sync_api import sync_playwright
+from app.scraper.browser_pool import get_browser_pool, gather_cities, run_sync
+from app.scraper.extraction import extract_cards, pick, parse_details, absolute_url
+from app.scraper.embedded_json import extract_realtor_listings, try_embedded
+from app.scraper.http_fetch import fetch_html, parse_cards_html, use_http, browser_fallback
+from app.scraper.readiness import wait_for_any_selector, record_wait
 from app.utils.config_loader import CONFIG
 from app.utils.logger import logger
-import time
+import asyncio
 import re
-import random
 import urllib.parse
 
 TARGET_CITY = CONFIG["TARGET_CITY"]
-HEADLESS = CONFIG["PLAYWRIGHT_HEADLESS"]
+
+# Set additional headers to avoid detection
+EXTRA_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Cache-Control': 'no-cache',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Try multiple selectors for property cards
+CARD_SELECTORS = [
+    '[data-testid="property-card"]',
+    '.BasePropertyCard',
+    '[data-rf-test-name="PropertyCard"]',
+    '.property-card-primary',
+    '.card-content',
+    '[class*="PropertyCard"]'
+]
+
+# Cookie consent buttons that can cover the results
+COOKIE_SELECTORS = ['button[aria-label*="Accept"]', 'button[id*="cookie"]', 'button[class*="consent"]']
+
+# Fallback: try generic selectors
+GENERIC_CARD_SELECTORS = ['[class*="card"]', '[class*="listing"]', '[class*="property"]']
+
+# Candidate selectors per field, tried in order within each card
+CARD_FIELDS = {
+    "price": [
+        '[data-testid="card-price"]',
+        '.price-display',
+        '.card-price',
+        '[class*="price"]'
+    ],
+    "address": [
+        '[data-testid="card-address"]',
+        '.card-address', 
+        '.property-address',
+        '[class*="address"]'
+    ],
+    "href": ['a[href*="/realestateandhomes-detail/"]', 'a'],
+    "details": [
+        '[data-testid="property-meta"]',
+        '.card-meta',
+        '.property-meta',
+        '.card-details'
+    ]
+}
 
 def parse_price(text):
     if not text:
@@ -17,18 +67,7 @@ def parse_price(text):
     s = re.sub(r"[^\d]", "", text)
     return int(s) if s else None
 
-def parse_number(text, default=None):
-    if not text:
-        return default
-    match = re.search(r'([\d,\.]+)', text.replace(',', ''))
-    if match:
-        try:
-            return float(match.group(1)) if '.' in match.group(1) else int(match.group(1))
-        except ValueError:
-            return default
-    return default
-
-def build_realtor_search_url(city: str, state: str = None):
+def build_realtor_search_url(city: str, state: str = None, page_num: int = 1):
     """Build Realtor.com search URL"""
     # Parse city and state from TARGET_CITY if it contains comma
     if ',' in city:
@@ -45,197 +84,135 @@ def build_realtor_search_url(city: str, state: str = None):
     
     # Realtor.com search URL format
     base_url = "https://www.realtor.com/realestateandhomes-search"
-    return f"{base_url}/{city_encoded}_{state_encoded}"
+    url = f"{base_url}/{city_encoded}_{state_encoded}"
+    if page_num > 1:
+        url = f"{url}/pg-{page_num}"
+    return url
+
+def looks_like_price(text):
+    return '$' in text
+
+def looks_like_address(text):
+    text = text.strip()
+    return len(text) > 10 and ('St' in text or 'Ave' in text or 'Rd' in text or 'Dr' in text or text.count(' ') >= 2)
+
+def build_listing(raw, i):
+    """Turn one raw extracted card into a Realtor.com listing (None if it doesn't look like one)"""
+    # Ensure the price looks like a price and skip anything that doesn't look like an address
+    price_text = pick(raw["price"], accept=looks_like_price)
+    address = pick(raw["address"], accept=looks_like_address)
+    href = absolute_url(pick(raw["href"], accept=bool), "https://www.realtor.com")
+    beds, baths, living_area = parse_details(pick(raw["details"]))
+    
+    price_text = price_text.strip() if price_text else None
+    address = address.strip() if address else None
+    
+    # Only add listings with meaningful data
+    if not ((price_text and '$' in price_text) or (address and len(address) > 10)):
+        return None
+    return {
+        "source": "realtor",
+        "url": href,
+        "address": address,
+        "price": parse_price(price_text),
+        "beds": beds,
+        "baths": baths,
+        "living_area": living_area,
+        "raw_json": {
+            "price_text": price_text,
+            "listing_index": i
+        }
+    }
 
-def setup_browser_context(browser):
-    """Setup browser context with realistic headers"""
-    context = browser.new_context(
-        viewport={'width': 1920, 'height': 1080},
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    )
-    return context
+def parse_search_html(html):
+    """Listings from a static copy of a search page: embedded JSON first, then the cards"""
+    listings = try_embedded(extract_realtor_listings, html, "Realtor.com")
+    if listings:
+        return listings
+    cards = parse_cards_html(html, CARD_SELECTORS, CARD_FIELDS, limit=15)
+    return [l for l in (build_listing(card, i) for i, card in enumerate(cards)) if l]
 
-def scrape_realtor(max_pages=1):
+async def scrape_realtor_async(max_pages=1, city=TARGET_CITY, pool=None, page_num=1, polite_seconds=0.0):
     """
-    Scrape Realtor.com for property listings
+    Scrape Realtor.com for one city (one results page) using a page borrowed from the shared browser pool
     Note: Realtor.com is heavily protected and may require additional anti-detection measures
     """
     results = []
+    url = build_realtor_search_url(city, page_num=page_num)
+    
+    if use_http():
+        html = await asyncio.to_thread(fetch_html, url)
+        if html:
+            results = parse_search_html(html)
+            if results:
+                logger.info("Realtor.com: read %d listings from %s without a browser", len(results), url)
+                return results
+        if not browser_fallback():
+            return results
+        logger.info("Realtor.com: plain HTTP failed for %s, falling back to the browser", url)
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS)
-        context = setup_browser_context(browser)
-        page = context.new_page()
+    pool = pool or await get_browser_pool()
+    async with pool.page() as page:
+        await page.set_extra_http_headers(EXTRA_HEADERS)
         
-        # Set additional headers to avoid detection
-        page.set_extra_http_headers({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Cache-Control': 'no-cache',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        # Navigate to Realtor.com search results
+        logger.info("Realtor.com: navigating to %s", url)
         
-        try:
-            # Navigate to Realtor.com search results
-            url = build_realtor_search_url(TARGET_CITY)
-            logger.info("Realtor.com: navigating to %s", url)
-            
-            # Navigate with extended timeout
-            page.goto(url, timeout=90000, wait_until='networkidle')
-            time.sleep(random.uniform(4, 8))
-            
+        # Navigate with extended timeout; readiness is decided by the cards, not network idle
+        await page.goto(url, timeout=90000, wait_until='domcontentloaded')
+        
+        # Fast path: the search results ship as __NEXT_DATA__ in the initial HTML
+        results = try_embedded(extract_realtor_listings, await page.content(), "Realtor.com")
+        if results:
+            return results
+        
+        # Wait for either the listings or a cookie consent banner, whichever shows up first
+        selector, render_seconds = await wait_for_any_selector(page, CARD_SELECTORS + COOKIE_SELECTORS)
+        if selector in COOKIE_SELECTORS:
             # Handle potential bot detection or cookie consent
             try:
-                # Look for cookie consent buttons
-                cookie_selectors = ['button[aria-label*="Accept"]', 'button[id*="cookie"]', 'button[class*="consent"]']
-                for selector in cookie_selectors:
-                    element = page.query_selector(selector)
-                    if element:
-                        element.click()
-                        time.sleep(1)
-                        break
-            except:
+                await page.click(selector, timeout=5000)
+            except Exception:
                 pass
-            
-            # Wait for listings to appear
-            time.sleep(random.uniform(3, 6))
-            
-            # Try multiple selectors for property cards
-            card_selectors = [
-                '[data-testid="property-card"]',
-                '.BasePropertyCard',
-                '[data-rf-test-name="PropertyCard"]',
-                '.property-card-primary',
-                '.card-content',
-                '[class*="PropertyCard"]'
-            ]
-            
-            cards = []
-            for selector in card_selectors:
-                try:
-                    page.wait_for_selector(selector, timeout=10000)
-                    cards = page.query_selector_all(selector)
-                    if cards:
-                        logger.info(f"Found {len(cards)} Realtor.com cards using selector: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not cards:
-                # Fallback: try generic selectors
-                generic_selectors = ['[class*="card"]', '[class*="listing"]', '[class*="property"]']
-                for selector in generic_selectors:
-                    cards = page.query_selector_all(selector)
-                    if len(cards) > 5:  # Only if we find a reasonable number
-                        logger.info(f"Using fallback selector {selector}, found {len(cards)} elements")
-                        break
-            
-            if not cards:
-                logger.warning("No property cards found on Realtor.com")
-                return results
-            
-            # Process each card
-            for i, card in enumerate(cards[:15]):  # Limit to avoid detection
-                try:
-                    # Extract price
-                    price_text = None
-                    price_selectors = [
-                        '[data-testid="card-price"]',
-                        '.price-display',
-                        '.card-price',
-                        '[class*="price"]'
-                    ]
-                    
-                    for selector in price_selectors:
-                        element = card.query_selector(selector)
-                        if element:
-                            price_text = element.inner_text().strip()
-                            if '$' in price_text:  # Ensure it looks like a price
-                                break
-                    
-                    # Extract address
-                    address = None
-                    address_selectors = [
-                        '[data-testid="card-address"]',
-                        '.card-address', 
-                        '.property-address',
-                        '[class*="address"]'
-                    ]
-                    
-                    for selector in address_selectors:
-                        element = card.query_selector(selector)
-                        if element:
-                            address = element.inner_text().strip()
-                            # Skip if it doesn't look like an address
-                            if len(address) > 10 and ('St' in address or 'Ave' in address or 'Rd' in address or 'Dr' in address or address.count(' ') >= 2):
-                                break
-                    
-                    # Extract URL
-                    href = None
-                    link_element = card.query_selector('a[href*="/realestateandhomes-detail/"]') or card.query_selector('a')
-                    if link_element:
-                        href = link_element.get_attribute('href')
-                        if href and href.startswith('/'):
-                            href = "https://www.realtor.com" + href
-                    
-                    # Extract property details (beds, baths, sqft)
-                    beds = baths = living_area = None
-                    
-                    detail_selectors = [
-                        '[data-testid="property-meta"]',
-                        '.card-meta',
-                        '.property-meta',
-                        '.card-details'
-                    ]
-                    
-                    for selector in detail_selectors:
-                        details_element = card.query_selector(selector)
-                        if details_element:
-                            details_text = details_element.inner_text()
-                            
-                            # Parse beds
-                            bed_match = re.search(r'(\d+)\s*(?:bed|bd)', details_text, re.IGNORECASE)
-                            if bed_match:
-                                beds = int(bed_match.group(1))
-                            
-                            # Parse baths
-                            bath_match = re.search(r'([\d\.]+)\s*(?:bath|ba)', details_text, re.IGNORECASE)
-                            if bath_match:
-                                baths = float(bath_match.group(1))
-                            
-                            # Parse square footage
-                            sqft_match = re.search(r'([\d,]+)\s*(?:sqft|sq\.?\s*ft)', details_text, re.IGNORECASE)
-                            if sqft_match:
-                                living_area = int(sqft_match.group(1).replace(',', ''))
-                            
-                            break
-                    
-                    # Only add listings with meaningful data
-                    if (price_text and '$' in price_text) or (address and len(address) > 10):
-                        results.append({
-                            "source": "realtor",
-                            "url": href,
-                            "address": address,
-                            "price": parse_price(price_text),
-                            "beds": beds,
-                            "baths": baths,
-                            "living_area": living_area,
-                            "raw_json": {
-                                "price_text": price_text,
-                                "listing_index": i
-                            }
-                        })
-                
-                except Exception as e:
-                    logger.exception(f"Error parsing Realtor.com card {i}: %s", e)
-                    continue
+            selector, card_seconds = await wait_for_any_selector(page, CARD_SELECTORS)
+            render_seconds += card_seconds
+        record_wait("Realtor", url, render_seconds, polite_seconds, selector)
         
-        except Exception as e:
-            logger.exception("Error during Realtor.com scraping: %s", e)
+        cards = []
+        if selector:
+            cards = await extract_cards(page, selector, CARD_FIELDS, limit=15)  # Limit to avoid detection
+            logger.info(f"Found {len(cards)} Realtor.com cards using selector: {selector}")
         
-        finally:
-            browser.close()
+        if not cards:
+            for selector in GENERIC_CARD_SELECTORS:
+                # Only if we find a reasonable number
+                if await page.locator(selector).count() > 5:
+                    cards = await extract_cards(page, selector, CARD_FIELDS, limit=15)
+                    logger.info(f"Using fallback selector {selector}, found {len(cards)} elements")
+                    break
+        
+        if not cards:
+            logger.warning("No property cards found on Realtor.com")
+            return results
+        
+        # Process each card
+        for i, card in enumerate(cards):
+            try:
+                listing = build_listing(card, i)
+                if listing:
+                    results.append(listing)
+            except Exception as e:
+                logger.exception(f"Error parsing Realtor.com card {i}: %s", e)
+                continue
     
-    logger.info(f"Realtor.com scraping completed. Found {len(results)} listings")
+    logger.info(f"Realtor.com scraping completed for {city}. Found {len(results)} listings")
     return results
+
+def scrape_realtor(max_pages=1, cities=None, timeout=None):
+    """
+    Blocking entry point; runs on the long-lived browser shared by all scrapers.
+    After `timeout` seconds the scrape is cancelled, handing its browser pages back to the pool.
+    """
+    if cities:
+        return run_sync(gather_cities(scrape_realtor_async, cities, max_pages=max_pages), timeout=timeout)
+    return run_sync(scrape_realtor_async(max_pages=max_pages), timeout=timeout)
@@ -1,14 +1,62 @@
 # Updated Redfin scraper with Playwright and current selectors
-from playwright.sync_api import sync_playwright
+from app.scraper.browser_pool import get_browser_pool, gather_cities, run_sync
+from app.scraper.extraction import extract_cards, pick, parse_details, absolute_url
+from app.scraper.embedded_json import extract_redfin_listings, try_embedded
+from app.scraper.http_fetch import fetch_html, parse_cards_html, use_http, browser_fallback
+from app.scraper.readiness import wait_for_any_selector, polite_delay, record_wait
 from app.utils.config_loader import CONFIG
 from app.utils.logger import logger
-import time
+import asyncio
 import re
-import random
-import json
 
 TARGET_CITY = CONFIG["TARGET_CITY"]
-HEADLESS = CONFIG["PLAYWRIGHT_HEADLESS"]
+
+EXTRA_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# Search box on the home page
+SEARCH_SELECTORS = [
+    'input[data-rf-test-id="search-box-input"]',
+    'input[placeholder*="search"]',
+    'input#search-box-input',
+    '.search-input-box input'
+]
+
+# Look for listing containers with multiple selectors
+CARD_SELECTORS = [
+    '[data-rf-test-id="mapListViewListingCard"]',
+    '.HomeCard',
+    '.listingCard',
+    '.SearchResultsGrid .listingCard',
+    '[class*="HomeCard"]'
+]
+
+# Candidate selectors per field, tried in order within each card
+CARD_FIELDS = {
+    "price": [
+        '[data-rf-test-id="listingCard-price"]',
+        '.homecardV2Price',
+        '.price',
+        '[class*="price"]'
+    ],
+    "address": [
+        '[data-rf-test-id="listingCard-address"]',
+        '.homecardV2Address',
+        '.address',
+        '[class*="address"]'
+    ],
+    "href": ['a[href*="/home/"]', 'a'],
+    # Look for beds/baths/sqft info
+    "details": [
+        '[data-rf-test-id="listingCard-stats"]',
+        '.homecardV2Stats',
+        '.stats',
+        '.HomeStatsV2'
+    ]
+}
 
 def parse_price(text):
     if not text:
@@ -17,210 +65,132 @@ def parse_price(text):
     s = re.sub(r"[^\d]", "", text)
     return int(s) if s else None
 
-def parse_number(text, default=None):
-    if not text:
-        return default
-    match = re.search(r'([\d,\.]+)', text.replace(',', ''))
-    if match:
-        try:
-            return float(match.group(1)) if '.' in match.group(1) else int(match.group(1))
-        except ValueError:
-            return default
-    return default
-
 def build_redfin_search_url(city: str, page_num: int = 1):
     """Build Redfin search URL for a given city"""
     # Redfin uses a different URL structure - we'll search for the city first
     city_formatted = city.replace(' ', '-').replace(',', '').lower()
     # Start with a basic city search
     base_url = f"https://www.redfin.com/city/{city_formatted}"
+    if page_num > 1:
+        return f"{base_url}/page-{page_num}"
     return base_url
 
-def setup_browser_context(browser):
-    """Setup browser context with realistic headers to avoid detection"""
-    context = browser.new_context(
-        viewport={'width': 1920, 'height': 1080},
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    )
-    return context
+def build_listing(raw, i):
+    """Turn one raw extracted card into a Redfin listing (None if the card is empty)"""
+    price_text = pick(raw["price"])
+    address = pick(raw["address"])
+    href = absolute_url(pick(raw["href"], accept=bool), "https://www.redfin.com")
+    beds, baths, living_area = parse_details(pick(raw["details"]))
+    
+    price_text = price_text.strip() if price_text else None
+    address = address.strip() if address else None
+    
+    # Only add if we have meaningful data
+    if not (price_text or address):
+        return None
+    return {
+        "source": "redfin",
+        "url": href,
+        "address": address,
+        "price": parse_price(price_text),
+        "beds": beds,
+        "baths": baths,
+        "living_area": living_area,
+        "raw_json": {
+            "price_text": price_text,
+            "listing_index": i
+        }
+    }
+
+def parse_search_html(html):
+    """Listings from a static copy of a search page: preloaded search data first, then the cards"""
+    listings = try_embedded(extract_redfin_listings, html, "Redfin")
+    if listings:
+        return listings
+    cards = parse_cards_html(html, CARD_SELECTORS, CARD_FIELDS, limit=20)
+    return [l for l in (build_listing(card, i) for i, card in enumerate(cards)) if l]
 
-def scrape_redfin(max_pages=2):
+async def scrape_redfin_async(max_pages=2, city=TARGET_CITY, pool=None, page_num=1, polite_seconds=0.0):
+    """Search Redfin for one city (one results page) using a page borrowed from the shared browser pool"""
     results = []
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS)
-        context = setup_browser_context(browser)
-        page = context.new_page()
-        
+    if use_http():
+        url = build_redfin_search_url(city, page_num)
+        html = await asyncio.to_thread(fetch_html, url)
+        if html:
+            results = parse_search_html(html)
+            if results:
+                logger.info("Redfin: read %d listings from %s without a browser", len(results), url)
+                return results
+        if not browser_fallback():
+            return results
+        logger.info("Redfin: plain HTTP failed for %s, falling back to the browser", url)
+    
+    pool = pool or await get_browser_pool()
+    async with pool.page() as page:
         # Set additional headers
-        page.set_extra_http_headers({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-        })
+        await page.set_extra_http_headers(EXTRA_HEADERS)
         
-        try:
+        search_selector, search_seconds = None, 0.0
+        if page_num == 1:
             # First, navigate to Redfin and search for the city
-            logger.info("Redfin: Starting search for %s", TARGET_CITY)
-            page.goto("https://www.redfin.com/", timeout=60000)
-            time.sleep(random.uniform(2, 4))
+            logger.info("Redfin: Starting search for %s", city)
+            await page.goto("https://www.redfin.com/", timeout=60000, wait_until='domcontentloaded')
             
             # Try to use the search box
-            search_selectors = [
-                'input[data-rf-test-id="search-box-input"]',
-                'input[placeholder*="search"]',
-                'input#search-box-input',
-                '.search-input-box input'
-            ]
-            
-            search_input = None
-            for selector in search_selectors:
-                try:
-                    search_input = page.wait_for_selector(selector, timeout=5000)
-                    break
-                except:
-                    continue
-            
-            if search_input:
-                # Clear and type the city name
-                search_input.fill("")  # Use fill instead of clear for Playwright
-                search_input.type(TARGET_CITY, delay=100)
-                time.sleep(2)
-                
-                # Press Enter or click search
-                page.keyboard.press('Enter')
-                time.sleep(3)
-            else:
-                # Fallback: try direct URL navigation
-                url = build_redfin_search_url(TARGET_CITY)
-                logger.info("Redfin: Direct navigation to %s", url)
-                page.goto(url, timeout=60000)
-            
-            # Wait for listings to load
-            page.wait_for_load_state('networkidle', timeout=30000)
-            time.sleep(random.uniform(3, 6))
-            
-            # Look for listing containers with multiple selectors
-            listing_selectors = [
-                '[data-rf-test-id="mapListViewListingCard"]',
-                '.HomeCard',
-                '.listingCard',
-                '.SearchResultsGrid .listingCard',
-                '[class*="HomeCard"]'
-            ]
-            
-            listings = []
-            for selector in listing_selectors:
-                try:
-                    listings = page.query_selector_all(selector)
-                    if listings:
-                        logger.info(f"Found {len(listings)} Redfin listings using selector: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not listings:
-                logger.warning("No Redfin listings found with any selector")
-                return results
+            search_selector, search_seconds = await wait_for_any_selector(page, SEARCH_SELECTORS, timeout=5000)
+        
+        if search_selector:
+            search_input = await page.query_selector(search_selector)
+            # Clear and type the city name
+            await search_input.fill("")  # Use fill instead of clear for Playwright
+            await search_input.type(city, delay=100)
+            polite_seconds += await polite_delay(1, 2)
             
-            for i, listing in enumerate(listings[:20]):  # Limit to avoid being detected
-                try:
-                    # Extract price
-                    price_text = None
-                    price_selectors = [
-                        '[data-rf-test-id="listingCard-price"]',
-                        '.homecardV2Price',
-                        '.price',
-                        '[class*="price"]'
-                    ]
-                    
-                    for selector in price_selectors:
-                        element = listing.query_selector(selector)
-                        if element:
-                            price_text = element.inner_text().strip()
-                            break
-                    
-                    # Extract address
-                    address = None
-                    address_selectors = [
-                        '[data-rf-test-id="listingCard-address"]',
-                        '.homecardV2Address',
-                        '.address',
-                        '[class*="address"]'
-                    ]
-                    
-                    for selector in address_selectors:
-                        element = listing.query_selector(selector)
-                        if element:
-                            address = element.inner_text().strip()
-                            break
-                    
-                    # Extract URL
-                    href = None
-                    link_element = listing.query_selector('a[href*="/home/"]') or listing.query_selector('a')
-                    if link_element:
-                        href = link_element.get_attribute('href')
-                        if href and href.startswith('/'):
-                            href = "https://www.redfin.com" + href
-                    
-                    # Extract property details
-                    beds = baths = living_area = None
-                    
-                    # Look for beds/baths/sqft info
-                    stats_selectors = [
-                        '[data-rf-test-id="listingCard-stats"]',
-                        '.homecardV2Stats',
-                        '.stats',
-                        '.HomeStatsV2'
-                    ]
-                    
-                    for selector in stats_selectors:
-                        stats_element = listing.query_selector(selector)
-                        if stats_element:
-                            stats_text = stats_element.inner_text()
-                            
-                            # Parse beds
-                            bed_match = re.search(r'(\d+)\s*(?:bed|bd)', stats_text, re.IGNORECASE)
-                            if bed_match:
-                                beds = int(bed_match.group(1))
-                            
-                            # Parse baths  
-                            bath_match = re.search(r'([\d\.]+)\s*(?:bath|ba)', stats_text, re.IGNORECASE)
-                            if bath_match:
-                                baths = float(bath_match.group(1))
-                            
-                            # Parse square footage
-                            sqft_match = re.search(r'([\d,]+)\s*(?:sqft|sq\.?\s*ft)', stats_text, re.IGNORECASE)
-                            if sqft_match:
-                                living_area = int(sqft_match.group(1).replace(',', ''))
-                            
-                            break
-                    
-                    # Only add if we have meaningful data
-                    if price_text or address:
-                        results.append({
-                            "source": "redfin",
-                            "url": href,
-                            "address": address,
-                            "price": parse_price(price_text),
-                            "beds": beds,
-                            "baths": baths,
-                            "living_area": living_area,
-                            "raw_json": {
-                                "price_text": price_text,
-                                "listing_index": i
-                            }
-                        })
-                
-                except Exception as e:
-                    logger.exception(f"Error parsing Redfin listing {i}: %s", e)
-                    continue
+            # Press Enter or click search
+            await page.keyboard.press('Enter')
+            url = f"search:{city}"
+        else:
+            # Fallback (and later result pages): direct URL navigation
+            url = build_redfin_search_url(city, page_num)
+            logger.info("Redfin: Direct navigation to %s", url)
+            await page.goto(url, timeout=60000, wait_until='domcontentloaded')
+        
+        # Wait for listings to load
+        selector, render_seconds = await wait_for_any_selector(page, CARD_SELECTORS)
+        record_wait("Redfin", url, search_seconds + render_seconds, polite_seconds, selector)
         
-        except Exception as e:
-            logger.exception("Error during Redfin scraping: %s", e)
+        # Prefer the preloaded search API data; it has lot size, year built and status
+        results = try_embedded(extract_redfin_listings, await page.content(), "Redfin")
+        if results:
+            return results
         
-        finally:
-            browser.close()
+        listings = []
+        if selector:
+            listings = await extract_cards(page, selector, CARD_FIELDS, limit=20)  # Limit to avoid being detected
+            logger.info(f"Found {len(listings)} Redfin listings using selector: {selector}")
+        
+        if not listings:
+            logger.warning("No Redfin listings found with any selector")
+            return results
+        
+        for i, listing in enumerate(listings):
+            try:
+                parsed = build_listing(listing, i)
+                if parsed:
+                    results.append(parsed)
+            except Exception as e:
+                logger.exception(f"Error parsing Redfin listing {i}: %s", e)
+                continue
     
-    logger.info(f"Redfin scraping completed. Found {len(results)} listings")
+    logger.info(f"Redfin scraping completed for {city}. Found {len(results)} listings")
     return results
+
+def scrape_redfin(max_pages=2, cities=None, timeout=None):
+    """
+    Blocking entry point; runs on the long-lived browser shared by all scrapers.
+    After `timeout` seconds the scrape is cancelled, handing its browser pages back to the pool.
+    """
+    if cities:
+        return run_sync(gather_cities(scrape_redfin_async, cities, max_pages=max_pages), timeout=timeout)
+    return run_sync(scrape_redfin_async(max_pages=max_pages), timeout=timeout)
@@ -1,13 +1,53 @@
 # Updated Zillow scraper with current website selectors and anti-detection measures
-from playwright.sync_api import sync_playwright
+from app.scraper.browser_pool import get_browser_pool, gather_cities, run_sync
+from app.scraper.extraction import extract_cards, pick, parse_details, absolute_url
+from app.scraper.embedded_json import extract_zillow_listings, try_embedded
+from app.scraper.http_fetch import fetch_html, parse_cards_html, use_http, browser_fallback
+from app.scraper.readiness import wait_for_any_selector, polite_delay, record_wait
 from app.utils.config_loader import CONFIG
 from app.utils.logger import logger
-import time
+import asyncio
 import re
-import random
 
 TARGET_CITY = CONFIG["TARGET_CITY"]
-HEADLESS = CONFIG["PLAYWRIGHT_HEADLESS"]
+
+EXTRA_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Wait for listings to load - any of these, in priority order
+CARD_SELECTORS = [
+    '[data-testid="property-card"]',
+    'article[data-zpid]',
+    '.ListItem-c11n-8-84-3__sc-10e22w8-0',
+    '.list-card-wrapper',
+    '[role="listitem"]'
+]
+
+# Candidate selectors per field, tried in order within each card
+CARD_FIELDS = {
+    "price": [
+        '[data-testid="property-card-price"]',
+        '.PropertyCardWrapper__StyledPriceLine',
+        '.list-card-price',
+        '.price'
+    ],
+    "address": [
+        '[data-testid="property-card-addr"]',
+        'address',
+        '.list-card-addr',
+        '.StyledPropertyCardDataArea-address'
+    ],
+    "href": ['a[href*="/homedetails/"]', 'a[href*="/b/"]', 'a'],
+    "details": [
+        '[data-testid="property-card-details"]',
+        '.list-card-details',
+        '.PropertyCardWrapper__StyledPropertyCardDataArea'
+    ]
+}
 
 def parse_price(text):
     if not text:
@@ -16,18 +56,6 @@ def parse_price(text):
     s = re.sub(r"[^\d]", "", text)
     return int(s) if s else None
 
-def parse_number(text, default=None):
-    if not text:
-        return default
-    # Extract numbers including decimals
-    match = re.search(r'([\d,\.]+)', text.replace(',', ''))
-    if match:
-        try:
-            return float(match.group(1)) if '.' in match.group(1) else int(match.group(1))
-        except ValueError:
-            return default
-    return default
-
 def zillow_search_url(city: str, page_num: int = 1):
     # Updated Zillow search URL format for for-sale properties
     city_formatted = city.replace(' ', '-').replace(',', '').lower()
@@ -38,173 +66,124 @@ def zillow_search_url(city: str, page_num: int = 1):
     else:
         return f"{base_url}/{page_num}_p/"
 
-def setup_browser_context(browser):
-    """Setup browser context with realistic headers and settings"""
-    context = browser.new_context(
-        viewport={'width': 1920, 'height': 1080},
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    )
-    return context
+def build_listing(raw, pg, i):
+    """Turn one raw extracted card into a Zillow listing (None if the card is empty)"""
+    price_text = pick(raw["price"])
+    address = pick(raw["address"])
+    href = absolute_url(pick(raw["href"], accept=bool), "https://www.zillow.com")
+    beds, baths, living_area = parse_details(pick(raw["details"]))
+    
+    price_text = price_text.strip() if price_text else None
+    address = address.strip() if address else None
+    
+    # Only add if we have at least a price or address
+    if not (price_text or address):
+        return None
+    return {
+        "source": "zillow",
+        "url": href,
+        "address": address,
+        "price": parse_price(price_text),
+        "beds": beds,
+        "baths": baths,
+        "living_area": living_area,
+        "raw_json": {
+            "price_text": price_text,
+            "page_number": pg,
+            "card_index": i
+        }
+    }
+
+def parse_search_html(html, pg):
+    """Listings from a static copy of a search page: embedded JSON first, then the cards"""
+    listings = try_embedded(extract_zillow_listings, html, "Zillow", pg)
+    if listings:
+        return listings
+    cards = parse_cards_html(html, CARD_SELECTORS, CARD_FIELDS)
+    return [l for l in (build_listing(card, pg, i) for i, card in enumerate(cards)) if l]
 
-def scrape_zillow(max_pages=2):
+async def scrape_zillow_page(pool, city, pg, polite_seconds=0.0):
+    """Scrape one Zillow search results page, over plain HTTP if possible, else with a pooled browser page"""
     results = []
+    url = zillow_search_url(city, pg)
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS)
-        context = setup_browser_context(browser)
-        page = context.new_page()
-        
+    if use_http():
+        html = await asyncio.to_thread(fetch_html, url)
+        if html:
+            results = parse_search_html(html, pg)
+            if results:
+                logger.info("Zillow: read %d listings from %s without a browser", len(results), url)
+                return results
+        if not browser_fallback():
+            return results
+        logger.info("Zillow: plain HTTP failed for %s, falling back to the browser", url)
+    
+    async with pool.page() as page:
         # Set additional headers to look more like a real browser
-        page.set_extra_http_headers({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        await page.set_extra_http_headers(EXTRA_HEADERS)
+        logger.info("Zillow: navigating to %s", url)
+        
+        # Cards are rendered client-side, so don't wait for the network to go idle -
+        # wait for the first card selector to show up instead
+        await page.goto(url, timeout=90000, wait_until='domcontentloaded')
         
-        for pg in range(1, max_pages + 1):
-            try:
-                url = zillow_search_url(TARGET_CITY, pg)
-                logger.info("Zillow: navigating to %s", url)
-                
-                # Navigate with longer timeout and wait for network idle
-                page.goto(url, timeout=90000, wait_until='networkidle')
-                
-                # Random delay to avoid detection
-                time.sleep(random.uniform(3, 7))
-                
-                # Wait for listings to load - try multiple possible selectors
-                selectors_to_try = [
-                    '[data-testid="property-card"]',
-                    'article[data-zpid]',
-                    '.ListItem-c11n-8-84-3__sc-10e22w8-0',
-                    '.list-card-wrapper',
-                    '[role="listitem"]'
-                ]
-                
-                cards = []
-                for selector in selectors_to_try:
-                    try:
-                        page.wait_for_selector(selector, timeout=10000)
-                        cards = page.query_selector_all(selector)
-                        if cards:
-                            logger.info(f"Found {len(cards)} cards using selector: {selector}")
-                            break
-                    except:
-                        continue
-                
-                if not cards:
-                    logger.warning(f"No listings found on page {pg} with any selector")
-                    continue
-                
-                logger.info("Found %d listings on page %d", len(cards), pg)
-                
-                for i, card in enumerate(cards):
-                    try:
-                        # Extract price with multiple selectors
-                        price_text = None
-                        price_selectors = [
-                            '[data-testid="property-card-price"]',
-                            '.PropertyCardWrapper__StyledPriceLine',
-                            '.list-card-price',
-                            '.price'
-                        ]
-                        
-                        for selector in price_selectors:
-                            element = card.query_selector(selector)
-                            if element:
-                                price_text = element.inner_text().strip()
-                                break
-                        
-                        # Extract address
-                        address = None
-                        address_selectors = [
-                            '[data-testid="property-card-addr"]',
-                            'address',
-                            '.list-card-addr',
-                            '.StyledPropertyCardDataArea-address'
-                        ]
-                        
-                        for selector in address_selectors:
-                            element = card.query_selector(selector)
-                            if element:
-                                address = element.inner_text().strip()
-                                break
-                        
-                        # Extract URL/link
-                        href = None
-                        link_selectors = ['a[href*="/homedetails/"]', 'a[href*="/b/"]', 'a']
-                        
-                        for selector in link_selectors:
-                            element = card.query_selector(selector)
-                            if element:
-                                href = element.get_attribute("href")
-                                if href:
-                                    if href.startswith('/'):
-                                        href = "https://www.zillow.com" + href
-                                    break
-                        
-                        # Extract property details (beds, baths, sqft)
-                        beds = baths = living_area = None
-                        
-                        detail_selectors = [
-                            '[data-testid="property-card-details"]',
-                            '.list-card-details',
-                            '.PropertyCardWrapper__StyledPropertyCardDataArea'
-                        ]
-                        
-                        for selector in detail_selectors:
-                            details_element = card.query_selector(selector)
-                            if details_element:
-                                details_text = details_element.inner_text()
-                                
-                                # Parse beds
-                                bed_match = re.search(r'(\d+)\s*(?:bed|bd)', details_text, re.IGNORECASE)
-                                if bed_match:
-                                    beds = int(bed_match.group(1))
-                                
-                                # Parse baths
-                                bath_match = re.search(r'([\d\.]+)\s*(?:bath|ba)', details_text, re.IGNORECASE)
-                                if bath_match:
-                                    baths = float(bath_match.group(1))
-                                
-                                # Parse square footage
-                                sqft_match = re.search(r'([\d,]+)\s*(?:sqft|sq\.?\s*ft)', details_text, re.IGNORECASE)
-                                if sqft_match:
-                                    living_area = int(sqft_match.group(1).replace(',', ''))
-                                
-                                break
-                        
-                        # Only add if we have at least a price or address
-                        if price_text or address:
-                            results.append({
-                                "source": "zillow",
-                                "url": href,
-                                "address": address,
-                                "price": parse_price(price_text),
-                                "beds": beds,
-                                "baths": baths,
-                                "living_area": living_area,
-                                "raw_json": {
-                                    "price_text": price_text,
-                                    "page_number": pg,
-                                    "card_index": i
-                                }
-                            })
-                            
-                    except Exception as e:
-                        logger.exception(f"Error parsing card {i} on page {pg}: %s", e)
-                        continue
-                
-                # Random delay between pages
-                if pg < max_pages:
-                    time.sleep(random.uniform(2, 5))
-                    
-            except Exception as e:
-                logger.exception(f"Error scraping Zillow page {pg}: %s", e)
-                continue
+        # Fast path: the search results ship as __NEXT_DATA__ in the initial HTML
+        listings = try_embedded(extract_zillow_listings, await page.content(), "Zillow", pg)
+        if listings:
+            record_wait("Zillow", url, 0.0, polite_seconds, "__NEXT_DATA__")
+            return listings
         
-        browser.close()
+        selector, render_seconds = await wait_for_any_selector(page, CARD_SELECTORS)
+        record_wait("Zillow", url, render_seconds, polite_seconds, selector)
+        
+        cards = []
+        if selector:
+            cards = await extract_cards(page, selector, CARD_FIELDS)
+            logger.info(f"Found {len(cards)} cards using selector: {selector}")
+        
+        if not cards:
+            logger.warning(f"No listings found on page {pg} with any selector")
+            return results
+        
+        logger.info("Found %d listings on page %d", len(cards), pg)
+    
+    for i, card in enumerate(cards):
+        try:
+            listing = build_listing(card, pg, i)
+            if listing:
+                results.append(listing)
+        except Exception as e:
+            logger.exception(f"Error parsing card {i} on page {pg}: %s", e)
+            continue
     
-    logger.info(f"Zillow scraping completed. Found {len(results)} total listings")
     return results
+
+async def scrape_zillow_async(max_pages=2, city=TARGET_CITY, pool=None):
+    """Load all search pages for a city at the same time in the shared browser"""
+    pool = pool or await get_browser_pool()
+    
+    async def staggered(pg):
+        # Politeness: stagger page starts so requests don't all land at once
+        polite_seconds = await polite_delay(2 * (pg - 1), 5 * (pg - 1))
+        return await scrape_zillow_page(pool, city, pg, polite_seconds)
+    
+    pages = await asyncio.gather(*(staggered(pg) for pg in range(1, max_pages + 1)), return_exceptions=True)
+    
+    results = []
+    for pg, page_results in enumerate(pages, start=1):
+        if isinstance(page_results, Exception):
+            logger.error(f"Error scraping Zillow page {pg}: %s", page_results)
+            continue
+        results.extend(page_results)
+    
+    logger.info(f"Zillow scraping completed for {city}. Found {len(results)} total listings")
+    return results
+
+def scrape_zillow(max_pages=2, cities=None, timeout=None):
+    """
+    Blocking entry point; runs on the long-lived browser shared by all scrapers.
+    After `timeout` seconds the scrape is cancelled, handing its browser pages back to the pool.
+    """
+    if cities:
+        return run_sync(gather_cities(scrape_zillow_async, cities, max_pages=max_pages), timeout=timeout)
+    return run_sync(scrape_zillow_async(max_pages=max_pages), timeout=timeout)
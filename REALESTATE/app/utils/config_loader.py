@@ -15,5 +15,46 @@ CONFIG = {
     "DATABASE_PATH": get_env("DATABASE_PATH", "./data/development_leads.db"),
     "TARGET_CITY": get_env("TARGET_CITY", "Newton, MA"),
     "PLAYWRIGHT_HEADLESS": get_env("PLAYWRIGHT_HEADLESS", "true").lower() == "true",
-    "USE_MOCK_DATA": get_env("USE_MOCK_DATA", "true").lower() == "true"
+    "USE_MOCK_DATA": get_env("USE_MOCK_DATA", "true").lower() == "true",
+    "SCRAPE_SOURCE_TIMEOUT": float(get_env("SCRAPE_SOURCE_TIMEOUT", "240")),
+    "SCRAPE_TOTAL_BUDGET": float(get_env("SCRAPE_TOTAL_BUDGET", "420")),
+    "BROWSER_POOL_CONTEXTS": int(get_env("BROWSER_POOL_CONTEXTS", "2")),
+    "BROWSER_POOL_PAGES_PER_CONTEXT": int(get_env("BROWSER_POOL_PAGES_PER_CONTEXT", "3")),
+    "SCRAPER_EXTRACTION_MODE": get_env("SCRAPER_EXTRACTION_MODE", "batch"),
+    "SCRAPER_RENDER_TIMEOUT": float(get_env("SCRAPER_RENDER_TIMEOUT", "15")),
+    "SCRAPER_POLITENESS_SCALE": float(get_env("SCRAPER_POLITENESS_SCALE", "1.0")),
+    "SCRAPER_BLOCK_RESOURCES": get_env("SCRAPER_BLOCK_RESOURCES", "true").lower() == "true",
+    "SCRAPER_ALLOWED_RESOURCE_TYPES": get_env("SCRAPER_ALLOWED_RESOURCE_TYPES", "document,xhr,fetch,script"),
+    "SCRAPER_BLOCKED_DOMAINS": get_env("SCRAPER_BLOCKED_DOMAINS", ""),
+    "SCRAPER_MODE": get_env("SCRAPER_MODE", "http_first"),
+    "HTTP_CACHE_DIR": get_env("HTTP_CACHE_DIR", "./data/http_cache"),
+    "HTTP_CACHE_TTL": float(get_env("HTTP_CACHE_TTL", "900")),
+    "TARGET_CITIES": get_env("TARGET_CITIES", get_env("TARGET_CITY", "Newton, MA")),
+    "CRAWL_WORKERS": int(get_env("CRAWL_WORKERS", "4")),
+    "CRAWL_MAX_PAGES": int(get_env("CRAWL_MAX_PAGES", "2")),
+    "CRAWL_MAX_ATTEMPTS": int(get_env("CRAWL_MAX_ATTEMPTS", "3")),
+    "CRAWL_RETRY_DELAY": float(get_env("CRAWL_RETRY_DELAY", "5")),
+    "CRAWL_RESUME_MAX_AGE_HOURS": float(get_env("CRAWL_RESUME_MAX_AGE_HOURS", "12")),
+    "CRAWL_SOURCE_INTERVAL": float(get_env("CRAWL_SOURCE_INTERVAL", "3")),
+    "INCREMENTAL_SCRAPE": get_env("INCREMENTAL_SCRAPE", "true").lower() == "true",
+    "UPSERT_BATCH_SIZE": int(get_env("UPSERT_BATCH_SIZE", "500")),
+    "SQLITE_SYNCHRONOUS": get_env("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "SQLITE_CACHE_SIZE_KB": int(get_env("SQLITE_CACHE_SIZE_KB", "65536")),
+    "SQLITE_MMAP_SIZE_MB": int(get_env("SQLITE_MMAP_SIZE_MB", "256")),
+    "OPENAI_MODEL": get_env("OPENAI_MODEL", "text-davinci-003"),
+    "CLASSIFY_BATCH_SIZE": int(get_env("CLASSIFY_BATCH_SIZE", "20")),
+    "CLASSIFY_CONCURRENCY": int(get_env("CLASSIFY_CONCURRENCY", "4")),
+    "CLASSIFY_CACHE": get_env("CLASSIFY_CACHE", "true").lower() == "true",
+    "CLASSIFY_CACHE_TTL_DAYS": float(get_env("CLASSIFY_CACHE_TTL_DAYS", "30")),
+    "CLASSIFY_CACHE_MAX_ENTRIES": int(get_env("CLASSIFY_CACHE_MAX_ENTRIES", "100000")),
+    "OPENAI_REQUESTS_PER_MINUTE": float(get_env("OPENAI_REQUESTS_PER_MINUTE", "60")),
+    "OPENAI_TOKENS_PER_MINUTE": float(get_env("OPENAI_TOKENS_PER_MINUTE", "90000")),
+    "CLASSIFY_MAX_RETRIES": int(get_env("CLASSIFY_MAX_RETRIES", "5")),
+    "CLASSIFY_BACKOFF_BASE": float(get_env("CLASSIFY_BACKOFF_BASE", "1.0")),
+    "PRECLASSIFY": get_env("PRECLASSIFY", "true").lower() == "true",
+    "PRECLASSIFY_THRESHOLD": float(get_env("PRECLASSIFY_THRESHOLD", "0.9")),
+    "PRECLASSIFY_MODEL_PATH": get_env("PRECLASSIFY_MODEL_PATH", "./data/preclassifier.json"),
+    "SCORING_RULES_PATH": get_env("SCORING_RULES_PATH"),
+    "LISTING_CHUNK_SIZE": int(get_env("LISTING_CHUNK_SIZE", "5000")),
+    "JOB_STALE_SECONDS": float(get_env("JOB_STALE_SECONDS", "60"))
 }
@@ -71,7 +71,10 @@ def scrape_with_fallback(scraper_func, scraper_name, use_mock=True):
     except Exception as e:
         logger.exception(f"Error in {scraper_name} scraper: %s", e)
     
-    # Fallback to mock data if enabled
+    return fallback_listings(scraper_name, use_mock=use_mock)
+
+def fallback_listings(scraper_name, use_mock=True):
+    """Mock listings to use in place of a failed or empty scrape (empty list if mocks are disabled)"""
     if use_mock:
         logger.info(f"Using mock data for {scraper_name}")
         return generate_mock_listings(source=scraper_name.lower(), count=random.randint(2, 5))
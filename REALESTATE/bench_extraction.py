@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batch ($$eval) vs per-element card extraction on the saved search-page fixtures.
+Both modes must produce identical listings; the batch mode should need one round trip per page.
+
+Usage: python bench_extraction.py [repeats]
+"""
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from playwright.async_api import async_playwright
+from app.scraper.extraction import extract_cards
+from app.scraper import zillow_scraper, redfin_scraper, realtor_scraper
+import asyncio
+import time
+
+FIXTURES = [
+    ("zillow_search.html", zillow_scraper, lambda raw, i: zillow_scraper.build_listing(raw, 1, i), None),
+    ("redfin_search.html", redfin_scraper, redfin_scraper.build_listing, 20),
+    ("realtor_search.html", realtor_scraper, realtor_scraper.build_listing, 15),
+]
+
+async def time_mode(page, module, build, limit, mode, repeats):
+    selector = module.CARD_SELECTORS[0]
+    started = time.perf_counter()
+    for _ in range(repeats):
+        cards = await extract_cards(page, selector, module.CARD_FIELDS, limit=limit, mode=mode)
+    elapsed = (time.perf_counter() - started) / repeats
+    return elapsed, [build(card, i) for i, card in enumerate(cards)]
+
+async def main(repeats):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for name, module, build, limit in FIXTURES:
+            with open(os.path.join("fixtures", name)) as f:
+                await page.set_content(f.read())
+            per_element, slow_listings = await time_mode(page, module, build, limit, "per_element", repeats)
+            batch, fast_listings = await time_mode(page, module, build, limit, "batch", repeats)
+            assert slow_listings == fast_listings, f"{name}: modes disagree"
+            print(f"{name:22} {len(fast_listings):3d} cards  per_element {per_element * 1000:8.1f} ms"
+                  f"  batch {batch * 1000:6.1f} ms  speedup {per_element / batch:5.1f}x")
+        await browser.close()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
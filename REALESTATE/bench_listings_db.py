@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard-shaped queries on a synthetic listings table, before and after the
+schema migrations (indexes + typed columns), then the cost the rollup tables add to bulk
+upserts. Runs on throwaway databases.
+
+Usage: python bench_listings_db.py [rows] [repeats] [upsert_rows]
+"""
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import MIGRATIONS, close_conns, connect, get_conn, migrate, upsert_listings
+from datetime import datetime, timedelta
+import json
+import random
+import shutil
+import tempfile
+import time
+
+SOURCES = ["zillow", "redfin", "realtor"]
+LABELS = ["luxury-family", "luxury-condo", "mid-range", "starter-home", "development-opportunity", "error"]
+
+QUERIES = {
+    "latest 100": (
+        "SELECT * FROM listings ORDER BY created_at DESC LIMIT 100", ()),
+    "latest 100 for source": (
+        "SELECT * FROM listings WHERE source = ? ORDER BY created_at DESC LIMIT 100", ("redfin",)),
+    "count by label": (
+        "SELECT COUNT(*) FROM listings WHERE classified_label = ?", ("development-opportunity",)),
+    "price range": (
+        "SELECT COUNT(*), AVG(score) FROM listings WHERE price BETWEEN ? AND ?", (900000, 950000)),
+    "top 50 by score": (
+        "SELECT url, score FROM listings ORDER BY score DESC LIMIT 50", ()),
+}
+
+# Migration 7 adds the rollup tables and the triggers that keep them current
+BEFORE_ROLLUPS = 6
+
+INSERT_SQL = """
+INSERT INTO listings (source, url, address, price, beds, baths, living_area, classified_label, score, raw_json, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def synthetic_rows(count):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        created = start + timedelta(seconds=i * 30 + random.randint(0, 29))
+        raw = {"zpid": str(10_000_000 + i), "home_type": random.choice(["SINGLE_FAMILY", "CONDO", "TOWNHOUSE"]),
+               "extraction": "embedded_json"}
+        yield (random.choice(SOURCES), f"https://example.com/home/{i}", f"{i} Synthetic St",
+               random.randint(200, 3000) * 1000, random.randint(1, 6), random.choice([1, 1.5, 2, 2.5, 3]),
+               random.randint(600, 6000), random.choice(LABELS), round(random.uniform(0, 100), 2),
+               json.dumps(raw), created.strftime("%Y-%m-%d %H:%M:%S"))
+
+def build_table(conn, rows):
+    conn.executescript(f"BEGIN;\n{MIGRATIONS[0]}\nPRAGMA user_version = 1;\nCOMMIT;")
+    started = time.perf_counter()
+    batch = []
+    for row in synthetic_rows(rows):
+        batch.append(row)
+        if len(batch) == 50_000:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+            batch = []
+    if batch:
+        with conn:
+            conn.executemany(INSERT_SQL, batch)
+    return time.perf_counter() - started
+
+def time_queries(conn, repeats):
+    timings = {}
+    for name, (sql, params) in QUERIES.items():
+        runs = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            runs.append(time.perf_counter() - started)
+        timings[name] = sorted(runs)[len(runs) // 2]
+    return timings
+
+def time_upserts(schema_version, listings):
+    """Seconds for upsert_listings to insert listings, re-upsert them unchanged and with new prices"""
+    database_manager.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_upserts.db")
+    conn = get_conn()
+    for number, sql in enumerate(MIGRATIONS[:schema_version], start=1):
+        conn.executescript(f"BEGIN;\n{sql}\nPRAGMA user_version = {number};\nCOMMIT;")
+    timings = {}
+    for phase in ("insert", "unchanged", "price change"):
+        if phase == "price change":
+            listings = [{**listing, "price": listing["price"] + 5000} for listing in listings]
+        started = time.perf_counter()
+        upsert_listings(listings)
+        timings[phase] = time.perf_counter() - started
+    close_conns()
+    shutil.rmtree(os.path.dirname(database_manager.DB_PATH), ignore_errors=True)
+    return timings
+
+def bench_upserts(rows):
+    columns = ["source", "url", "address", "price", "beds", "baths", "living_area", "classified_label", "score",
+               "raw_json", "created_at"]
+    listings = [dict(zip(columns, row)) for row in synthetic_rows(rows)]
+    print(f"\nBulk upserts of {rows:,} listings")
+    before = time_upserts(BEFORE_ROLLUPS, listings)
+    after = time_upserts(len(MIGRATIONS), listings)
+    print(f"{'phase':24} {'no rollups':>10} {'rollups':>10} {'overhead':>9}")
+    for phase in before:
+        print(f"{phase:24} {before[phase]:9.2f}s {after[phase]:9.2f}s {after[phase] / before[phase]:8.2f}x")
+
+def main(rows, repeats, upsert_rows):
+    workdir = tempfile.mkdtemp()
+    database_manager.DB_PATH = os.path.join(workdir, "bench_listings.db")
+    conn = connect()
+    print(f"Building {rows:,} synthetic rows ...", end=" ", flush=True)
+    print(f"{build_table(conn, rows):.1f}s")
+
+    before = time_queries(conn, repeats)
+
+    started = time.perf_counter()
+    migrate(conn)
+    conn.execute("ANALYZE")
+    print(f"Migrations to version {len(MIGRATIONS)}: {time.perf_counter() - started:.1f}s\n")
+
+    after = time_queries(conn, repeats)
+    print(f"{'query':24} {'before':>10} {'after':>10} {'speedup':>9}  plan")
+    for name, (sql, params) in QUERIES.items():
+        plan = "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+        print(f"{name:24} {before[name] * 1000:8.1f}ms {after[name] * 1000:8.2f}ms "
+              f"{before[name] / max(after[name], 1e-9):8.0f}x  {plan}")
+    conn.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    bench_upserts(upsert_rows)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 50_000)
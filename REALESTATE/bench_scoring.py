@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: score_listing one dict at a time vs score_frame over a DataFrame, on
+synthetic listings. Also checks that both give exactly the same scores.
+
+Usage: python bench_scoring.py [rows]
+"""
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.core.scoring_engine import score_listing, score_frame
+import pandas as pd
+import random
+import time
+
+DESCRIPTIONS = [
+    "Charming colonial with updated kitchen", "Builder special, tear down or renovate",
+    "Sold as is. Contractor special", "Development opportunity on a double lot",
+    "Move-in ready ranch", None,
+]
+LABELS = ["development", "not_development", "maybe", "error", None]
+
+def synthetic_listings(count, unique_descriptions=False):
+    rng = random.Random(42)
+    listings = []
+    for i in range(count):
+        description = rng.choice(DESCRIPTIONS)
+        if unique_descriptions:
+            description = f"{description or ''} Listing #{i}"
+        listings.append({
+            "price": rng.randint(100, 3000) * 1000,
+            "lot_size": rng.choice([None, rng.randint(2000, 120000)]),
+            "year_built": rng.choice([None, rng.randint(1880, 2024)]),
+            "description": description,
+            "classified_label": rng.choice(LABELS),
+        })
+    return listings
+
+def compare(name, listings):
+    started = time.perf_counter()
+    expected = [score_listing(l) for l in listings]
+    per_dict = time.perf_counter() - started
+
+    df = pd.DataFrame(listings)
+    started = time.perf_counter()
+    scores = score_frame(df).tolist()
+    vectorized = time.perf_counter() - started
+
+    assert scores == expected, "score_frame and score_listing disagree"
+    print(f"{name:24} {per_dict:10.2f}s {vectorized:10.2f}s {per_dict / vectorized:8.1f}x")
+
+def main(rows):
+    print(f"{rows:,} listings (scores identical in every case)\n")
+    print(f"{'descriptions':24} {'per dict':>11} {'score_frame':>11} {'speedup':>9}")
+    compare("repeated", synthetic_listings(rows))
+    compare("all distinct", synthetic_listings(rows, unique_descriptions=True))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
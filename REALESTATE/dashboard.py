@@ -9,14 +9,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import sqlite3
 import os
-import subprocess
+import sqlite3
 import sys
+from dataclasses import replace
 from datetime import datetime, timedelta
 import json
+import threading
 import time
 
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import listing_queries, pipeline_jobs
+from app.integrations.database_manager import DB_PATH, get_read_conn
+from app.integrations.listing_cards import format_currency, property_cards_html
+from app.integrations.listing_queries import ListingFilter, csv_conn
+
 # Page configuration
 st.set_page_config(
     page_title="Real Estate Intelligence Dashboard",
@@ -49,6 +59,10 @@ st.markdown("""
         padding: 1rem;
         margin: 0.5rem 0;
         background: #f9f9f9;
+        display: grid;
+        grid-template-columns: 2fr 2fr 1fr;
+        gap: 1rem;
+        line-height: 1.6;
     }
     .sidebar-header {
         color: #2E86AB;
@@ -72,55 +86,39 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data():
-    """Load data from CSV and database with caching"""
-    data = {}
-    
-    # Try to load from CSV first
-    csv_path = "./data/classified_listings.csv"
-    if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-        data['csv'] = df
-        data['csv_modified'] = datetime.fromtimestamp(os.path.getmtime(csv_path))
-    else:
-        data['csv'] = None
-        data['csv_modified'] = None
-    
-    # Try to load from database
-    db_path = "./data/development_leads.db"
-    if os.path.exists(db_path):
-        try:
-            conn = sqlite3.connect(db_path)
-            query = """
-            SELECT source, url, address, price, beds, baths, living_area, 
-                   raw_json, classified_label, score, created_at as processed_at
-            FROM listings 
-            ORDER BY created_at DESC
-            """
-            df_db = pd.read_sql_query(query, conn)
-            conn.close()
-            data['database'] = df_db
-            data['db_modified'] = datetime.fromtimestamp(os.path.getmtime(db_path))
-        except Exception as e:
-            st.error(f"Database error: {e}")
-            data['database'] = None
-            data['db_modified'] = None
-    else:
-        data['database'] = None
-        data['db_modified'] = None
-    
-    return data
+CSV_PATH = "./data/classified_listings.csv"
+EXPORT_MAX_ROWS = 50000
+PIPELINE_SCRIPT = "run_complete_pipeline.py"
+JOB_POLL_SECONDS = 2
 
-def format_currency(value):
-    """Format currency values"""
-    if pd.isna(value):
-        return "N/A"
-    return f"${value:,.0f}"
+def data_version(data_source):
+    """Last modification time of the data source (None if it doesn't exist); part of every query's cache key"""
+    paths = [CSV_PATH] if data_source == "CSV File" else [DB_PATH, DB_PATH + "-wal"]
+    times = [os.path.getmtime(p) for p in paths if os.path.exists(p)]
+    return max(times) if times else None
 
-def create_overview_metrics(df):
-    """Create overview metrics cards"""
-    if df is None or df.empty:
+@st.cache_resource
+def csv_database(csv_path, modified):
+    """
+    The CSV export loaded into an in-memory database, rebuilt when the file changes.
+    Every session shares this one connection, so queries on it take turns through the lock.
+    """
+    return csv_conn(csv_path), threading.Lock()
+
+@st.cache_data(ttl=300)  # Cache for 5 minutes
+def run_query(name, data_source, version, *args, **kwargs):
+    """Result of listing_queries.<name> against the data source; the filters are SQL, not pandas"""
+    query = getattr(listing_queries, name)
+    if data_source == "CSV File":
+        conn, lock = csv_database(CSV_PATH, version)
+        with lock:
+            return query(conn, *args, **kwargs)
+    # Read-only WAL reader per thread: doesn't wait on (or block) a pipeline run that is writing
+    return query(get_read_conn(), *args, **kwargs)
+
+def create_overview_metrics(metrics):
+    """Create overview metrics cards from listing_queries.overview_metrics"""
+    if not metrics["count"]:
         st.warning("No data available")
         return
     
@@ -132,10 +130,10 @@ def create_overview_metrics(df):
             <h3>🏠 Total Properties</h3>
             <h2>{}</h2>
         </div>
-        """.format(len(df)), unsafe_allow_html=True)
+        """.format(metrics["count"]), unsafe_allow_html=True)
     
     with col2:
-        avg_price = df['price'].mean()
+        avg_price = metrics["avg_price"]
         st.markdown("""
         <div class="metric-card">
             <h3>💰 Average Price</h3>
@@ -144,7 +142,7 @@ def create_overview_metrics(df):
         """.format(format_currency(avg_price)), unsafe_allow_html=True)
     
     with col3:
-        price_range = f"{format_currency(df['price'].min())} - {format_currency(df['price'].max())}"
+        price_range = f"{format_currency(metrics['min_price'])} - {format_currency(metrics['max_price'])}"
         st.markdown("""
         <div class="metric-card">
             <h3>📊 Price Range</h3>
@@ -153,7 +151,7 @@ def create_overview_metrics(df):
         """.format(price_range), unsafe_allow_html=True)
     
     with col4:
-        sources = df['source'].nunique()
+        sources = metrics["sources"]
         st.markdown("""
         <div class="metric-card">
             <h3>🔍 Data Sources</h3>
@@ -161,19 +159,19 @@ def create_overview_metrics(df):
         </div>
         """.format(sources), unsafe_allow_html=True)
 
-def create_price_distribution_chart(df):
-    """Create price distribution visualization"""
-    if df is None or df.empty:
+def create_price_distribution_chart(hist):
+    """Create price distribution visualization from listing_queries.price_histogram"""
+    if hist is None or hist.empty:
         return
     
-    fig = px.histogram(
-        df, 
-        x='price', 
-        nbins=20,
+    fig = px.bar(
+        x=(hist['bin_start'] + hist['bin_end']) / 2,
+        y=hist['count'],
         title="💰 Price Distribution",
-        labels={'price': 'Price ($)', 'count': 'Number of Properties'},
+        labels={'x': 'Price ($)', 'y': 'Number of Properties'},
         color_discrete_sequence=['#667eea']
     )
+    fig.update_traces(width=(hist['bin_end'] - hist['bin_start']).tolist())
     
     fig.update_layout(
         title_font_size=20,
@@ -185,12 +183,12 @@ def create_price_distribution_chart(df):
     
     return fig
 
-def create_classification_chart(df):
-    """Create classification pie chart"""
-    if df is None or df.empty:
+def create_classification_chart(counts):
+    """Create classification pie chart from listing_queries.label_counts"""
+    if counts is None or counts.empty:
         return
     
-    classification_counts = df['classified_label'].value_counts()
+    classification_counts = counts.set_index('classified_label')['count']
     
     colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
     
@@ -211,19 +209,11 @@ def create_classification_chart(df):
     
     return fig
 
-def create_source_comparison_chart(df):
-    """Create source comparison chart"""
-    if df is None or df.empty:
+def create_source_comparison_chart(source_stats):
+    """Create source comparison chart from listing_queries.source_stats"""
+    if source_stats is None or source_stats.empty:
         return
     
-    source_stats = df.groupby('source').agg({
-        'price': ['count', 'mean'],
-        'score': 'mean'
-    }).round(2)
-    
-    source_stats.columns = ['Count', 'Avg_Price', 'Avg_Score']
-    source_stats = source_stats.reset_index()
-    
     fig = make_subplots(
         rows=1, cols=2,
         subplot_titles=('Properties by Source', 'Average Score by Source'),
@@ -262,7 +252,7 @@ def create_source_comparison_chart(df):
     return fig
 
 def create_scatter_plot(df):
-    """Create price vs living area scatter plot"""
+    """Create price vs living area scatter plot (from a sample of the filtered listings)"""
     if df is None or df.empty:
         return
     
@@ -291,27 +281,71 @@ def create_scatter_plot(df):
     return fig
 
 def run_pipeline():
-    """Run the complete pipeline"""
+    """Start the complete pipeline in the background; the status panel follows its progress"""
     try:
-        with st.spinner("🚀 Running real estate scraping pipeline..."):
-            result = subprocess.run([
-                sys.executable, "run_complete_pipeline.py"
-            ], capture_output=True, text=True, cwd=".")
-            
-        if result.returncode == 0:
-            st.success("✅ Pipeline completed successfully!")
-            st.info("🔄 Data cache will refresh automatically in a few moments...")
-            # Clear the cache to force data reload
-            st.cache_data.clear()
-            time.sleep(2)  # Give time for file system to update
-            return True
-        else:
-            st.error(f"❌ Pipeline failed with error: {result.stderr}")
-            return False
-            
+        job_id = pipeline_jobs.start_job("pipeline", [PIPELINE_SCRIPT], cwd=".")
     except Exception as e:
-        st.error(f"❌ Error running pipeline: {str(e)}")
+        st.error(f"❌ Error starting pipeline: {str(e)}")
+        return False
+    
+    if job_id is None:
+        st.warning("⏳ A pipeline run is already in progress - follow it in the sidebar")
         return False
+    st.session_state["watched_job"] = job_id
+    return True
+
+def current_job():
+    """
+    The newest pipeline job; None if there has never been one. An active job whose
+    process has died is failed first, so it doesn't show as running forever.
+    """
+    if not os.path.exists(DB_PATH):
+        return None
+    try:
+        job = pipeline_jobs.latest_job(get_read_conn())
+    except sqlite3.OperationalError:
+        return None  # the jobs table is created by the first run
+    # Only writes when a job is actually dead, so polling takes no lock otherwise
+    if job and job["status"] in pipeline_jobs.ACTIVE_STATUSES and pipeline_jobs.reap_stale_jobs():
+        job = pipeline_jobs.latest_job(get_read_conn())
+    return job
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def pipeline_status():
+    """
+    Live status of the newest run, refreshed on its own every few seconds. Only this
+    panel reruns while a job is going, so everyone can keep browsing in the meantime.
+    """
+    job = current_job()
+    if job is None:
+        return
+    
+    active = job["status"] in pipeline_jobs.ACTIVE_STATUSES
+    if active:
+        st.session_state["watched_job"] = job["id"]
+        stalled = time.time() - (job["heartbeat_at"] or 0) > pipeline_jobs.STALE_SECONDS
+        stage = job["stage"] or "starting"
+        st.info(f"⏳ Pipeline run #{job['id']}: **{stage}**" + (" - no progress lately" if stalled else ""))
+        if job["total"]:
+            st.progress(min(job["processed"] / job["total"], 1.0),
+                        text=f"{job['processed']:,} / {job['total']:,} listings")
+        elif job["processed"]:
+            st.caption(f"{job['processed']:,} listings processed")
+    elif job["status"] == "done":
+        finished = datetime.fromtimestamp(job["finished_at"]).strftime('%Y-%m-%d %H:%M') if job["finished_at"] else ""
+        st.success(f"✅ Last run #{job['id']} completed {finished}")
+    else:
+        st.error(f"❌ Last run #{job['id']} failed: {job['error'] or 'unknown error'}")
+    
+    if job["sources"]:
+        st.dataframe(pd.DataFrame(job["sources"]).T.rename_axis("source"), width='stretch')
+    with st.expander("📜 Run log"):
+        st.code(pipeline_jobs.log_tail(job["log_path"]) or "No output yet", language="text")
+    
+    # The run this session was following has ended: rerun the whole page so the new data shows
+    if not active and st.session_state.get("watched_job") == job["id"]:
+        del st.session_state["watched_job"]
+        st.rerun()
 
 def main():
     """Main dashboard function"""
@@ -333,8 +367,8 @@ def main():
         st.markdown("### 🕷️ Data Pipeline")
         
         if st.button("🚀 Run Pipeline", type="secondary"):
-            if run_pipeline():
-                st.rerun()
+            run_pipeline()
+        pipeline_status()
         
         st.markdown("---")
         
@@ -350,26 +384,24 @@ def main():
         st.markdown("---")
         st.markdown("### 🔍 Filters")
         
-    # Load data
-    data = load_data()
-    
-    # Select data source
-    if data_source == "CSV File":
-        df = data['csv']
-        last_updated = data['csv_modified']
-        source_info = "📄 CSV File"
-    else:
-        df = data['database']
-        last_updated = data['db_modified']
-        source_info = "🗄️ Database"
+    # Only the filter choices and totals are loaded up front; everything else is queried per view
+    version = data_version(data_source)
+    options = None
+    if version is not None:
+        try:
+            options = run_query("filter_options", data_source, version)
+        except Exception as e:
+            st.error(f"Database error: {e}")
+    last_updated = datetime.fromtimestamp(version) if version else None
+    source_info = "📄 CSV File" if data_source == "CSV File" else "🗄️ Database"
     
     # Data status
     col1, col2 = st.columns([3, 1])
     with col1:
-        if df is not None:
+        if options is not None:
             st.markdown(f"""
             <div class="success-box">
-                <strong>{source_info}</strong> - {len(df)} properties loaded
+                <strong>{source_info}</strong> - {options['total']} properties available
                 {f"<br><small>Last updated: {last_updated.strftime('%Y-%m-%d %H:%M:%S')}</small>" if last_updated else ""}
             </div>
             """, unsafe_allow_html=True)
@@ -392,45 +424,44 @@ def main():
                 st.error("🔴 Stale")
     
     # Main content
-    if df is not None and not df.empty:
+    if options is not None and options['total']:
         
         # Add filters to sidebar
         with st.sidebar:
             # Price range filter
+            low, high = int(options['price_min'] or 0), int(options['price_max'] or 0)
             price_min, price_max = st.slider(
                 "Price Range",
-                min_value=int(df['price'].min()),
-                max_value=int(df['price'].max()),
-                value=(int(df['price'].min()), int(df['price'].max())),
+                min_value=low,
+                max_value=max(high, low + 1),
+                value=(low, max(high, low + 1)),
                 format="$%d"
             )
             
             # Classification filter
-            classifications = ["All"] + list(df['classified_label'].unique())
+            classifications = ["All"] + options['labels']
             selected_classification = st.selectbox(
                 "Classification",
                 classifications
             )
             
             # Source filter
-            sources = ["All"] + list(df['source'].unique())
+            sources = ["All"] + options['sources']
             selected_source = st.selectbox(
                 "Source",
                 sources
             )
         
-        # Apply filters
-        filtered_df = df.copy()
-        filtered_df = filtered_df[
-            (filtered_df['price'] >= price_min) & 
-            (filtered_df['price'] <= price_max)
-        ]
-        
-        if selected_classification != "All":
-            filtered_df = filtered_df[filtered_df['classified_label'] == selected_classification]
+        # Filters become SQL; the full range leaves listings without a price in
+        filters = ListingFilter(
+            price_min=price_min if price_min > low else None,
+            price_max=price_max if price_max < high else None,
+            label=None if selected_classification == "All" else selected_classification,
+            source=None if selected_source == "All" else selected_source,
+        )
         
-        if selected_source != "All":
-            filtered_df = filtered_df[filtered_df['source'] == selected_source]
+        def query(name, *args, **kwargs):
+            return run_query(name, data_source, version, *args, **kwargs)
         
         # Tabs for different views
         tab1, tab2, tab3, tab4 = st.tabs(["📊 Overview", "📋 Properties", "📈 Analytics", "⚙️ Settings"])
@@ -439,23 +470,23 @@ def main():
             st.markdown("## 📊 Property Overview")
             
             # Metrics
-            create_overview_metrics(filtered_df)
+            create_overview_metrics(query("overview_metrics", filters))
             
             # Charts
             col1, col2 = st.columns(2)
             
             with col1:
-                fig1 = create_price_distribution_chart(filtered_df)
+                fig1 = create_price_distribution_chart(query("price_histogram", filters))
                 if fig1:
                     st.plotly_chart(fig1, width='stretch')
             
             with col2:
-                fig2 = create_classification_chart(filtered_df)
+                fig2 = create_classification_chart(query("label_counts", filters))
                 if fig2:
                     st.plotly_chart(fig2, width='stretch')
             
             # Source comparison
-            fig3 = create_source_comparison_chart(filtered_df)
+            fig3 = create_source_comparison_chart(query("source_stats", filters))
             if fig3:
                 st.plotly_chart(fig3, width='stretch')
         
@@ -463,69 +494,50 @@ def main():
             st.markdown("## 📋 Property Listings")
             
             # Search
-            search_term = st.text_input("🔍 Search properties (address, classification, etc.)")
+            search_term = st.text_input(
+                "🔍 Search properties (address, description, classification, etc.)",
+                help='Words match as prefixes ("map" finds Maple); use "double quotes" for an exact phrase'
+            )
             
-            display_df = filtered_df.copy()
-            if search_term:
-                mask = display_df.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-                display_df = display_df[mask]
+            search_filters = replace(filters, search=search_term.strip() or None)
             
-            # Sort options
-            col1, col2 = st.columns(2)
+            # Sort and page options
+            col1, col2, col3 = st.columns(3)
             with col1:
                 sort_by = st.selectbox("Sort by:", ["price", "score", "processed_at", "beds", "baths"])
             with col2:
                 sort_order = st.selectbox("Order:", ["Descending", "Ascending"])
+            with col3:
+                page_size = st.selectbox("Per page:", [25, 50, 100], index=1)
             
-            ascending = sort_order == "Ascending"
-            display_df = display_df.sort_values(by=sort_by, ascending=ascending)
+            total = query("count_listings", search_filters)
+            pages = max((total + page_size - 1) // page_size, 1)
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+            display_df = query("fetch_page", search_filters, sort_by, sort_order == "Descending",
+                               page - 1, page_size)
             
             # Display properties
-            st.markdown(f"**Showing {len(display_df)} properties**")
+            st.markdown(f"**Showing {len(display_df)} of {total} properties (page {page} of {pages})**")
             
-            for idx, row in display_df.iterrows():
-                with st.container():
-                    col1, col2, col3 = st.columns([2, 2, 1])
-                    
-                    with col1:
-                        st.markdown(f"""
-                        **📍 {row['address']}**  
-                        🏠 {row['beds']} bed, {row['baths']} bath  
-                        📐 {row['living_area']} sq ft
-                        """)
-                    
-                    with col2:
-                        st.markdown(f"""
-                        💰 **{format_currency(row['price'])}**  
-                        🏷️ {row['classified_label']}  
-                        ⭐ Score: {row['score']:.1f}
-                        """)
-                    
-                    with col3:
-                        st.markdown(f"""
-                        📊 {row['source'].title()}  
-                        🕐 {pd.to_datetime(row['processed_at']).strftime('%m/%d')}
-                        """)
-                    
-                    st.markdown("---")
+            # One markdown element for the whole page instead of columns and markdown per row
+            st.markdown(property_cards_html(display_df), unsafe_allow_html=True)
         
         with tab3:
             st.markdown("## 📈 Advanced Analytics")
             
             # Price vs Living Area scatter
-            fig4 = create_scatter_plot(filtered_df)
+            fig4 = create_scatter_plot(query("sample_listings", filters))
             if fig4:
                 st.plotly_chart(fig4, width='stretch')
             
             # Statistical summary
             st.markdown("### 📊 Statistical Summary")
-            st.dataframe(filtered_df[['price', 'beds', 'baths', 'living_area', 'score']].describe(), width='stretch')
+            st.dataframe(query("summary_stats", filters), width='stretch')
             
             # Correlation matrix
-            if len(filtered_df) > 1:
+            if query("count_listings", filters) > 1:
                 st.markdown("### 🔗 Correlation Analysis")
-                corr_cols = ['price', 'beds', 'baths', 'living_area', 'score']
-                corr_matrix = filtered_df[corr_cols].corr()
+                corr_matrix = query("correlation_matrix", filters)
                 
                 fig_corr = px.imshow(
                     corr_matrix,
@@ -541,6 +553,8 @@ def main():
             
             # Export options
             st.markdown("### 📤 Export Data")
+            st.caption(f"Exports the filtered listings, newest first, up to {EXPORT_MAX_ROWS:,} rows")
+            filtered_df = query("fetch_page", filters, "processed_at", True, 0, EXPORT_MAX_ROWS)
             col1, col2 = st.columns(2)
             
             with col1:
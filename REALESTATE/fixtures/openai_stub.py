@@ -0,0 +1,89 @@
+# Local stand-in for the OpenAI completions API, for classifier tests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+import time
+
+def keyword_label(text):
+    """The stub's "model": anything mentioning land or acres is a development lead"""
+    lowered = text.lower()
+    if "acre" in lowered or "land" in lowered:
+        return "development"
+    if "fixer" in lowered:
+        return "maybe"
+    return "not_development"
+
+def default_reply(prompt):
+    """Answer batch prompts with a JSON object and single prompts with a bare label"""
+    items = re.findall(r"Listing (\d+):\nText: (.*)", prompt)
+    if items:
+        return json.dumps({number: keyword_label(text) for number, text in items})
+    return keyword_label(prompt.split("Listing text:", 1)[-1].split("Fields:", 1)[0])
+
+class CompletionsHandler(BaseHTTPRequestHandler):
+    """
+    POST /v1/completions; records every prompt in server.prompts and peak concurrency in server.peak.
+    The first requests are answered with the status codes queued in server.failures, if any.
+    """
+
+    def send_error_status(self, status):
+        payload = json.dumps({"error": {"message": f"Injected {status}", "type": "stub_error", "code": None}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failure = server.failures.pop(0) if server.failures else None
+        if failure:
+            self.send_error_status(failure)
+            return
+        with server.lock:
+            server.prompts.append(body["prompt"])
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            text = server.reply(body["prompt"])
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        payload = json.dumps({
+            "id": "cmpl-stub",
+            "object": "text_completion",
+            "model": body.get("model"),
+            "choices": [{"text": text, "index": 0, "finish_reason": "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": len(body["prompt"]) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(body["prompt"]) + len(text)) // 4},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_openai_stub(reply=default_reply, delay=0.0, failures=()):
+    """
+    Start the stub on a free local port. Returns (server, api_base); call server.shutdown() when done.
+    failures - status codes (e.g. 429, 503) to answer the first requests with
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CompletionsHandler)
+    server.reply = reply
+    server.delay = delay
+    server.failures = list(failures)
+    server.requests = 0
+    server.prompts = []
+    server.in_flight = 0
+    server.peak = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
@@ -0,0 +1,31 @@
+# Local HTTP server that serves the saved search-page fixtures for scraper tests
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import functools
+import os
+import threading
+import time
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves files from the fixtures directory; ?delay=<seconds> simulates a slow site. Requests are recorded in server.hits"""
+
+    def do_GET(self):
+        self.server.hits.append((urlparse(self.path).path, self.headers.get("If-Modified-Since")))
+        query = parse_qs(urlparse(self.path).query)
+        if "delay" in query:
+            time.sleep(float(query["delay"][0]))
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_fixtures(directory=FIXTURES_DIR):
+    """Start a fixture server on a free local port. Returns (server, base_url); call server.shutdown() when done"""
+    handler = functools.partial(FixtureHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.hits = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -7,52 +7,18 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
 
 from app.utils.logger import logger
-from app.scraper.zillow_scraper import scrape_zillow
-from app.scraper.redfin_scraper import scrape_redfin
-from app.scraper.realtor_scraper import scrape_realtor
-from app.utils.mock_data import scrape_with_fallback, generate_mock_listings
-from app.integrations.database_manager import init_db, upsert_listing
+from app.scraper.crawl_frontier import run_crawl
+from app.integrations.database_manager import init_db, upsert_listings
+from app.core.scoring_engine import score_listing
+from app.nlp.preclassifier import simple_label
 import pandas as pd
 import json
 from datetime import datetime
 import os
 
-def simple_classify_listing(listing_data):
-    """Simple classification without OpenAI API"""
-    price = listing_data.get('price', 0)
-    beds = listing_data.get('beds', 0) 
-    
-    # Simple rule-based classification
-    if price and price > 800000:
-        if beds and beds >= 4:
-            return "luxury-family"
-        else:
-            return "luxury-condo"
-    elif price and price > 500000:
-        return "mid-range"
-    else:
-        return "starter-home"
-
 def simple_score_listing(listing_data):
-    """Simple scoring without complex algorithms"""
-    score = 0
-    
-    # Price factor (normalized)
-    price = listing_data.get('price', 0)
-    if price:
-        score += min(price / 1000000 * 50, 50)  # Max 50 points for price
-    
-    # Bedroom factor
-    beds = listing_data.get('beds', 0)
-    if beds:
-        score += min(beds * 5, 20)  # Max 20 points for bedrooms
-    
-    # Square footage factor
-    sqft = listing_data.get('living_area', 0)
-    if sqft:
-        score += min(sqft / 100, 30)  # Max 30 points for square footage
-    
-    return round(score, 2)
+    """Simple scoring without complex algorithms - the "simple" rules in scoring_rules.json"""
+    return score_listing(listing_data, ruleset="simple")
 
 def run_csv_pipeline():
     """Run a simplified pipeline focused on CSV output"""
@@ -68,18 +34,16 @@ def run_csv_pipeline():
     
     # 1) Get listings (with fallback to mock data)
     logger.info("Getting listings from all sources...")
-    z_results = scrape_with_fallback(lambda: scrape_zillow(max_pages=1), "Zillow", use_mock=True)
-    r_results = scrape_with_fallback(scrape_redfin, "Redfin", use_mock=True)  
-    rl_results = scrape_with_fallback(scrape_realtor, "Realtor", use_mock=True)
+    all_results, scrape_report = run_crawl(use_mock=True)
+    source_counts = {name: info["count"] for name, info in scrape_report["sources"].items()}
     
-    all_results = z_results + r_results + rl_results
     logger.info("Scraped total %d listings", len(all_results))
     
     # 2) Process each listing
     for i, listing in enumerate(all_results):
         try:
             # Simple classification
-            listing["classified_label"] = simple_classify_listing(listing)
+            listing["classified_label"] = simple_label(listing)
             
             # Simple scoring
             listing["score"] = simple_score_listing(listing)
@@ -94,9 +58,6 @@ def run_csv_pipeline():
             # Add processing timestamp
             listing["processed_at"] = datetime.utcnow().isoformat()
             
-            # Save to database
-            upsert_listing(listing)
-            
             all_listings.append(listing)
             
             logger.info(f"Processed listing {i+1}/{len(all_results)}: {listing.get('address', 'Unknown address')}")
@@ -105,6 +66,9 @@ def run_csv_pipeline():
             logger.exception(f"Error processing listing {i}: %s", e)
             continue
     
+    # Save to database in batched transactions
+    upsert_listings(all_listings)
+    
     # 3) Export to CSV
     if all_listings:
         df = pd.DataFrame(all_listings)
@@ -115,7 +79,7 @@ def run_csv_pipeline():
         # Show summary
         logger.info("CSV Export Summary:")
         logger.info(f"Total listings: {len(all_listings)}")
-        logger.info(f"Sources: Zillow: {len(z_results)}, Redfin: {len(r_results)}, Realtor: {len(rl_results)}")
+        logger.info(f"Sources: Zillow: {source_counts['Zillow']}, Redfin: {source_counts['Redfin']}, Realtor: {source_counts['Realtor']}")
         
         # Show classification breakdown
         classifications = df['classified_label'].value_counts()
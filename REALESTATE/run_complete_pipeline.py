@@ -7,48 +7,20 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
 
 from app.utils.logger import logger
-from app.scraper.zillow_scraper import scrape_zillow
-from app.scraper.redfin_scraper import scrape_redfin
-from app.scraper.realtor_scraper import scrape_realtor
-from app.utils.mock_data import scrape_with_fallback
-from app.integrations.database_manager import init_db, upsert_listing
+from app.scraper.crawl_frontier import run_crawl
+from app.integrations.database_manager import init_db, upsert_listings
 from app.utils.config_loader import CONFIG
+from app.core.scoring_engine import score_listing
+from app.nlp.preclassifier import simple_label
+from app.integrations.pipeline_jobs import JobReporter
 import pandas as pd
+import argparse
 import json
 from datetime import datetime
 
-def simple_classify_listing(listing_data):
-    """Simple classification without OpenAI API"""
-    price = listing_data.get('price', 0)
-    beds = listing_data.get('beds', 0) 
-    
-    if price and price > 800000:
-        if beds and beds >= 4:
-            return "luxury-family"
-        else:
-            return "luxury-condo"
-    elif price and price > 500000:
-        return "mid-range"
-    else:
-        return "starter-home"
-
 def simple_score_listing(listing_data):
-    """Simple scoring without complex algorithms"""
-    score = 0
-    
-    price = listing_data.get('price', 0)
-    if price:
-        score += min(price / 1000000 * 50, 50)
-    
-    beds = listing_data.get('beds', 0)
-    if beds:
-        score += min(beds * 5, 20)
-    
-    sqft = listing_data.get('living_area', 0)
-    if sqft:
-        score += min(sqft / 100, 30)
-    
-    return round(score, 2)
+    """Simple scoring without complex algorithms - the "simple" rules in scoring_rules.json"""
+    return score_listing(listing_data, ruleset="simple")
 
 def upload_to_google_sheets(df):
     """Upload DataFrame to Google Sheets"""
@@ -126,8 +98,12 @@ def upload_to_google_sheets(df):
             
         return False
 
-def run_complete_pipeline():
-    """Run the complete pipeline: scrape, process, save CSV, upload to Sheets"""
+def run_complete_pipeline(job=None):
+    """
+    Run the complete pipeline: scrape, process, save CSV, upload to Sheets.
+    job - optional JobReporter that the dashboard polls for stage and progress
+    """
+    job = job or JobReporter(None)
     
     logger.info("🚀 Starting Complete Real Estate Pipeline")
     
@@ -139,20 +115,22 @@ def run_complete_pipeline():
     
     # 1) Scrape data from all sources
     logger.info("🕷️ Scraping real estate data...")
-    z_results = scrape_with_fallback(lambda: scrape_zillow(max_pages=1), "Zillow", use_mock=True)
-    r_results = scrape_with_fallback(scrape_redfin, "Redfin", use_mock=True)  
-    rl_results = scrape_with_fallback(scrape_realtor, "Realtor", use_mock=True)
+    job.stage("scraping")
+    # Same crawl queue as the dev pipeline: each finished (source, city, page) task counts as progress
+    all_results, scrape_report = run_crawl(use_mock=True, on_progress=lambda progress: job.advance())
+    job.set_sources(scrape_report["sources"])
+    source_counts = {name: info["count"] for name, info in scrape_report["sources"].items()}
     
-    all_results = z_results + r_results + rl_results
     logger.info(f"📊 Found {len(all_results)} total listings")
     
     # 2) Process each listing
+    job.stage("processing", total=len(all_results))
     processed_listings = []
     
     for i, listing in enumerate(all_results):
         try:
             # Classification and scoring
-            listing["classified_label"] = simple_classify_listing(listing)
+            listing["classified_label"] = simple_label(listing)
             listing["score"] = simple_score_listing(listing)
             
             # Prepare raw_json for database
@@ -165,8 +143,6 @@ def run_complete_pipeline():
             # Add timestamps - use current local time
             listing["processed_at"] = datetime.now().isoformat()
             
-            # Save to database
-            upsert_listing(listing)
             processed_listings.append(listing)
             
             logger.info(f"✅ Processed {i+1}/{len(all_results)}: {listing.get('address', 'Unknown')}")
@@ -174,27 +150,37 @@ def run_complete_pipeline():
         except Exception as e:
             logger.exception(f"❌ Error processing listing {i}: %s", e)
             continue
+        finally:
+            job.advance()
     
     if not processed_listings:
         logger.error("❌ No listings were successfully processed")
+        job.fail("No listings were successfully processed")
         return False
     
+    # Save to database in batched transactions
+    job.stage("saving", total=len(processed_listings))
+    upsert_listings(processed_listings)
+    job.advance(len(processed_listings))
+    
     # 3) Create DataFrame for export
     df = pd.DataFrame(processed_listings)
     
     # 4) Save CSV
+    job.stage("exporting")
     csv_path = "./data/classified_listings.csv"
     df.to_csv(csv_path, index=False)
     logger.info(f"💾 Saved CSV: {csv_path}")
     
     # 5) Upload to Google Sheets
+    job.stage("uploading")
     sheets_success = upload_to_google_sheets(df)
     
     # 6) Show summary
     logger.info("\n" + "="*50)
     logger.info("🎉 PIPELINE COMPLETE!")
     logger.info(f"📊 Total listings processed: {len(processed_listings)}")
-    logger.info(f"🏠 Sources: Zillow({len(z_results)}), Redfin({len(r_results)}), Realtor({len(rl_results)})")
+    logger.info(f"🏠 Sources: Zillow({source_counts['Zillow']}), Redfin({source_counts['Redfin']}), Realtor({source_counts['Realtor']})")
     
     # Show classifications
     classifications = df['classified_label'].value_counts()
@@ -216,7 +202,12 @@ def run_complete_pipeline():
     return True
 
 if __name__ == "__main__":
-    success = run_complete_pipeline()
+    parser = argparse.ArgumentParser(description="Scrape, classify and score listings, then export them")
+    parser.add_argument("--job-id", type=int, help="pipeline_jobs row to report progress to (set by the dashboard)")
+    args = parser.parse_args()
+    
+    with JobReporter(args.job_id) as job:
+        success = run_complete_pipeline(job)
     
     if success:
         logger.info("\n✅ All done! Your real estate data is ready for analysis.")
@@ -0,0 +1,112 @@
+# Tests for the shared browser pool's slot accounting and loop bookkeeping, with stub contexts
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper import browser_pool
+from app.scraper.browser_pool import BrowserPool, get_browser_pool, run_sync
+import asyncio
+import concurrent.futures
+import pytest
+import threading
+
+class StubPage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+class StubContext:
+    def __init__(self, number):
+        self.number = number
+        self.pages = []
+
+    async def new_page(self):
+        page = StubPage(self)
+        self.pages.append(page)
+        return page
+
+@pytest.fixture
+def stub_browser(monkeypatch):
+    """No Chromium: start() is a no-op and every new context is a numbered StubContext"""
+    contexts = []
+    async def start(self):
+        self.browser = "browser"
+    async def setup_browser_context(browser):
+        contexts.append(StubContext(len(contexts)))
+        return contexts[-1]
+    monkeypatch.setattr(BrowserPool, "start", start)
+    monkeypatch.setattr(browser_pool, "setup_browser_context", setup_browser_context)
+    monkeypatch.setattr(browser_pool, "log_page_savings", lambda page: None)
+    return contexts
+
+def test_pages_never_exceed_the_slots(stub_browser):
+    open_pages = []
+    peak = [0]
+
+    async def borrow(pool):
+        async with pool.page() as page:
+            open_pages.append(page)
+            peak[0] = max(peak[0], len(open_pages))
+            await asyncio.sleep(0.01)
+            open_pages.remove(page)
+        return page
+
+    async def run():
+        pool = BrowserPool(max_contexts=2, pages_per_context=2)
+        return await asyncio.gather(*(borrow(pool) for _ in range(10)))
+    pages = asyncio.run(run())
+
+    assert peak[0] == 4
+    assert all(page.closed for page in pages)
+    # Contexts are only created up to the limit, then reused
+    assert len(stub_browser) == 2
+
+def test_contexts_are_handed_out_round_robin(stub_browser):
+    async def run():
+        pool = BrowserPool(max_contexts=3, pages_per_context=1)
+        used = []
+        for _ in range(7):
+            async with pool.page() as page:
+                used.append(page.context.number)
+        return used
+
+    assert asyncio.run(run()) == [0, 1, 2, 0, 1, 2, 0]
+
+def test_pools_of_closed_loops_are_dropped(monkeypatch):
+    monkeypatch.setattr(browser_pool, "_pools", {})
+    first = asyncio.run(get_browser_pool())
+    # asyncio.run closed the first loop without closing its pool
+    second = asyncio.run(get_browser_pool())
+    assert second is not first
+    assert list(browser_pool._pools.values()) == [second]
+
+    async def same_loop():
+        return await get_browser_pool() is await get_browser_pool()
+    assert asyncio.run(same_loop())
+    assert len(browser_pool._pools) == 1
+
+def test_run_sync_cancels_the_coroutine_on_timeout():
+    cancelled = threading.Event()
+
+    async def slow_scrape():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        run_sync(slow_scrape(), timeout=0.1)
+    assert cancelled.wait(5)
+
+def test_run_sync_returns_the_result():
+    async def scrape():
+        await asyncio.sleep(0)
+        return ["listing"]
+    assert run_sync(scrape(), timeout=5) == ["listing"]
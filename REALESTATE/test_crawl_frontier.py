@@ -0,0 +1,138 @@
+# Tests for the persistent crawl queue and its workers, on a throwaway database
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import close_conns, get_conn, init_db, upsert_listing
+from app.integrations.crawl_queue import init_crawl_queue, open_run, claim_task, complete_task, run_progress
+from app.scraper import crawl_frontier
+from app.scraper.crawl_frontier import PolitenessGate, run_crawl
+from app.scraper.incremental import split_by_change
+import pytest
+import threading
+
+CITIES = ["Newton, MA", "Wellesley, MA", "Needham, MA"]
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "crawl.db"))
+    yield
+    close_conns()
+
+def fake_page_scraper(source, calls, flaky=()):
+    """Two listings per page; (city, page) pairs in flaky raise on their first attempt"""
+    lock = threading.Lock()
+    def scrape(city, page):
+        with lock:
+            calls.append((source, city, page))
+            attempt = calls.count((source, city, page))
+        if (city, page) in flaky and attempt == 1:
+            raise RuntimeError("connection reset")
+        return [{"source": source.lower(), "url": f"{source}/{city}/{page}/{i}", "price": 500000 + i} for i in range(2)]
+    return scrape
+
+def test_crawls_every_city_and_page_with_retries():
+    calls = []
+    scrapers = {
+        "Zillow": fake_page_scraper("Zillow", calls, flaky={("Wellesley, MA", 2)}),
+        "Redfin": fake_page_scraper("Redfin", calls),
+    }
+    results, report = run_crawl(scrapers, cities=CITIES, max_pages={"Zillow": 2, "Redfin": 1},
+                                workers=4, retry_delay=0, use_mock=False)
+
+    # 3 cities x 2 Zillow pages + 3 cities x 1 Redfin page, the flaky page twice
+    assert len(calls) == 10
+    assert report["finished"] and report["tasks"]["done"] == 9 and report["tasks"]["failed"] == 0
+    assert report["sources"]["Zillow"]["count"] == 12
+    assert report["sources"]["Redfin"]["count"] == 6
+    assert len({l["url"] for l in results}) == 18
+
+def test_gives_up_after_max_attempts():
+    def broken(city, page):
+        raise RuntimeError("blocked")
+    results, report = run_crawl({"Realtor": broken}, cities=CITIES[:1], max_pages=1,
+                                max_attempts=2, retry_delay=0, use_mock=False)
+    assert results == []
+    assert report["tasks"]["failed"] == 1
+    assert report["sources"]["Realtor"]["status"] == "error"
+
+def test_resumes_interrupted_run():
+    init_crawl_queue()
+    tasks = [("Zillow", city, 1) for city in CITIES]
+    # A previous process finished one task and died while another was running
+    run_id, _ = open_run(tasks)
+    first_calls = []
+    first = claim_task(run_id)
+    complete_task(first["id"], fake_page_scraper("Zillow", first_calls)(first["city"], 1))
+    claim_task(run_id)
+    assert run_progress(run_id)["running"] == 1
+
+    calls = []
+    results, report = run_crawl({"Zillow": fake_page_scraper("Zillow", calls)}, cities=CITIES,
+                                max_pages=1, use_mock=False)
+    assert report["run_id"] == run_id and report["resumed"]
+    # Only the interrupted and untouched pages are fetched again; the stored one is reused
+    assert sorted(city for _, city, _ in calls) == sorted(c for c in CITIES if c != first["city"])
+    assert len(results) == 6
+
+def test_stale_run_is_abandoned_and_finished_runs_are_pruned():
+    init_crawl_queue()
+    tasks = [("Zillow", city, 1) for city in CITIES]
+    stale_id, _ = open_run(tasks)
+    task = claim_task(stale_id)
+    complete_task(task["id"], fake_page_scraper("Zillow", [])(task["city"], 1))
+    conn = get_conn()
+    with conn:
+        conn.execute("UPDATE crawl_runs SET started_at = datetime('now', '-13 hours') WHERE id = ?", (stale_id,))
+
+    run_id, resumed = open_run(tasks, max_age_hours=12)
+    assert run_id != stale_id and not resumed
+    assert run_progress(stale_id)["total"] == 0
+    assert conn.execute("SELECT finished_at IS NOT NULL FROM crawl_runs WHERE id = ?", (stale_id,)).fetchone()[0]
+
+    results, report = run_crawl({"Zillow": fake_page_scraper("Zillow", [])}, cities=CITIES,
+                                max_pages=1, use_mock=False)
+    assert report["run_id"] == run_id and report["finished"] and len(results) == 6
+    assert report["tasks"]["done"] == 3
+    assert conn.execute("SELECT COUNT(*) FROM crawl_tasks").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM crawl_results").fetchone()[0] == 0
+
+def test_incremental_stops_at_known_pages():
+    init_db()
+    calls = []
+    scrape = fake_page_scraper("Zillow", calls)
+    # Last night's run stored page 1 of Newton
+    for listing in scrape("Newton, MA", 1):
+        upsert_listing(dict(listing, raw_json="{}"))
+    calls.clear()
+
+    results, report = run_crawl({"Zillow": scrape}, cities=CITIES[:1], max_pages=3, workers=1,
+                                use_mock=False, incremental=True)
+    # Page 1 is entirely known and unchanged, so pages 2 and 3 are never fetched
+    assert calls == [("Zillow", "Newton, MA", 1)]
+    assert report["tasks"]["skipped"] == 2
+
+    results[0]["price"] -= 10000
+    to_process, unchanged, counts = split_by_change(results + [{"url": "Zillow/Newton, MA/9/0", "price": 1}])
+    assert counts == {"new": 1, "changed": 1, "unchanged": 1}
+    assert [l["url"] for l in unchanged] == [results[1]["url"]]
+
+def test_politeness_gate_spaces_requests_per_source(monkeypatch):
+    clock = [100.0]
+    slept = []
+    monkeypatch.setattr(crawl_frontier.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(crawl_frontier.time, "sleep", slept.append)
+    gate = PolitenessGate(3.0)
+
+    assert gate.wait("Zillow") == 0
+    assert gate.wait("Redfin") == 0
+    # A second worker asking right away has to wait out the interval, a third waits behind it
+    assert gate.wait("Zillow") == 3.0
+    assert gate.wait("Zillow") == 6.0
+    clock[0] += 20
+    assert gate.wait("Zillow") == 0
+    assert slept == [3.0, 6.0]
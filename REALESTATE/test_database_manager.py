@@ -0,0 +1,155 @@
+# Tests for the listings database helpers, on a throwaway database
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import (
+    MIGRATIONS, close_conns, init_db, connect, get_conn, get_read_conn, upsert_listings, get_known_listings,
+    price_drops, listing_history, update_listings, deferred_rollups,
+)
+import pytest
+import sqlite3
+import threading
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "listings.db"))
+    yield
+    close_conns()
+
+def make_listings(count, price=500000):
+    return [{"source": "zillow", "url": f"https://example.com/home-{i}", "address": f"{i} Main St",
+             "price": price + i, "status": "for_sale", "raw_json": "{}"} for i in range(count)]
+
+def test_bulk_upsert_inserts_then_updates():
+    init_db()
+    assert upsert_listings(make_listings(1200), batch_size=500) == 1200
+    # Second pass over the same URLs updates prices in place
+    upsert_listings(iter(make_listings(1200, price=450000)), batch_size=500)
+
+    count, low = get_conn().execute("SELECT COUNT(*), MIN(price) FROM listings").fetchone()
+    assert (count, low) == (1200, 450000)
+    assert get_known_listings(["https://example.com/home-7"])["https://example.com/home-7"]["price"] == 450007
+
+def test_reader_is_not_blocked_by_open_write_transaction():
+    init_db()
+    upsert_listings(make_listings(10))
+    assert get_conn().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    writer = get_conn()
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("UPDATE listings SET price = 1")
+    try:
+        # A dashboard thread reads the last committed state while the write is in flight
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(
+            get_read_conn().execute("SELECT MIN(price) FROM listings").fetchone()[0]))
+        reader.start()
+        reader.join(timeout=5)
+        assert seen == [500000]
+    finally:
+        writer.rollback()
+
+def test_migrates_legacy_database_once():
+    # A database created before migrations existed: the bare table, user_version 0
+    legacy = connect()
+    legacy.executescript(MIGRATIONS[0])
+    legacy.execute("INSERT INTO listings (source, url, price, raw_json) VALUES ('zillow', 'https://example.com/a', 1, ?)",
+                   ('{"zpid": 123, "home_type": "CONDO", "extraction": "embedded_json"}',))
+    legacy.commit()
+    legacy.close()
+
+    init_db()
+    init_db()
+    conn = get_conn()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert conn.execute("SELECT external_id, home_type, extraction FROM listings").fetchone() == ("123", "CONDO", "embedded_json")
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM listings ORDER BY created_at DESC LIMIT 10").fetchall()
+    assert "idx_listings_created_at" in plan[0][3]
+    # Rows that predate the search index are indexed by the migration
+    assert conn.execute("SELECT rowid FROM listings_fts WHERE listings_fts MATCH 'condo'").fetchall() == [(1,)]
+    # ...and counted in the rollups
+    assert conn.execute("SELECT source, listings, price_sum FROM listing_rollups").fetchall() == [("zillow", 1, 1)]
+    # Its moments are taken around the column means at the time, which become the stored shift
+    assert conn.execute("SELECT price, beds FROM moment_shift").fetchone() == (1, None)
+    assert conn.execute("SELECT listings, n_price_price, sxx_price_price FROM listing_moments").fetchone() == (1, 1, 0)
+
+def test_records_only_real_price_and_status_changes():
+    init_db()
+    listings = make_listings(5)
+    upsert_listings(listings)
+    # Nightly re-upsert with nothing changed writes no events
+    upsert_listings(listings)
+    assert get_conn().execute("SELECT COUNT(*) FROM listing_events").fetchone()[0] == 0
+
+    listings[1]["price"] = 400001                        # 20% cut
+    listings[2]["price"] = 490002                        # 2% cut
+    listings[3]["price"] = 600003                        # raise
+    listings[4]["status"] = "pending"
+    listings[0]["price"] = None                          # failed to parse, not a change
+    upsert_listings(listings)
+
+    drops = price_drops(days=7)
+    assert [(d["url"], d["old_price"], d["new_price"]) for d in drops] == [
+        ("https://example.com/home-1", 500001, 400001),
+        ("https://example.com/home-2", 500002, 490002),
+    ]
+    assert [d["url"] for d in price_drops(days=7, min_drop_pct=10)] == ["https://example.com/home-1"]
+    history = listing_history("https://example.com/home-4")
+    assert [(h["field"], h["old_value"], h["new_value"]) for h in history] == [("status", "for_sale", "pending")]
+
+def search(query):
+    return [r[0] for r in get_conn().execute(
+        "SELECT l.url FROM listings_fts JOIN listings l ON l.id = listings_fts.rowid "
+        "WHERE listings_fts MATCH ? ORDER BY l.id", (query,))]
+
+def test_search_index_follows_upserts():
+    init_db()
+    listings = make_listings(3)
+    listings[0]["description"] = "Tear down on a double lot"
+    listings[1]["raw_json"] = '{"price_text": "$1.2M", "home_type": "SINGLE_FAMILY"}'
+    upsert_listings(listings)
+    assert search('"double lot"') == ["https://example.com/home-0"]
+    assert search("single_fam*") == ["https://example.com/home-1"]
+    assert search("main") == [l["url"] for l in listings]
+
+    listings[0]["description"] = "Renovated colonial"
+    upsert_listings(listings)
+    assert search("tear") == []
+    assert search("colon*") == ["https://example.com/home-0"]
+
+    update_listings(["classified_label"], [("not_development", 3)])
+    assert search("not_development") == ["https://example.com/home-2"]
+    assert search("development") == []
+
+    with get_conn() as conn:
+        conn.execute("DELETE FROM listings WHERE id = 3")
+    assert search("main") == ["https://example.com/home-0", "https://example.com/home-1"]
+    # Raises if the index and the listings table disagree
+    get_conn().execute("INSERT INTO listings_fts (listings_fts, rank) VALUES ('integrity-check', 1)")
+
+def test_deferred_rollups_lock_before_the_snapshot():
+    init_db()
+    upsert_listings(make_listings(3))
+    conn = get_conn()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        with conn:
+            with deferred_rollups(conn, "url", ["https://example.com/home-1"]):
+                # No other writer can get in from the snapshot on
+                other = connect()
+                other.execute("PRAGMA busy_timeout = 0")
+                with pytest.raises(sqlite3.OperationalError, match="locked"):
+                    other.execute("BEGIN IMMEDIATE")
+                other.close()
+                conn.execute("UPDATE listings SET price = 1 WHERE url = 'https://example.com/home-1'")
+    finally:
+        conn.set_trace_callback(None)
+
+    snapshot = next(i for i, s in enumerate(statements) if s.startswith("SELECT id, "))
+    assert "BEGIN IMMEDIATE" in statements[:snapshot]
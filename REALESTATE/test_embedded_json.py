@@ -0,0 +1,65 @@
+# Tests for the embedded-JSON listing extractors against saved search pages
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper.embedded_json import extract_zillow_listings, extract_redfin_listings, extract_realtor_listings
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name)) as f:
+        return f.read()
+
+def test_zillow_next_data():
+    listings = extract_zillow_listings(load_fixture("zillow_search_next_data.html"), pg=2)
+    # mapResults repeats three of the homes; they must not be duplicated
+    assert len(listings) == 8
+    assert len({l["url"] for l in listings}) == 8
+    first = listings[0]
+    assert first["source"] == "zillow"
+    assert first["url"].startswith("https://www.zillow.com/homedetails/")
+    assert first["address"] == "20 Walnut St, Newton, MA 02458"
+    assert first["price"] == 2352000
+    assert (first["beds"], first["baths"], first["living_area"]) == (5, 2.5, 3500)
+    assert (first["lot_size"], first["year_built"], first["dom"]) == (15000, 1978, 25)
+    assert first["raw_json"]["page_number"] == 2
+    assert first["raw_json"]["extraction"] == "embedded_json"
+    # Lot sizes given in acres are converted to square feet
+    assert all(l["lot_size"] >= 4791 for l in listings)
+
+def test_redfin_preloaded_search_state():
+    listings = extract_redfin_listings(load_fixture("redfin_search_state.html"))
+    assert len(listings) == 6
+    first = listings[0]
+    assert first["url"] == "https://www.redfin.com/MA/Newton/20-Walnut-St-02458/home/1100000"
+    assert first["address"] == "20 Walnut St, Newton, MA 02458"
+    assert (first["price"], first["beds"], first["baths"], first["living_area"]) == (2083000, 2, 1.0, 900)
+    assert (first["lot_size"], first["year_built"], first["dom"], first["status"]) == (10890, 1925, 119, "Active")
+
+def test_realtor_next_data():
+    listings = extract_realtor_listings(load_fixture("realtor_search_next_data.html"))
+    assert len(listings) == 5
+    first = listings[0]
+    assert first["url"].startswith("https://www.realtor.com/realestateandhomes-detail/20-Walnut-St_Newton_MA")
+    assert (first["price"], first["lot_size"], first["year_built"]) == (1745000, 52272, 2015)
+    assert first["description"] == "Sunny split-level with updated baths."
+
+def test_missing_or_broken_json_falls_back():
+    # DOM-only pages have no embedded data, so the scrapers go on to read the cards
+    assert extract_zillow_listings(load_fixture("zillow_search.html")) == []
+    assert extract_redfin_listings(load_fixture("redfin_search.html")) == []
+    assert extract_realtor_listings(load_fixture("realtor_search.html")) == []
+    broken = '<script id="__NEXT_DATA__" type="application/json">{"props": </script>'
+    assert extract_zillow_listings(broken) == []
+    assert extract_redfin_listings("root.__reactServerState.InitialContext = {oops};") == []
+
+if __name__ == "__main__":
+    test_zillow_next_data()
+    test_redfin_preloaded_search_state()
+    test_realtor_next_data()
+    test_missing_or_broken_json_falls_back()
+    print("All embedded JSON tests passed")
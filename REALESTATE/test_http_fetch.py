@@ -0,0 +1,61 @@
+# Tests for the plain-HTTP scraping mode against a local fixture server
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper import http_fetch, zillow_scraper, redfin_scraper, realtor_scraper
+from fixtures.server import serve_fixtures
+import pytest
+
+@pytest.fixture
+def fixture_site(tmp_path, monkeypatch):
+    """The fixture pages served locally, with an empty HTTP cache"""
+    monkeypatch.setattr(http_fetch, "CACHE_DIR", str(tmp_path))
+    server, base = serve_fixtures()
+    yield server, base
+    server.shutdown()
+
+@pytest.fixture
+def server(fixture_site):
+    return fixture_site[0]
+
+@pytest.fixture
+def base(fixture_site):
+    return fixture_site[1]
+
+def test_dom_cards_parsed_without_browser(server, base):
+    html = http_fetch.fetch_html(f"{base}/zillow_search.html", ttl=0)
+    listings = zillow_scraper.parse_search_html(html, 1)
+    assert len(listings) == 40
+    first = listings[0]
+    assert first["address"] == "10 Commonwealth Ave, Newton, MA 02458"
+    assert first["price"] == 1113000
+    assert (first["beds"], first["baths"], first["living_area"]) == (3, 2.5, 1140)
+    assert first["url"] == "https://www.zillow.com/homedetails/10-Commonwealth-Ave-Newton-MA-02458/20000000_zpid/"
+
+    assert len(redfin_scraper.parse_search_html(http_fetch.fetch_html(f"{base}/redfin_search.html", ttl=0))) == 20
+    assert len(realtor_scraper.parse_search_html(http_fetch.fetch_html(f"{base}/realtor_search.html", ttl=0))) == 15
+
+def test_embedded_json_preferred(server, base):
+    html = http_fetch.fetch_html(f"{base}/zillow_search_next_data.html", ttl=0)
+    listings = zillow_scraper.parse_search_html(html, 1)
+    assert len(listings) == 8
+    assert all(l["raw_json"]["extraction"] == "embedded_json" for l in listings)
+
+def test_cache_and_conditional_requests(server, base):
+    url = f"{base}/realtor_search.html"
+    first = http_fetch.fetch_html(url, ttl=60)
+    # Fresh cache entry: no request at all
+    assert http_fetch.fetch_html(url, ttl=60) == first
+    assert len(server.hits) == 1
+    # Stale entry: revalidated with If-Modified-Since, server answers 304
+    assert http_fetch.fetch_html(url, ttl=0) == first
+    assert len(server.hits) == 2
+    assert server.hits[1][1] is not None
+
+def test_failures_return_none(server, base):
+    assert http_fetch.fetch_html(f"{base}/missing.html", ttl=0) is None
+    assert http_fetch.looks_blocked("<html><div id='px-captcha'></div></html>")
@@ -0,0 +1,65 @@
+# Tests for the dashboard's property card markup
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations.listing_cards import format_currency, property_cards_html
+import numpy as np
+import pandas as pd
+
+LISTING = {
+    "url": "https://www.zillow.com/homedetails/1", "address": "12 Elm St, Newton, MA", "beds": 3.0,
+    "baths": 2.5, "living_area": 1850.0, "price": 899000, "classified_label": "family_home",
+    "score": 7.25, "source": "zillow", "processed_at": "2026-03-07T10:15:00",
+}
+
+def cards(*listings):
+    return property_cards_html(pd.DataFrame(list(listings))).split("\n")
+
+def test_one_card_per_listing_with_its_details():
+    html = cards(LISTING, dict(LISTING, address="14 Elm St, Newton, MA"))
+    assert len(html) == 2
+    first = html[0]
+    assert '<a href="https://www.zillow.com/homedetails/1" target="_blank">12 Elm St, Newton, MA</a>' in first
+    assert "3 bed, 2.5 bath" in first
+    assert "1850 sq ft" in first
+    assert "$899,000" in first
+    assert "Score: 7.2" in first
+    assert "Zillow<br>🕐 03/07" in first
+    assert "14 Elm St" in html[1]
+
+def test_missing_values_show_placeholders():
+    card, = cards(dict(LISTING, url=None, beds=np.nan, baths=None, price=np.nan, score=None,
+                       classified_label=np.nan, source=None, processed_at="not a date"))
+    assert 'href="#"' in card
+    assert "N/A bed, N/A bath" in card
+    assert "💰 <strong>N/A</strong>" in card
+    assert "Score: N/A" in card
+    assert "📊 N/A<br>🕐 N/A" in card
+    assert "nan" not in card.lower()
+
+def test_missing_columns_show_placeholders():
+    card, = cards({"address": "1 Main St", "price": 500000})
+    assert "1 Main St" in card
+    assert "$500,000" in card
+    assert "N/A bed" in card and "Score: N/A" in card
+
+def test_values_are_html_escaped():
+    card, = cards(dict(LISTING, address='<script>alert("x")</script> & Co', classified_label="a'b",
+                       url='https://x.test/?a=1&b="2"'))
+    assert "<script>" not in card
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; Co" in card
+    assert "a&#x27;b" in card
+    assert 'href="https://x.test/?a=1&amp;b=&quot;2&quot;"' in card
+
+def test_only_web_links_are_linked():
+    card, = cards(dict(LISTING, url="javascript:alert(1)"))
+    assert 'href="#"' in card
+
+def test_empty_page_and_currency():
+    assert property_cards_html(pd.DataFrame()) == ""
+    assert format_currency(1234567.4) == "$1,234,567"
+    assert format_currency(None) == "N/A"
@@ -0,0 +1,168 @@
+# The dashboard's SQL filters, pages and aggregates must match the pandas computations they replace
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import (
+    close_conns, init_db, upsert_listings, update_listings, get_conn, get_read_conn,
+)
+from app.integrations import listing_queries as q
+from app.integrations.listing_queries import ListingFilter
+import numpy as np
+import pandas as pd
+import pytest
+import random
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "queries.db"))
+    init_db()
+    yield
+    close_conns()
+
+def stored_frame(count=400):
+    rng = random.Random(11)
+    listings = [{
+        "source": rng.choice(["zillow", "redfin", "realtor"]), "url": f"https://example.com/{i}",
+        "address": f"{i} {rng.choice(['Maple Ave', 'Oak St', 'Elm Rd'])}",
+        "price": rng.choice([None, rng.randint(100, 2000) * 1000]), "beds": rng.choice([None, 2, 3, 4]),
+        "baths": rng.choice([1.0, 1.5, 2.0]), "living_area": rng.randint(600, 4000),
+        "classified_label": rng.choice(["development", "not_development", "maybe"]),
+        "score": round(rng.uniform(0, 30), 3), "raw_json": "{}",
+    } for i in range(count)]
+    upsert_listings(listings)
+    return get_read_conn(), pd.DataFrame(listings)
+
+def test_aggregates_match_pandas():
+    conn, df = stored_frame()
+    f = ListingFilter(price_min=300000, source="redfin")
+    expected = df[(df["price"] >= 300000) & (df["source"] == "redfin")]
+
+    metrics = q.overview_metrics(conn, f)
+    assert metrics["count"] == len(expected)
+    assert np.isclose(metrics["avg_price"], expected["price"].mean())
+    assert q.count_listings(conn, f) == len(expected)
+
+    counts = q.label_counts(conn, f).set_index("classified_label")["count"]
+    assert counts.to_dict() == expected["classified_label"].value_counts().to_dict()
+
+    cols = q.NUMERIC_COLUMNS
+    stats = q.summary_stats(conn, f)
+    described = expected[cols].describe()
+    for stat in ["count", "mean", "std", "min", "max"]:
+        assert np.allclose(stats.loc[stat, cols].astype(float), described.loc[stat, cols].astype(float))
+
+    corr = q.correlation_matrix(conn, ListingFilter())
+    assert np.allclose(corr.astype(float), df[cols].corr(), equal_nan=True)
+
+    hist = q.price_histogram(conn, ListingFilter(), bins=10)
+    assert hist["count"].sum() == df["price"].notna().sum()
+
+def test_summary_stats_of_a_constant_column():
+    conn, df = stored_frame(50)
+    writer = get_conn()
+    with writer:
+        writer.execute("UPDATE listings SET score = 33.3, price = 2999999.7, living_area = 1000 + id % 2 * 1e-6")
+    stats = q.summary_stats(conn, ListingFilter())
+    assert stats.loc["std", "score"] == 0.0
+    assert stats.loc["std", "price"] == 0.0
+    # Nearly constant: still a real, tiny deviation
+    assert 0 < stats.loc["std", "living_area"] < 1e-6
+
+def test_correlations_far_from_zero(monkeypatch):
+    # Values around 1e12 with a spread of tens: sums of squares taken around zero cancel to noise
+    rng = np.random.default_rng(7)
+    spread, noise = rng.normal(0, 40, 200).round(), rng.normal(0, 20, 200).round()
+    listings = [{"source": "zillow", "url": f"https://example.com/far-{i}", "price": 1e12 + d,
+                 "living_area": 1e12 + 3 * d + e, "beds": 3, "baths": 2.0, "score": 10.0, "raw_json": "{}"}
+                for i, (d, e) in enumerate(zip(spread, noise))]
+    # Half through the batched upsert, half row by row through the triggers
+    upsert_listings(listings[:100])
+    writer = get_conn()
+    with writer:
+        writer.executemany("INSERT INTO listings (source, url, price, living_area, beds, baths, score, raw_json) "
+                           "VALUES (:source, :url, :price, :living_area, :beds, :baths, :score, :raw_json)",
+                           listings[100:])
+    expected = np.corrcoef(spread, 3 * spread + noise)[0, 1]
+
+    conn = get_read_conn()
+    from_rollups = q.correlation_matrix(conn, ListingFilter())
+    monkeypatch.setattr(q, "rollup_where", lambda conn, f: None)
+    raw = q.correlation_matrix(conn, ListingFilter())
+    for matrix in (from_rollups, raw):
+        assert np.isclose(matrix.loc["price", "living_area"], expected, rtol=1e-9)
+        assert np.isclose(matrix.loc["price", "price"], 1.0, rtol=1e-9)
+        # A constant column has no correlation, rather than one made of rounding errors
+        assert np.isnan(matrix.loc["beds", "price"])
+
+def test_rollups_follow_writes_and_match_the_raw_rows(monkeypatch):
+    conn, df = stored_frame()
+    # Price and bed changes in place, relabels and deletes - including the cheapest and dearest listings
+    repriced = pd.concat([df.sample(60, random_state=5), df.nsmallest(1, "price")]).drop_duplicates("url")
+    upsert_listings(repriced.assign(price=lambda d: d["price"] * 2, beds=None).to_dict("records"))
+    extremes = "SELECT MIN(price_min), MAX(price_max) FROM listing_rollups"
+    assert conn.execute(extremes).fetchone() == conn.execute("SELECT MIN(price), MAX(price) FROM listings").fetchone()
+    changed = df.sample(60, random_state=3).assign(price=lambda d: d["price"].fillna(0) + 25000,
+                                                    classified_label="maybe")
+    upsert_listings(changed.to_dict("records"))
+    update_listings(["score", "classified_label"], [(1.5, "development", i) for i in range(1, 400, 9)])
+    writer = get_conn()
+    with writer:
+        # Plain SQL writes go through the per-row triggers
+        writer.execute("UPDATE listings SET price = price + 5000, beds = NULL WHERE id % 5 = 1")
+        writer.execute("UPDATE listings SET source = 'redfin' WHERE id % 11 = 2")
+        writer.execute("DELETE FROM listings WHERE price IN (SELECT MIN(price) FROM listings UNION SELECT MAX(price) FROM listings)")
+        writer.execute("DELETE FROM listings WHERE id % 7 = 0")
+    assert writer.execute("SELECT COUNT(*) FROM listing_rollups WHERE listings = 0").fetchone()[0] == 0
+
+    for f in [ListingFilter(), ListingFilter(source="redfin"), ListingFilter(label="maybe", source="zillow")]:
+        assert q.rollup_where(conn, f) is not None
+        from_rollups = {name: getattr(q, name)(conn, f) for name in
+                        ["overview_metrics", "label_counts", "source_stats", "correlation_matrix"]}
+        with monkeypatch.context() as m:
+            m.setattr(q, "rollup_where", lambda conn, f: None)
+            raw = {name: getattr(q, name)(conn, f) for name in from_rollups}
+
+        assert from_rollups["overview_metrics"]["count"] == raw["overview_metrics"]["count"]
+        assert np.isclose(from_rollups["overview_metrics"]["avg_price"], raw["overview_metrics"]["avg_price"])
+        for key in ["min_price", "max_price", "sources"]:
+            assert from_rollups["overview_metrics"][key] == raw["overview_metrics"][key]
+        assert from_rollups["label_counts"].set_index("classified_label")["count"].to_dict() == \
+            raw["label_counts"].set_index("classified_label")["count"].to_dict()
+        pd.testing.assert_frame_equal(from_rollups["source_stats"], raw["source_stats"], check_dtype=False)
+        assert np.allclose(from_rollups["correlation_matrix"].astype(float), raw["correlation_matrix"].astype(float),
+                           equal_nan=True)
+
+    hist = q.price_histogram(conn, ListingFilter(), bins=10)
+    assert hist["count"].sum() == conn.execute("SELECT COUNT(price) FROM listings").fetchone()[0]
+    assert q.rollup_where(conn, ListingFilter(price_min=1)) is None
+
+def test_pages_cover_the_filtered_rows_once_in_order():
+    conn, df = stored_frame()
+    f = ListingFilter(label="development")
+    pages = [q.fetch_page(conn, f, "price", True, page, 25) for page in range(10)]
+    rows = pd.concat(pages)
+    expected = df[df["classified_label"] == "development"]
+    assert len(rows) == len(expected) and rows["url"].is_unique
+    prices = rows["price"].dropna().tolist()
+    assert prices == sorted(prices, reverse=True)
+
+def test_search_and_csv_source(tmp_path):
+    conn, df = stored_frame()
+    f = ListingFilter(search="map")
+    assert q.count_listings(conn, f) == df["address"].str.contains("Maple").sum()
+    assert q.count_listings(conn, ListingFilter(search='"maple ave" development')) == \
+        ((df["address"].str.contains("Maple Ave")) & (df["classified_label"] == "development")).sum()
+    assert q.fts_query('1 "Oak St" ma*ple "') == '"1"* "Oak St" "ma*ple"*'
+    assert q.fts_query(' - " ') is None
+
+    path = str(tmp_path / "listings.csv")
+    df.assign(processed_at="2024-05-01 10:00:00").to_csv(path, index=False)
+    csv = q.csv_conn(path)
+    assert q.filter_options(csv)["total"] == len(df)
+    assert q.count_listings(csv, f) == q.count_listings(conn, f)
+    assert q.fetch_page(csv, f, page_size=1)["processed_at"][0] == "2024-05-01 10:00:00"
@@ -0,0 +1,115 @@
+# Tests for batched LLM classification against a local stub of the OpenAI API
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import close_conns, init_db, get_conn
+from app.nlp.classification_cache import CACHE_STATS, reset_cache_stats, evict
+from app.nlp import openai_classifier
+from app.nlp.openai_classifier import (
+    CLASSIFY_STATS, classify_listings, classify_listing, parse_batch_labels, reset_classify_stats,
+)
+from app.nlp.rate_limiter import TokenBucket
+from fixtures.openai_stub import serve_openai_stub, keyword_label
+import openai
+import pytest
+
+@pytest.fixture
+def use_stub(tmp_path, monkeypatch):
+    """Starts the OpenAI stub and points the client at it; every test gets a fresh database, so the cache starts empty"""
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "classifier.db"))
+    init_db()
+    servers = []
+    def start(**kwargs):
+        server, api_base = serve_openai_stub(**kwargs)
+        servers.append(server)
+        monkeypatch.setattr(openai, "api_base", api_base)
+        monkeypatch.setattr(openai, "api_key", "test-key")
+        return server
+    yield start
+    for server in servers:
+        server.shutdown()
+    close_conns()
+
+@pytest.fixture
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(openai_classifier, "BACKOFF_BASE", 0.01)
+
+def make_listings(count):
+    kinds = ["2.5 acre lot with barn", "Updated colonial", "Fixer upper cape", "Buildable land parcel"]
+    return [{"address": f"{i} Elm St", "price": 500000 + i, "beds": 3,
+             "raw_json": {"description": kinds[i % len(kinds)]}} for i in range(count)]
+
+def test_batches_run_concurrently_and_keep_order(use_stub):
+    server = use_stub(delay=0.3)
+    listings = make_listings(45)
+    labels = classify_listings(listings, batch_size=10, concurrency=3)
+
+    # 45 listings in 5 requests, never more than 3 at a time
+    assert len(server.prompts) == 5
+    assert server.peak == 3
+    assert labels == [keyword_label(l["raw_json"]["description"]) for l in listings]
+
+def test_unparseable_entries_fall_back_to_single_requests(use_stub):
+    def reply(prompt):
+        if "Listing 1:" in prompt:
+            return 'Sure! {"1": "development", "2": "condo", "3": "maybe"}'
+        return "not_development"
+    server = use_stub(reply=reply)
+    labels = classify_listings(make_listings(3), batch_size=3)
+    # "condo" isn't an allowed label, so listing 2 is asked about again on its own
+    assert labels == ["development", "not_development", "maybe"]
+    assert len(server.prompts) == 2
+
+def test_cache_only_pays_for_new_or_changed_listings(use_stub):
+    server = use_stub()
+    listings = make_listings(12)
+    first = classify_listings(listings, batch_size=5)
+    assert len(server.prompts) == 3
+
+    reset_cache_stats()
+    listings[4]["price"] -= 25000
+    second = classify_listings(listings, batch_size=5)
+
+    # Only the changed listing goes back to the API, in one small batch
+    assert len(server.prompts) == 4 and "Listing 2:" not in server.prompts[-1]
+    assert second == first
+    assert CACHE_STATS == {"hits": 11, "misses": 1}
+
+    # 13 entries: the changed listing's old text still has one until it ages out
+    assert evict(max_entries=5) == 8
+    assert get_conn().execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0] == 5
+
+def test_retries_rate_limits_and_server_errors(use_stub, fast_backoff):
+    reset_classify_stats()
+    server = use_stub(failures=[429, 429, 500, 503])
+    listings = make_listings(30)
+    labels = classify_listings(listings, batch_size=10, concurrency=2)
+
+    # Every injected failure was retried instead of turning into an "error" label
+    assert labels == [keyword_label(l["raw_json"]["description"]) for l in listings]
+    assert server.requests == 7
+    assert (CLASSIFY_STATS["rate_limited"], CLASSIFY_STATS["server_errors"], CLASSIFY_STATS["retries"]) == (2, 2, 4)
+    assert CLASSIFY_STATS["failed_requests"] == 0
+
+def test_gives_up_after_max_retries(use_stub, fast_backoff):
+    reset_classify_stats()
+    server = use_stub(failures=[429] * 10)
+    label = classify_listing("12 Elm St", {"price": 1}, use_cache=False)
+    assert label == "error"
+    assert server.requests == openai_classifier.MAX_RETRIES + 1
+    assert CLASSIFY_STATS["failed_requests"] == 1
+
+def test_token_bucket_spaces_requests_at_the_quota():
+    bucket = TokenBucket(per_minute=600, capacity=2)  # 10 a second, bursts of 2
+    waits = [bucket.reserve(1) for _ in range(5)]
+    assert waits[:2] == [0.0, 0.0]
+    assert [round(w, 1) for w in waits[2:]] == [0.1, 0.2, 0.3]
+
+def test_parse_batch_labels_tolerates_garbage():
+    assert parse_batch_labels("no json here", 2) == [None, None]
+    assert parse_batch_labels('{"2": " maybe "}', 2) == [None, "maybe"]
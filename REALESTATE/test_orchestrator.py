@@ -0,0 +1,100 @@
+# Tests for the concurrent scrape orchestrator against local HTML fixture servers
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper.orchestrator import scrape_all_sources
+from fixtures.server import serve_fixtures
+import re
+import time
+import urllib.request
+
+def fixture_scraper(url, source):
+    """Minimal scraper that fetches a fixture page and turns each price into a listing"""
+    def scrape():
+        html = urllib.request.urlopen(url, timeout=30).read().decode()
+        prices = re.findall(r'>\$([\d,]+)<', html)
+        return [{"source": source, "url": f"{url}#{i}", "price": int(p.replace(',', ''))} for i, p in enumerate(prices)]
+    return scrape
+
+def test_sources_run_concurrently():
+    server, base = serve_fixtures()
+    try:
+        scrapers = {
+            "Zillow": fixture_scraper(f"{base}/zillow_search.html?delay=1", "zillow"),
+            "Redfin": fixture_scraper(f"{base}/redfin_search.html?delay=1", "redfin"),
+            "Realtor": fixture_scraper(f"{base}/realtor_search.html?delay=1", "realtor"),
+        }
+        started = time.monotonic()
+        results, report = scrape_all_sources(scrapers, use_mock=False)
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    # Three one-second sources finish in about one second, not three
+    assert elapsed < 2.5
+    assert {name: info["count"] for name, info in report.items()} == {"Zillow": 40, "Redfin": 20, "Realtor": 15}
+    assert len(results) == 75
+
+def test_slow_source_times_out_and_falls_back():
+    server, base = serve_fixtures()
+    finished = []
+    try:
+        scrapers = {
+            "Zillow": fixture_scraper(f"{base}/zillow_search.html", "zillow"),
+            "Redfin": fixture_scraper(f"{base}/redfin_search.html?delay=5", "redfin"),
+        }
+        started = time.monotonic()
+        results, report = scrape_all_sources(scrapers, use_mock=True, source_timeout={"Redfin": 1, "Zillow": 10},
+                                             on_result=lambda name, listings: finished.append(name))
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    assert elapsed < 3
+    assert finished == ["Zillow", "Redfin"]
+    assert report["Zillow"]["status"] == "ok"
+    assert report["Redfin"]["status"] == "timeout+mock"
+    assert all(l["source"] == "redfin" for l in results if "example.com" in l["url"])
+
+def test_total_budget_caps_every_source():
+    server, base = serve_fixtures()
+    try:
+        scrapers = {
+            "Zillow": fixture_scraper(f"{base}/zillow_search.html?delay=5", "zillow"),
+            "Realtor": fixture_scraper(f"{base}/realtor_search.html?delay=5", "realtor"),
+        }
+        started = time.monotonic()
+        results, report = scrape_all_sources(scrapers, use_mock=False, source_timeout=60, total_budget=1)
+        elapsed = time.monotonic() - started
+    finally:
+        server.shutdown()
+
+    assert elapsed < 3
+    assert results == []
+    assert {info["status"] for info in report.values()} == {"timeout"}
+
+def test_scrapers_that_take_a_timeout_get_their_deadline():
+    received = {}
+    def scraper(name):
+        def scrape(timeout=None):
+            received[name] = timeout
+            return []
+        return scrape
+
+    scrape_all_sources({"Zillow": scraper("Zillow"), "Redfin": scraper("Redfin"), "Realtor": lambda: []},
+                       use_mock=False, source_timeout={"Zillow": 30, "Redfin": 90}, total_budget=60)
+
+    # Each gets its own timeout, capped by the total budget, so it can cancel its browser work
+    assert 29 < received["Zillow"] <= 30
+    assert 59 < received["Redfin"] <= 60
+
+if __name__ == "__main__":
+    test_sources_run_concurrently()
+    test_slow_source_times_out_and_falls_back()
+    test_total_budget_caps_every_source()
+    test_scrapers_that_take_a_timeout_get_their_deadline()
+    print("All orchestrator tests passed")
@@ -0,0 +1,76 @@
+# Tests for background pipeline jobs: the one-active-run lock, stale reaping and progress reporting
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import close_conns, init_db, get_conn
+from app.integrations.pipeline_jobs import JobReporter, create_job, get_job, init_jobs, latest_job, reap_stale_jobs
+import pytest
+import time
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "jobs.db"))
+    init_db()
+    init_jobs()
+    yield
+    close_conns()
+
+def test_only_one_active_job():
+    first = create_job("pipeline")
+    assert first is not None
+    assert create_job("pipeline") is None
+
+    with JobReporter(first):
+        assert create_job("pipeline") is None
+    assert get_job(first)["status"] == "done"
+    assert create_job("pipeline") is not None
+
+def test_stale_job_is_failed_and_frees_the_lock():
+    job_id = create_job("pipeline")
+    conn = get_conn()
+    with conn:
+        conn.execute("UPDATE pipeline_jobs SET heartbeat_at = ? WHERE id = ?", (time.time() - 600, job_id))
+
+    assert reap_stale_jobs(stale_after=60) == 1
+    assert get_job(job_id)["status"] == "failed"
+    assert create_job("pipeline") is not None
+
+def test_progress_and_source_timings():
+    job_id = create_job("pipeline")
+    with JobReporter(job_id) as job:
+        job.stage("scraping")
+        job.source_done("Zillow", 12)
+        job.set_sources({"Zillow": {"status": "ok", "count": 12, "seconds": 1.5},
+                         "Redfin": {"status": "mock", "count": 3, "seconds": 0.2}})
+        job.stage("processing", total=15)
+        running = latest_job()
+        for _ in range(15):
+            job.advance()
+
+    assert (running["status"], running["stage"], running["total"]) == ("running", "processing", 15)
+    finished = get_job(job_id)
+    assert finished["status"] == "done"
+    assert finished["processed"] == 15
+    assert finished["sources"]["Redfin"] == {"status": "mock", "count": 3, "seconds": 0.2}
+
+def test_exception_fails_the_job():
+    job_id = create_job("pipeline")
+    try:
+        with JobReporter(job_id):
+            raise RuntimeError("scraper exploded")
+    except RuntimeError:
+        pass
+    job = get_job(job_id)
+    assert job["status"] == "failed"
+    assert "scraper exploded" in job["error"]
+
+def test_without_job_id_nothing_is_recorded():
+    with JobReporter(None) as job:
+        job.stage("scraping")
+        job.advance(5)
+    assert latest_job() is None
@@ -0,0 +1,102 @@
+# Tests for the tiered pre-classifier: keyword rules, local model, then the LLM stub
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import close_conns, init_db
+from app.nlp.preclassifier import (
+    rule_label, train_model, local_labels, evaluate, classify_listings_tiered, save_model, load_model,
+    features, development_probability, simple_label, LEGACY_REFERENCE_YEAR,
+)
+from fixtures.openai_stub import serve_openai_stub
+import datetime
+import openai
+import pytest
+import random
+
+def labelled_listings(count, seed=1):
+    """Large old lots are development, small new houses are not; no keywords either way"""
+    rng = random.Random(seed)
+    listings = []
+    for i in range(count):
+        development = i % 2 == 0
+        listings.append({
+            "address": f"{i} Oak St",
+            "price": rng.randint(150, 400) * 1000 if development else rng.randint(500, 900) * 1000,
+            "lot_size": rng.randint(20000, 80000) if development else rng.randint(3000, 8000),
+            "living_area": rng.randint(800, 1500) if development else rng.randint(1800, 3500),
+            "year_built": rng.randint(1910, 1955) if development else rng.randint(1995, 2022),
+            "description": "Charming home",
+            "classified_label": "development" if development else "not_development",
+        })
+    return listings
+
+def test_keyword_rules():
+    assert rule_label({"description": "Tear down, buildable lot"}) == ("development", 0.95)
+    assert rule_label({"description": "Bright unit", "home_type": "condo"}) == ("not_development", 0.95)
+    # Contradicting rules leave it to the later tiers
+    assert rule_label({"description": "Condo building, development opportunity"}) is None
+    assert rule_label({"description": "Charming home"}) is None
+
+def test_age_counts_from_the_models_reference_year():
+    assert features({"year_built": 1975}, reference_year=2025)[4] == 1.0
+    model = train_model(labelled_listings(200))
+    assert model["reference_year"] == datetime.date.today().year
+    # A model saved before reference_year existed keeps the year it was trained with
+    legacy = {k: v for k, v in model.items() if k != "reference_year"}
+    listings = labelled_listings(10, seed=3)
+    expected = development_probability(dict(model, reference_year=LEGACY_REFERENCE_YEAR), listings)
+    assert list(development_probability(legacy, listings)) == list(expected)
+
+def test_simple_label_price_tiers():
+    assert simple_label({"price": 900000, "beds": 4}) == "luxury-family"
+    assert simple_label({"price": 900000, "beds": 2}) == "luxury-condo"
+    assert simple_label({"price": 600000}) == "mid-range"
+    assert simple_label({"price": None}) == "starter-home"
+
+def test_model_round_trip_and_evaluation(tmp_path):
+    model = train_model(labelled_listings(200))
+    path = str(tmp_path / "preclassifier.json")
+    save_model(model, path)
+    assert load_model(path) == model
+
+    report = evaluate(labelled_listings(100, seed=2), model, thresholds=(0.9,))
+    assert report[0]["local_share"] > 0.9
+    assert report[0]["local_accuracy"] == 1.0
+    assert report[0]["llm_call_reduction"] > 10
+
+@pytest.fixture
+def llm_stub(tmp_path, monkeypatch):
+    """The OpenAI stub answering "maybe" to everything, on a fresh database"""
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "preclassifier.db"))
+    init_db()
+    server, api_base = serve_openai_stub(reply=lambda prompt: '{"1": "maybe"}')
+    monkeypatch.setattr(openai, "api_base", api_base)
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    yield server
+    server.shutdown()
+    close_conns()
+
+def test_only_uncertain_listings_reach_the_llm(llm_stub):
+    server = llm_stub
+
+    model = train_model(labelled_listings(200))
+    listings = [
+        {"address": "1 A St", "description": "Vacant land, zoned for 4 homes"},
+        {"address": "2 B St", "description": "Top floor condo"},
+        dict(labelled_listings(1)[0], description="Charming home"),
+        # Midway between the two classes: nothing local is sure about it
+        {"address": "4 D St", "price": 450000, "lot_size": 12000, "living_area": 1650,
+         "year_built": 1975, "description": "Charming home"},
+    ]
+    assert [label for label, _ in local_labels(listings, model)][:3] == \
+        ["development", "not_development", "development"]
+    labels, tiers = classify_listings_tiered(listings, model=model, use_cache=False)
+
+    assert tiers == {"rules": 2, "model": 1, "llm": 1}
+    assert labels == ["development", "not_development", "development", "maybe"]
+    assert len(server.prompts) == 1 and "4 D St" in server.prompts[0]
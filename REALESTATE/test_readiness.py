@@ -0,0 +1,84 @@
+# Tests for the scrapers' page wait bookkeeping and politeness delays, without a browser
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper import readiness
+from app.scraper.readiness import polite_delay, record_wait, reset_wait_log, wait_for_any_selector, wait_report
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+import asyncio
+import pytest
+
+@pytest.fixture(autouse=True)
+def wait_log(monkeypatch):
+    monkeypatch.setattr(readiness, "WAIT_LOG", [])
+
+@pytest.fixture
+def slept(monkeypatch):
+    delays = []
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(readiness.asyncio, "sleep", fake_sleep)
+    return delays
+
+def test_wait_report_totals_per_source():
+    record_wait("Zillow", "z/1", 1.25, 0.0, ".card")
+    record_wait("Zillow", "z/2", 3.5, 2.0, None)
+    record_wait("Zillow", "z/3", 0.0, 4.0, "__NEXT_DATA__")
+    record_wait("Redfin", "r/1", 0.75, 1.5, ".home")
+
+    assert wait_report() == {
+        "Zillow": {"pages": 3, "render_seconds": 4.75, "polite_seconds": 6.0, "max_render_seconds": 3.5, "no_match": 1},
+        "Redfin": {"pages": 1, "render_seconds": 0.75, "polite_seconds": 1.5, "max_render_seconds": 0.75, "no_match": 0},
+    }
+    reset_wait_log()
+    assert wait_report() == {}
+
+def test_recorded_waits_are_rounded():
+    record_wait("Realtor", "re/1", 1.23456, 0.98765)
+    assert readiness.WAIT_LOG == [{"source": "Realtor", "url": "re/1", "render_seconds": 1.235,
+                                   "polite_seconds": 0.988, "matched": None}]
+
+def test_polite_delay_stays_within_its_bounds(slept, monkeypatch):
+    monkeypatch.setattr(readiness, "POLITENESS_SCALE", 1.0)
+    delays = [asyncio.run(polite_delay(2, 5)) for _ in range(50)]
+    assert all(2 <= d <= 5 for d in delays)
+    assert slept == delays
+
+def test_polite_delay_is_scaled_and_can_be_switched_off(slept, monkeypatch):
+    monkeypatch.setattr(readiness, "POLITENESS_SCALE", 0.5)
+    assert 1 <= asyncio.run(polite_delay(2, 4)) <= 2
+    monkeypatch.setattr(readiness, "POLITENESS_SCALE", 0.0)
+    assert asyncio.run(polite_delay(2, 4)) == 0
+    # A zero delay doesn't sleep at all
+    assert len(slept) == 1
+
+class FakeHandle:
+    def __init__(self, value):
+        self.value = value
+
+    async def json_value(self):
+        return self.value
+
+class FakePage:
+    def __init__(self, present):
+        self.present = present
+
+    async def wait_for_function(self, script, arg, timeout):
+        match = next((s for s in arg if s in self.present), None)
+        if match is None:
+            raise PlaywrightTimeoutError("timed out")
+        return FakeHandle(match)
+
+def test_first_present_selector_wins_in_priority_order():
+    page = FakePage({".fallback-card", ".card"})
+    selector, seconds = asyncio.run(wait_for_any_selector(page, [".card", ".fallback-card"]))
+    assert selector == ".card"
+    assert seconds >= 0
+
+def test_no_matching_selector_returns_none():
+    selector, _ = asyncio.run(wait_for_any_selector(FakePage(set()), [".card"]))
+    assert selector is None
@@ -0,0 +1,81 @@
+# Tests for the scraper request blocking policy, without a browser
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.scraper import resource_blocking
+from app.scraper.resource_blocking import install_resource_blocking, is_blocked_domain, should_block, ESTIMATED_BYTES
+import asyncio
+import pytest
+
+PAGE_URL = "https://www.zillow.com/homes/Newton,-MA_rb/"
+
+@pytest.mark.parametrize("resource_type", ["document", "xhr", "fetch", "script"])
+def test_types_needed_for_cards_are_allowed(resource_type):
+    assert not should_block(resource_type, PAGE_URL)
+
+@pytest.mark.parametrize("resource_type", ["image", "font", "media", "stylesheet"])
+def test_heavy_types_are_blocked(resource_type):
+    assert should_block(resource_type, PAGE_URL)
+
+def test_tracker_domains_are_blocked_whatever_the_type():
+    assert should_block("script", "https://www.google-analytics.com/analytics.js")
+    assert should_block("xhr", "https://bam.nr-data.net/events/1/abc")
+    assert should_block("document", "https://doubleclick.net/")
+
+def test_subdomains_match_but_lookalikes_do_not():
+    assert is_blocked_domain("https://static.hotjar.com/c/hotjar.js")
+    assert is_blocked_domain("https://a.b.segment.io/v1/t")
+    assert not is_blocked_domain("https://nothotjar.com/script.js")
+    assert not is_blocked_domain("https://hotjar.com.example.org/script.js")
+    assert not is_blocked_domain("not a url")
+
+def test_allow_list_and_domains_can_be_overridden():
+    # What SCRAPER_ALLOWED_RESOURCE_TYPES / SCRAPER_BLOCKED_DOMAINS turn into
+    allowed = {"document", "stylesheet"}
+    domains = ["cdn.example.com"]
+    assert not should_block("stylesheet", PAGE_URL, allowed, domains)
+    assert should_block("script", PAGE_URL, allowed, domains)
+    assert should_block("document", "https://img.cdn.example.com/a.html", allowed, domains)
+    # The default tracker list no longer applies once replaced
+    assert not should_block("document", "https://www.google-analytics.com/", allowed, domains)
+
+class FakeRoute:
+    def __init__(self, page, resource_type, url):
+        self.request = type("Request", (), {"resource_type": resource_type, "url": url,
+                                            "frame": type("Frame", (), {"page": page})})()
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+class FakeContext:
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+def test_blocked_requests_are_aborted_and_counted(monkeypatch):
+    monkeypatch.setattr(resource_blocking, "_page_stats", {})
+    page = object()
+    context = FakeContext()
+    routes = [FakeRoute(page, "document", PAGE_URL), FakeRoute(page, "image", "https://photos.zillowstatic.com/a.jpg"),
+              FakeRoute(page, "image", "https://photos.zillowstatic.com/b.jpg"),
+              FakeRoute(page, "script", "https://www.googletagmanager.com/gtm.js")]
+
+    async def run():
+        await install_resource_blocking(context)
+        for route in routes:
+            await context.handler(route)
+    asyncio.run(run())
+
+    assert [r.outcome for r in routes] == ["continued", "aborted", "aborted", "aborted"]
+    assert resource_blocking._page_stats[page] == {
+        "blocked": 3, "allowed": 1,
+        "estimated_bytes_saved": 2 * ESTIMATED_BYTES["image"] + ESTIMATED_BYTES["script"],
+        "by_type": {"image": 2, "script": 1},
+    }
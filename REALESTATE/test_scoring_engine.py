@@ -0,0 +1,112 @@
+# score_frame must give exactly what score_listing gives, row by row
+import sys
+import os
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app', 'utils'))
+
+from app.integrations import database_manager
+from app.integrations.database_manager import init_db, upsert_listings, get_conn
+from app.core import scoring_engine
+from app.core.scoring_engine import score_listing, score_frame, get_rules, rescore_table, RULES_PATH
+import json
+import pandas as pd
+import random
+
+KEYWORDS = get_rules("development").rules[3].keywords
+
+def random_listings(count, seed=3):
+    rng = random.Random(seed)
+    words = KEYWORDS + ["Tear Down", "BUILDER special", "charming", "as-is", ""]
+    listings = []
+    for _ in range(count):
+        listing = {
+            "price": rng.choice([None, 0, rng.randint(50_000, 3_000_000), rng.uniform(1, 1e6)]),
+            "lot_size": rng.choice([None, 0, rng.randint(1, 200_000), rng.uniform(0, 20_000)]),
+            "year_built": rng.choice([None, 0, 1949, 1950, 1979, 1980, rng.randint(1850, 2024)]),
+            "description": rng.choice([None, " ".join(rng.sample(words, rng.randint(0, 4)))]),
+            "classified_label": rng.choice([None, "development", "maybe", "not_development", "error"]),
+        }
+        # Some listings are missing fields altogether
+        for key in list(listing):
+            if rng.random() < 0.1:
+                del listing[key]
+        listings.append(listing)
+    return listings
+
+def test_score_frame_matches_score_listing():
+    listings = random_listings(5000)
+    scores = score_frame(pd.DataFrame(listings))
+    assert scores.tolist() == [score_listing(l) for l in listings]
+
+def test_score_frame_without_optional_columns():
+    listings = [{"price": 100000, "lot_size": 5000}, {"price": None, "lot_size": 40000}]
+    assert score_frame(pd.DataFrame(listings)).tolist() == [score_listing(l) for l in listings]
+    assert score_frame(pd.DataFrame(index=range(0))).tolist() == []
+
+def test_keywords_count_once_each():
+    listing = {"description": "Builder builder, tear down or tear-down, sold AS IS", "lot_size": 0}
+    assert score_frame(pd.DataFrame([listing]))[0] == score_listing(listing) == 5.0 + 4 * 3.0
+
+def test_simple_rules_match_the_old_csv_scorer():
+    def old_simple_score(listing):
+        score = 0
+        if listing.get("price"):
+            score += min(listing["price"] / 1000000 * 50, 50)
+        if listing.get("beds"):
+            score += min(listing["beds"] * 5, 20)
+        if listing.get("living_area"):
+            score += min(listing["living_area"] / 100, 30)
+        return round(score, 2)
+
+    rng = random.Random(5)
+    listings = [{"price": rng.choice([None, rng.randint(1, 2_000_000)]), "beds": rng.choice([None, 0, 1, 3, 6]),
+                 "living_area": rng.choice([None, rng.randint(300, 5000)])} for _ in range(2000)]
+    expected = [old_simple_score(l) for l in listings]
+    assert [score_listing(l, "simple") for l in listings] == expected
+    assert score_frame(pd.DataFrame(listings), "simple").tolist() == expected
+
+def write_rules(path, keyword_points):
+    with open(RULES_PATH) as f:
+        rules = json.load(f)
+    rules["development"]["rules"][3]["points"] = keyword_points
+    with open(path, "w") as f:
+        json.dump(rules, f)
+
+def test_rules_reload_when_the_file_changes(monkeypatch, tmp_path):
+    monkeypatch.setattr(scoring_engine, "RELOAD_CHECK_SECONDS", 0)
+    path = str(tmp_path / "rules.json")
+    listing = {"description": "builder special", "lot_size": 0}
+    write_rules(path, 3)
+    assert get_rules(path=path).score(listing) == 8.0
+
+    write_rules(path, 10)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+    assert get_rules(path=path).score(listing) == 15.0
+
+    # A broken edit keeps the last good rules
+    with open(path, "w") as f:
+        f.write('{"development": {"rules": [{"type": "nonsense"}]}}')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10**9))
+    assert get_rules(path=path).score(listing) == 15.0
+
+def test_rescore_table_applies_new_weights(monkeypatch, tmp_path):
+    monkeypatch.setattr(database_manager, "DB_PATH", str(tmp_path / "scores.db"))
+    init_db()
+    listings = [dict(l, url=f"https://example.com/{i}", source="zillow", raw_json="{}", score=0.0)
+                for i, l in enumerate(random_listings(300))]
+    upsert_listings(listings)
+
+    path = str(tmp_path / "rules.json")
+    write_rules(path, 7)
+    monkeypatch.setattr(scoring_engine, "RULES_PATH", path)
+    monkeypatch.setattr(scoring_engine, "RELOAD_CHECK_SECONDS", 0)
+    assert rescore_table() > 0
+
+    stored = dict(get_conn().execute("SELECT url, score FROM listings"))
+    rules = get_rules()
+    for listing in listings:
+        assert stored[listing["url"]] == rules.score(listing)
+    # Nothing left to change on a second pass
+    assert rescore_table() == 0